@@ -30,7 +30,9 @@ def create_app(config_name=None):
     
     # Initialize extensions with app
     db.init_app(app)
-    socketio.init_app(app, cors_allowed_origins="*")
+    # With a message queue, emits to rooms fan out to every server process
+    socketio.init_app(app, cors_allowed_origins="*",
+                      message_queue=app.config.get('SOCKETIO_MESSAGE_QUEUE'))
     login_manager.init_app(app)
     migrate.init_app(app, db)
     
@@ -73,6 +75,66 @@ def create_app(config_name=None):
     register_game_events(socketio)
     register_chat_events(socketio)
     
+    # One game loop drives all periodic work
+    from app.systems.tick_engine import get_tick_engine
+    tick_engine = get_tick_engine()
+    tick_engine.init_app(app)
+    
+    # Rooms are cached per process; map builder edits arrive via the world version
+    from app.systems.world_graph import get_world_graph
+    world = get_world_graph()
+    world.init_app(app)
+    world.start(tick_engine)
+    
+    # Write-behind character state (journal replay happens on first use)
+    from app.systems.character_state import get_character_state_store
+    store = get_character_state_store()
+    store.init_app(app)
+    store.start(tick_engine)
+    
+    # Online characters' vitals regenerate in one vectorized step per tick
+    from app.systems.vitals import get_vitals_store
+    vitals = get_vitals_store()
+    vitals.init_app(app)
+    vitals.start(tick_engine)
+    
+    # NPCs only act in areas where players are
+    from app.systems.npc_runtime import get_npc_runtime
+    get_npc_runtime().start(tick_engine)
+    
+    # Dead NPCs and taken room items come back on a timing wheel
+    from app.systems.respawn import get_respawn_manager
+    respawn = get_respawn_manager()
+    respawn.init_app(app)
+    respawn.start(tick_engine)
+    
+    # Every fight in the world is resolved in one batch per tick
+    from app.systems.combat import get_combat_engine, cmd_kill
+    from app.systems.commands import get_command_processor
+    combat = get_combat_engine()
+    combat.init_app(app)
+    combat.start(tick_engine)
+    get_command_processor().register('kill', cmd_kill)
+    
+    # Each character is driven by exactly one server process
+    from app.systems.ownership import get_character_ownership
+    get_character_ownership().init_app(app)
+    
+    # Worker pool for queued game commands
+    from app.systems.command_queue import get_command_queue
+    get_command_queue().init_app(app)
+    
+    # Room events are coalesced into one batch per room per frame
+    from app.systems.room_broadcast import get_room_broadcaster
+    get_room_broadcaster().start(tick_engine)
+    
+    if app.config.get('GAME_TICK_ENABLED'):
+        tick_engine.start()
+    
+    # Recent chat is served from memory; load it once at startup
+    from app.chat_history import chat_history
+    chat_history.init_app(app)
+    
     # Import models for migration
     from app.models import player, character, item, room, chat_message
     
@@ -0,0 +1,259 @@
+"""
+Searchable chat archive partitioned by month
+
+Every chat message is also written to a monthly SQLite file
+(instance/chat_archive/chat_YYYY_MM.db) with an FTS5 index on the message
+text. Moderation searches by keyword, character, channel and time range only
+open the partitions overlapping the requested range. Retention works on whole
+files: old partitions are compacted (FTS optimize + VACUUM) and, past the
+retention window, deleted, without touching the live chat database.
+"""
+import os
+import re
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta, timezone
+
+PARTITION_PATTERN = re.compile(r'^chat_(\d{4})_(\d{2})\.db$')
+
+
+def _is_bare_date(value):
+    """True for a day without a time of day ('2025-03-31' or a date object)"""
+    if isinstance(value, str):
+        return len(value.strip()) == 10
+    return isinstance(value, date) and not isinstance(value, datetime)
+
+
+def _to_datetime(value):
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.strip())
+    elif not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _month_index(year, month):
+    return year * 12 + (month - 1)
+
+
+def _fts_query(keyword):
+    """Quote each word of user input so FTS5 operators are not interpreted
+
+    The quoted terms are implicitly AND-ed together.
+    """
+    return ' '.join('"' + word.replace('"', '""') + '"' for word in keyword.split())
+
+
+class ChatArchive:
+    """Monthly SQLite partitions of chat messages with full-text search"""
+
+    def __init__(self, root_dir='instance/chat_archive'):
+        self.root_dir = root_dir
+        self._lock = threading.Lock()
+        self._connections = {}  # (year, month) -> connection used for appends
+
+    def _path(self, year, month):
+        return os.path.join(self.root_dir, f'chat_{year:04d}_{month:02d}.db')
+
+    def partitions(self):
+        """Existing partitions as sorted (year, month) tuples"""
+        if not os.path.isdir(self.root_dir):
+            return []
+        found = []
+        for name in os.listdir(self.root_dir):
+            match = PARTITION_PATTERN.match(name)
+            if match:
+                found.append((int(match.group(1)), int(match.group(2))))
+        return sorted(found)
+
+    def _open(self, year, month):
+        conn = sqlite3.connect(self._path(year, month), check_same_thread=False, timeout=10)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY,
+                character_id INTEGER NOT NULL,
+                character_name TEXT NOT NULL,
+                message TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                channel TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_messages_timestamp ON messages (timestamp);
+            CREATE INDEX IF NOT EXISTS idx_messages_character ON messages (character_id, timestamp);
+            CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+                message, content='messages', content_rowid='id'
+            );
+            CREATE TABLE IF NOT EXISTS partition_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        ''')
+        return conn
+
+    def _append_connection(self, year, month):
+        conn = self._connections.get((year, month))
+        if conn is None:
+            os.makedirs(self.root_dir, exist_ok=True)
+            conn = self._connections[(year, month)] = self._open(year, month)
+        return conn
+
+    def append(self, rows):
+        """Archive messages
+
+        Args:
+            rows: Iterable of (id, character_id, character_name, message, timestamp, channel)
+        """
+        by_partition = {}
+        for message_id, character_id, character_name, message, timestamp, channel in rows:
+            timestamp = _to_datetime(timestamp)
+            by_partition.setdefault((timestamp.year, timestamp.month), []).append(
+                (message_id, character_id, character_name, message, timestamp.isoformat(), channel)
+            )
+
+        with self._lock:
+            for (year, month), partition_rows in by_partition.items():
+                conn = self._append_connection(year, month)
+                with conn:
+                    for row in partition_rows:
+                        cursor = conn.execute('''
+                            INSERT OR IGNORE INTO messages
+                                (id, character_id, character_name, message, timestamp, channel)
+                            VALUES (?, ?, ?, ?, ?, ?)
+                        ''', row)
+                        if cursor.rowcount:
+                            conn.execute('INSERT INTO messages_fts (rowid, message) VALUES (?, ?)',
+                                         (row[0], row[3]))
+
+    def search(self, keyword=None, character_id=None, character_name=None, channel=None,
+               start=None, end=None, limit=100):
+        """Search archived chat, newest first
+
+        Args:
+            keyword: Words or phrase to match in the message text
+            character_id / character_name: Restrict to one speaker
+            channel: Restrict to one channel key
+            start / end: Datetime, date or ISO string bounds, inclusive; a bare
+                end date includes the whole of that day
+            limit: Maximum number of results
+
+        Returns:
+            list: Message dicts
+        """
+        end_day = _is_bare_date(end) if end else False
+        start = _to_datetime(start) if start else None
+        end = _to_datetime(end) if end else None
+        if end_day:
+            end += timedelta(days=1)  # Compared exclusively below
+        last = end - timedelta(microseconds=1) if end_day else end
+        low = _month_index(start.year, start.month) if start else None
+        high = _month_index(last.year, last.month) if end else None
+
+        clauses, params = [], []
+        if keyword and keyword.strip():
+            clauses.append('m.id IN (SELECT rowid FROM messages_fts WHERE messages_fts MATCH ?)')
+            params.append(_fts_query(keyword))
+        if character_id is not None:
+            clauses.append('m.character_id = ?')
+            params.append(character_id)
+        if character_name:
+            clauses.append('m.character_name = ? COLLATE NOCASE')
+            params.append(character_name)
+        if channel:
+            clauses.append('m.channel = ?')
+            params.append(channel)
+        if start:
+            clauses.append('m.timestamp >= ?')
+            params.append(start.isoformat())
+        if end:
+            clauses.append('m.timestamp < ?' if end_day else 'm.timestamp <= ?')
+            params.append(end.isoformat())
+        where = ('WHERE ' + ' AND '.join(clauses)) if clauses else ''
+
+        results = []
+        for year, month in reversed(self.partitions()):
+            index = _month_index(year, month)
+            if (low is not None and index < low) or (high is not None and index > high):
+                continue
+            conn = sqlite3.connect(self._path(year, month))
+            try:
+                rows = conn.execute(f'''
+                    SELECT m.id, m.character_id, m.character_name, m.message, m.timestamp, m.channel
+                    FROM messages m {where}
+                    ORDER BY m.timestamp DESC LIMIT ?
+                ''', params + [limit - len(results)]).fetchall()
+            finally:
+                conn.close()
+            for row in rows:
+                results.append({
+                    'id': row[0],
+                    'character_id': row[1],
+                    'character_name': row[2],
+                    'message': row[3],
+                    'timestamp': row[4],
+                    'channel': row[5]
+                })
+            if len(results) >= limit:
+                break
+        return results
+
+    def run_retention(self, retention_months=12, compact_after_months=1, now=None):
+        """Compact and drop old partitions
+
+        Partitions older than `compact_after_months` get their FTS index
+        merged and the file vacuumed once; partitions older than
+        `retention_months` are deleted. Only closed months are touched, so live
+        writes never wait on this.
+
+        Returns:
+            dict: Lists of compacted and dropped partition names
+        """
+        now = _to_datetime(now) if now else datetime.now(timezone.utc)
+        current = _month_index(now.year, now.month)
+        report = {'compacted': [], 'dropped': []}
+
+        for year, month in self.partitions():
+            age = current - _month_index(year, month)
+            name = os.path.basename(self._path(year, month))
+            if retention_months and age > retention_months:
+                self._close_append_connection(year, month)
+                for suffix in ('', '-wal', '-shm'):
+                    path = self._path(year, month) + suffix
+                    if os.path.exists(path):
+                        os.remove(path)
+                report['dropped'].append(name)
+            elif age > compact_after_months:
+                self._close_append_connection(year, month)
+                conn = self._open(year, month)
+                try:
+                    done = conn.execute(
+                        "SELECT value FROM partition_meta WHERE key = 'compacted'"
+                    ).fetchone()
+                    if not done:
+                        conn.execute("INSERT INTO messages_fts (messages_fts) VALUES ('optimize')")
+                        conn.execute("INSERT INTO partition_meta (key, value) VALUES ('compacted', ?)",
+                                     (now.isoformat(),))
+                        conn.commit()
+                        conn.execute('VACUUM')
+                        report['compacted'].append(name)
+                finally:
+                    conn.close()
+        return report
+
+    def _close_append_connection(self, year, month):
+        with self._lock:
+            conn = self._connections.pop((year, month), None)
+        if conn is not None:
+            conn.close()
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections.values():
+                conn.close()
+            self._connections = {}
+
+
+# Global instance
+chat_archive = ChatArchive()
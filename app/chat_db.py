@@ -4,69 +4,199 @@ Separate database module for chat messages
 Run this script to initialize the chat database.
 DCH 10/14/2025
 """
+import atexit
+import queue
 import sqlite3
 import os
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime, timezone
 
+from app.chat_archive import chat_archive
+
 class ChatDatabase:
-    """Simple SQLite database for chat messages"""
+    """SQLite database for chat messages
+    
+    Uses one long-lived writer connection (serialized by a lock) and a
+    bounded pool of reader connections that queries check out and return.
+    When every reader is busy a query waits for one to come back instead of
+    opening another. The database runs in WAL mode so readers never block
+    the writer and vice versa.
+    """
+    
+    READER_POOL_SIZE = 8
     
-    def __init__(self, db_path='instance/chat_logs.db'):
+    def __init__(self, db_path='instance/chat_logs.db', pool_size=READER_POOL_SIZE):
         self.db_path = db_path
+        self.pool_size = pool_size
+        self._write_lock = threading.Lock()
+        self._writer = None
+        self._readers = queue.Queue(maxsize=pool_size)  # idle reader connections
+        self._opened = 0  # reader connections open, idle or checked out
+        self._readers_lock = threading.Lock()
         self.init_database()
     
+    def _connect(self):
+        """Open a connection with the chat database pragmas applied"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10)
+        conn.execute('PRAGMA journal_mode=WAL')
+        # WAL + NORMAL only syncs at checkpoints; a power loss can drop the
+        # last few messages but never corrupts the log
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+    
+    def _get_writer(self):
+        if self._writer is None:
+            self._writer = self._connect()
+        return self._writer
+    
+    @contextmanager
+    def _reader(self):
+        """Check a reader connection out of the pool for the duration of a query"""
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._readers_lock:
+                can_open = self._opened < self.pool_size
+                if can_open:
+                    self._opened += 1
+            if can_open:
+                try:
+                    conn = self._connect()
+                    conn.execute('PRAGMA query_only=ON')
+                except Exception:
+                    with self._readers_lock:
+                        self._opened -= 1
+                    raise
+            else:
+                conn = self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put_nowait(conn)
+    
+    def _read(self, sql, params=()):
+        """Run a query on a pooled reader and return all rows"""
+        with self._reader() as conn:
+            return conn.execute(sql, params).fetchall()
+    
+    def close(self):
+        """Close the writer and every idle reader connection"""
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        while True:
+            try:
+                conn = self._readers.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._readers_lock:
+                self._opened -= 1
+    
     def init_database(self):
         """Initialize the chat database with tables"""
         # Ensure the instance directory exists
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Create chat_messages table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS chat_messages (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                character_id INTEGER NOT NULL,
-                character_name TEXT NOT NULL,
-                message TEXT NOT NULL,
-                timestamp DATETIME NOT NULL
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        with self._write_lock:
+            conn = self._get_writer()
+            cursor = conn.cursor()
+            
+            # Create chat_messages table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS chat_messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    character_id INTEGER NOT NULL,
+                    character_name TEXT NOT NULL,
+                    message TEXT NOT NULL,
+                    timestamp DATETIME NOT NULL
+                )
+            ''')
+            
+            # Blocks of message ids handed out to log writers
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS chat_id_allocator (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    next_id INTEGER NOT NULL
+                )
+            ''')
+            
+            # Older databases predate chat channels
+            columns = [row[1] for row in cursor.execute('PRAGMA table_info(chat_messages)')]
+            if 'channel' not in columns:
+                cursor.execute("""
+                    ALTER TABLE chat_messages ADD COLUMN channel TEXT NOT NULL DEFAULT 'global'
+                """)
+            
+            # Recent-message queries read the newest rows by timestamp
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_chat_messages_timestamp
+                ON chat_messages (timestamp)
+            ''')
+            
+            # History pages walk a channel backwards by (timestamp, id); ids
+            # come from per-writer blocks, so they are not in send order
+            cursor.execute('DROP INDEX IF EXISTS idx_chat_messages_channel_id')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_chat_messages_channel_time
+                ON chat_messages (channel, timestamp, id)
+            ''')
+            
+            conn.commit()
     
-    def add_message(self, character_id, character_name, message):
-        """Add a chat message to the database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO chat_messages (character_id, character_name, message, timestamp)
-            VALUES (?, ?, ?, ?)
-        ''', (character_id, character_name, message, datetime.now(timezone.utc)))
+    def add_messages(self, rows):
+        """Insert pre-numbered messages in one transaction
         
-        conn.commit()
-        message_id = cursor.lastrowid
-        conn.close()
+        Args:
+            rows: Iterable of (id, character_id, character_name, message, timestamp, channel)
+        """
+        with self._write_lock:
+            conn = self._get_writer()
+            with conn:
+                conn.executemany('''
+                    INSERT INTO chat_messages (id, character_id, character_name, message, timestamp, channel)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', rows)
+    
+    def reserve_ids(self, count):
+        """Reserve a block of message ids; returns the first id of the block
         
-        return message_id
+        The allocator row lives in the database, so writers in several
+        processes never hand out the same id. Each writer uses its block up
+        before reserving another, so ids are unique but not in send order:
+        messages are ordered by (timestamp, id).
+        """
+        with self._write_lock:
+            conn = self._get_writer()
+            with conn:
+                conn.execute('BEGIN IMMEDIATE')
+                row = conn.execute('SELECT next_id FROM chat_id_allocator WHERE id = 1').fetchone()
+                if row is None:
+                    max_id = conn.execute('SELECT MAX(id) FROM chat_messages').fetchone()[0]
+                    first = (max_id or 0) + 1
+                    conn.execute('INSERT INTO chat_id_allocator (id, next_id) VALUES (1, ?)',
+                                 (first + count,))
+                else:
+                    first = row[0]
+                    conn.execute('UPDATE chat_id_allocator SET next_id = ? WHERE id = 1',
+                                 (first + count,))
+            return first
     
     def get_recent_messages(self, limit=50):
         """Get recent chat messages"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
+        rows = self._read('''
             SELECT id, character_id, character_name, message, timestamp
             FROM chat_messages
-            ORDER BY timestamp DESC
+            ORDER BY timestamp DESC, id DESC
             LIMIT ?
         ''', (limit,))
         
         messages = []
-        for row in cursor.fetchall():
+        for row in rows:
             messages.append({
                 'id': row[0],
                 'character_id': row[1],
@@ -76,19 +206,227 @@ class ChatDatabase:
                 'formatted_timestamp': datetime.fromisoformat(row[4]).strftime('%H:%M:%S')
             })
         
-        conn.close()
         return list(reversed(messages))  # Return oldest first
     
+    def get_channel_messages(self, channel, limit=50, before=None):
+        """Get a page of a channel's messages, newest last
+        
+        Args:
+            channel: Channel key (e.g. 'global', 'local:12', 'whisper:3:7')
+            limit: Maximum number of messages
+            before: Only return messages older than this (timestamp, id) position
+        
+        Returns:
+            list: Raw rows (id, character_id, character_name, message, timestamp, channel)
+        """
+        if before is None:
+            rows = self._read('''
+                SELECT id, character_id, character_name, message, timestamp, channel
+                FROM chat_messages WHERE channel = ?
+                ORDER BY timestamp DESC, id DESC LIMIT ?
+            ''', (channel, limit))
+        else:
+            timestamp, message_id = before
+            rows = self._read('''
+                SELECT id, character_id, character_name, message, timestamp, channel
+                FROM chat_messages
+                WHERE channel = ? AND (timestamp < ? OR (timestamp = ? AND id < ?))
+                ORDER BY timestamp DESC, id DESC LIMIT ?
+            ''', (channel, timestamp, timestamp, message_id, limit))
+        return list(reversed(rows))
+    
+    def get_message_timestamp(self, message_id):
+        """The stored timestamp of a message, or None if it is not written (yet)"""
+        rows = self._read('SELECT timestamp FROM chat_messages WHERE id = ?', (message_id,))
+        return rows[0][0] if rows else None
+    
+    def get_latest_per_channel(self, limit):
+        """The newest `limit` rows of every channel, oldest first within each"""
+        return self._read('''
+            SELECT id, character_id, character_name, message, timestamp, channel
+            FROM (
+                SELECT *, ROW_NUMBER() OVER (
+                    PARTITION BY channel ORDER BY timestamp DESC, id DESC
+                ) AS position
+                FROM chat_messages
+            )
+            WHERE position <= ?
+            ORDER BY channel, timestamp, id
+        ''', (limit,))
+    
+    def iter_messages(self, after_id=0, batch_size=1000):
+        """Yield batches of rows in id order (for backfilling the archive)"""
+        while True:
+            # A reader is only held per batch, not while the caller works
+            rows = self._read('''
+                SELECT id, character_id, character_name, message, timestamp, channel
+                FROM chat_messages WHERE id > ? ORDER BY id LIMIT ?
+            ''', (after_id, batch_size))
+            if not rows:
+                return
+            yield rows
+            after_id = rows[-1][0]
+    
     def get_message_count(self):
         """Get total number of chat messages"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        return self._read('SELECT COUNT(*) FROM chat_messages')[0][0]
+
+class ChatLogWriter:
+    """Background writer that group-commits chat messages
+    
+    Messages get their id and timestamp the moment they are submitted and are
+    written in batches by a single background thread, so sending a chat
+    message never waits on a disk sync. Pending messages are drained on
+    shutdown.
+    """
+    
+    ID_BLOCK_SIZE = 256
+    
+    def __init__(self, database, max_queue=10000, batch_size=200, linger_ms=20, archive=None):
+        self.database = database
+        self.archive = archive
+        self.batch_size = batch_size
+        self.linger_ms = linger_ms
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._id_lock = threading.Lock()
+        self._next_id = 0
+        self._block_end = 0
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._stopping = False
+        self.stats = {
+            'queued': 0,
+            'written': 0,
+            'flushes': 0,
+            'overflow_writes': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+            'total_flush_ms': 0.0
+        }
+    
+    def _allocate_id(self):
+        with self._id_lock:
+            if self._next_id >= self._block_end:
+                self._next_id = self.database.reserve_ids(self.ID_BLOCK_SIZE)
+                self._block_end = self._next_id + self.ID_BLOCK_SIZE
+            message_id = self._next_id
+            self._next_id += 1
+            return message_id
+    
+    def submit(self, character_id, character_name, message, timestamp=None, channel='global'):
+        """Queue a message for writing; returns its (already assigned) id"""
+        row = (
+            self._allocate_id(),
+            character_id,
+            character_name,
+            message,
+            timestamp or datetime.now(timezone.utc),
+            channel
+        )
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(row)
+            self.stats['queued'] += 1
+        except queue.Full:
+            # Writer can't keep up; write this one inline rather than drop it
+            self.stats['overflow_writes'] += 1
+            self._write([row])
+        return row[0]
+    
+    def queue_depth(self):
+        return self._queue.qsize()
+    
+    def get_metrics(self):
+        """Queue depth and flush latency figures"""
+        metrics = dict(self.stats)
+        metrics['queue_depth'] = self.queue_depth()
+        flushes = metrics['flushes']
+        metrics['avg_flush_ms'] = metrics['total_flush_ms'] / flushes if flushes else 0.0
+        return metrics
+    
+    def flush(self):
+        """Block until every queued message has been written"""
+        self._queue.join()
+    
+    def close(self):
+        """Drain the queue and stop the writer thread"""
+        with self._thread_lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._stopping = True
+            self._queue.put(None)
+        thread.join()
+        with self._thread_lock:
+            self._thread = None
+            self._stopping = False
+    
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._thread_lock:
+            if self._thread is None and not self._stopping:
+                self._thread = threading.Thread(target=self._run, name='chat-log-writer', daemon=True)
+                self._thread.start()
+    
+    def _run(self):
+        while True:
+            rows, stop = self._next_batch()
+            if rows:
+                try:
+                    self._write(rows)
+                except Exception as e:
+                    print(f"[CHAT LOG] Failed to write {len(rows)} messages: {e}")
+            for _ in range(len(rows) + (1 if stop else 0)):
+                self._queue.task_done()
+            if stop:
+                return
+    
+    def _next_batch(self):
+        """Collect up to batch_size rows, lingering briefly after the first
         
-        cursor.execute('SELECT COUNT(*) FROM chat_messages')
-        count = cursor.fetchone()[0]
+        Returns:
+            tuple: (rows, stop) where stop means a shutdown was requested
+        """
+        rows = []
+        row = self._queue.get()
+        deadline = time.monotonic() + self.linger_ms / 1000
+        while row is not None:
+            rows.append(row)
+            if len(rows) >= self.batch_size:
+                return rows, False
+            try:
+                row = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                return rows, False
         
-        conn.close()
-        return count
+        # Shutting down: take everything that is still queued
+        while True:
+            try:
+                row = self._queue.get_nowait()
+            except queue.Empty:
+                return rows, True
+            if row is None:
+                self._queue.task_done()
+            else:
+                rows.append(row)
+    
+    def _write(self, batch):
+        started = time.perf_counter()
+        self.database.add_messages(batch)
+        if self.archive is not None:
+            try:
+                self.archive.append(batch)
+            except Exception as e:
+                print(f"[CHAT LOG] Failed to archive {len(batch)} messages: {e}")
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.stats['written'] += len(batch)
+        self.stats['flushes'] += 1
+        self.stats['last_flush_ms'] = elapsed_ms
+        self.stats['total_flush_ms'] += elapsed_ms
+        self.stats['max_flush_ms'] = max(self.stats['max_flush_ms'], elapsed_ms)
 
-# Global instance
+# Global instances
 chat_db = ChatDatabase()
+chat_log_writer = ChatLogWriter(chat_db, archive=chat_archive)
+atexit.register(chat_log_writer.close)
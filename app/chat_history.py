@@ -0,0 +1,183 @@
+"""
+In-memory ring buffers of recent chat per channel
+
+Every channel (global chat, local chat per room, whispers per pair of
+characters) keeps its last N messages in memory, each already serialized to
+JSON. History requests are answered by joining those fragments; the chat
+database is only read for pages older than the buffer.
+
+With several server processes (SOCKETIO_MESSAGE_QUEUE set) each buffer only
+sees the messages its own process logged, so history is read from the shared
+chat database and merged with the local buffer, which still covers messages
+the log writer has not committed yet.
+
+Each process's log writer numbers messages from its own block of ids, so ids
+are unique but not in send order. Messages are ordered, and paged, by
+(timestamp, id).
+"""
+import json
+import threading
+from collections import deque
+from datetime import datetime
+
+from app.chat_db import chat_db
+
+GLOBAL_CHANNEL = 'global'
+
+
+def local_channel(room_id):
+    """Channel key for local chat in a room"""
+    return f'local:{room_id}'
+
+
+def whisper_channel(character_id, other_character_id):
+    """Channel key for whispers between two characters (order independent)"""
+    low, high = sorted((character_id, other_character_id))
+    return f'whisper:{low}:{high}'
+
+
+def message_key(message_id, timestamp):
+    """Sort key of a message: when it was sent, then its id"""
+    if not isinstance(timestamp, str):
+        timestamp = str(timestamp)  # The form sqlite3 stores datetimes in
+    return (timestamp, message_id)
+
+
+def serialize_message(message_id, character_id, character_name, message, timestamp, channel):
+    """Serialize one chat message to its JSON history form"""
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    return json.dumps({
+        'id': message_id,
+        'character_id': character_id,
+        'character_name': character_name,
+        'message': message,
+        'channel': channel,
+        'timestamp': timestamp.isoformat(),
+        'formatted_timestamp': timestamp.strftime('%H:%M:%S')
+    })
+
+
+class ChannelBuffer:
+    """The last `size` messages of one channel as ((timestamp, id), json) pairs"""
+
+    def __init__(self, size):
+        self.entries = deque(maxlen=size)
+        # True while the buffer holds the channel's entire history
+        self.complete = True
+
+    def append(self, key, fragment):
+        if len(self.entries) == self.entries.maxlen:
+            self.complete = False
+        self.entries.append((key, fragment))
+
+
+class ChatHistory:
+    """Per-channel ring buffers of pre-serialized recent messages"""
+
+    def __init__(self, database, size=200, shared=False):
+        self.database = database
+        self.size = size
+        self.shared = shared  # Other processes log to the same database
+        self._lock = threading.Lock()
+        self._channels = {}  # channel key -> ChannelBuffer
+        self._warmed = False
+        self.stats = {'buffer_hits': 0, 'database_reads': 0}
+
+    def init_app(self, app):
+        """Configure from the app config and load recent chat"""
+        self.shared = bool(app.config.get('SOCKETIO_MESSAGE_QUEUE'))
+        self.warm()
+
+    def warm(self):
+        """Fill every channel's buffer from the database"""
+        rows = self.database.get_latest_per_channel(self.size)
+        channels = {}
+        for row in rows:
+            buffer = channels.get(row[5])
+            if buffer is None:
+                buffer = channels[row[5]] = ChannelBuffer(self.size)
+            buffer.append(message_key(row[0], row[4]), serialize_message(*row))
+        # A full buffer may have older messages behind it
+        for buffer in channels.values():
+            buffer.complete = len(buffer.entries) < self.size
+        with self._lock:
+            self._channels = channels
+            self._warmed = True
+        print(f"[CHAT HISTORY] Warmed {len(rows)} messages across {len(channels)} channels")
+
+    def _ensure_warmed(self):
+        if not self._warmed:
+            self.warm()
+
+    def record(self, message_id, character_id, character_name, message, timestamp, channel=GLOBAL_CHANNEL):
+        """Add a newly sent message to its channel's buffer"""
+        self._ensure_warmed()
+        fragment = serialize_message(message_id, character_id, character_name, message, timestamp, channel)
+        with self._lock:
+            buffer = self._channels.get(channel)
+            if buffer is None:
+                buffer = self._channels[channel] = ChannelBuffer(self.size)
+            buffer.append(message_key(message_id, timestamp), fragment)
+        return fragment
+
+    def recent_json(self, channel=GLOBAL_CHANNEL, limit=50, before_id=None):
+        """JSON array of up to `limit` messages, oldest first
+
+        Args:
+            channel: Channel key
+            limit: Maximum number of messages
+            before_id: Only messages sent before this one (for paging back)
+        """
+        self._ensure_warmed()
+        with self._lock:
+            buffer = self._channels.get(channel)
+            entries = sorted(buffer.entries) if buffer else []
+            complete = buffer.complete if buffer else True
+
+        before = None
+        if before_id is not None:
+            before = self._position(entries, before_id)
+            if before is None:
+                return '[]'  # Unknown message: nothing to page back from
+            entries = [entry for entry in entries if entry[0] < before]
+        if self.shared:
+            return self._merged_json(channel, entries, limit, before)
+        page = entries[-limit:] if limit > 0 else []
+
+        # Fall back to the database only when the page reaches past the buffer
+        if len(page) < limit and not complete:
+            self.stats['database_reads'] += 1
+            older_than = page[0][0] if page else before
+            rows = self.database.get_channel_messages(channel, limit - len(page), older_than)
+            page = [(message_key(row[0], row[4]), serialize_message(*row)) for row in rows] + page
+        else:
+            self.stats['buffer_hits'] += 1
+
+        return '[' + ', '.join(fragment for _, fragment in page) + ']'
+
+    def _position(self, entries, message_id):
+        """The (timestamp, id) key of a message, from the buffer or the database"""
+        for key, _ in entries:
+            if key[1] == message_id:
+                return key
+        timestamp = self.database.get_message_timestamp(message_id)
+        return message_key(message_id, timestamp) if timestamp is not None else None
+
+    def _merged_json(self, channel, entries, limit, before):
+        """A page from the shared database plus this process's unwritten messages"""
+        if limit <= 0:
+            return '[]'
+        self.stats['database_reads'] += 1
+        rows = self.database.get_channel_messages(channel, limit, before)
+        page = dict(entries)
+        page.update((message_key(row[0], row[4]), serialize_message(*row)) for row in rows)
+        return '[' + ', '.join(page[key] for key in sorted(page)[-limit:]) + ']'
+
+    def recent(self, channel=GLOBAL_CHANNEL, limit=50, before_id=None):
+        """Recent messages as dicts, oldest first"""
+        return json.loads(self.recent_json(channel, limit, before_id))
+
+
+# Global instance
+chat_history = ChatHistory(chat_db)
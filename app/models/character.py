@@ -121,24 +121,13 @@ class Character(db.Model):
         return False
     
     def get_equipment_bonuses(self):
-        """Calculate total bonuses from equipped items"""
-        bonuses = {
-            'health': 0,
-            'mana': 0,
-            'movement': 0,
-            'strength': 0,
-            'intellect': 0
-        }
-        
-        # Get all equipped items
-        for item in self.equipped_items:
-            if item.template and item.template.equipment_stats:
-                stats = item.get_effective_stats()
-                for stat, value in stats.items():
-                    if stat in bonuses:
-                        bonuses[stat] += value
+        """Total bonuses from equipped items
         
-        return bonuses
+        Served from the stat engine's running totals; equipped items are only
+        scanned the first time.
+        """
+        from app.systems.stat_engine import get_stat_engine
+        return get_stat_engine().equipment_bonuses(self)
     
     def calculate_derived_stats(self):
         """Calculate HP, mana, and movement based on attributes and equipment"""
@@ -175,6 +164,21 @@ class Character(db.Model):
         else:
             self.current_movement = min(self.current_movement, self.max_movement)
     
+    def get_regen_rates(self):
+        """HP, mana and movement regenerated per second, based on attributes"""
+        vitality = self.get_attribute_value('body', 'vitality')
+        durability = self.get_attribute_value('body', 'durability')
+        hp_rate = 1.0 + (vitality * 0.25) + (durability * 0.1)
+        
+        mystical = self.get_attribute_value('spirit', 'mystical')
+        willpower = self.get_attribute_value('mind', 'willpower')
+        mana_rate = 0.5 + (mystical * 0.2) + (willpower * 0.1)
+        
+        endurance = self.get_attribute_value('body', 'endurance')
+        movement_rate = 2.0 + (endurance * 0.3)
+        
+        return hp_rate, mana_rate, movement_rate
+    
     def get_race_data(self):
         """Get full race data for this character"""
         if not self.race:
@@ -1,22 +1,37 @@
-from app.chat_db import chat_db
+from app.chat_db import chat_log_writer
+from app.chat_history import chat_history, GLOBAL_CHANNEL
 from datetime import datetime, timezone
 
 class ChatMessage:
     """Chat message model for storing player communications"""
     
-    def __init__(self, character_id, character_name, message):
+    def __init__(self, character_id, character_name, message, channel=GLOBAL_CHANNEL):
         self.character_id = character_id
         self.character_name = character_name
         self.message = message
+        self.channel = channel
         self.timestamp = datetime.now(timezone.utc)
         self.id = None
     
     def save(self):
-        """Save the chat message to the database"""
-        self.id = chat_db.add_message(
+        """Queue the chat message for the background log writer
+        
+        The id is assigned immediately; the row is committed with the next batch.
+        """
+        self.id = chat_log_writer.submit(
             self.character_id,
             self.character_name,
-            self.message
+            self.message,
+            self.timestamp,
+            self.channel
+        )
+        chat_history.record(
+            self.id,
+            self.character_id,
+            self.character_name,
+            self.message,
+            self.timestamp,
+            self.channel
         )
         return self
     
@@ -26,14 +41,20 @@ class ChatMessage:
             'id': self.id,
             'character_name': self.character_name,
             'message': self.message,
+            'channel': self.channel,
             'timestamp': self.timestamp.isoformat(),
             'formatted_timestamp': self.timestamp.strftime('%H:%M:%S')
         }
     
     @staticmethod
-    def get_recent(limit=50):
-        """Get recent chat messages"""
-        return chat_db.get_recent_messages(limit)
+    def get_recent(limit=50, channel=GLOBAL_CHANNEL, before_id=None):
+        """Get recent chat messages, oldest first"""
+        return chat_history.recent(channel, limit, before_id)
+    
+    @staticmethod
+    def get_recent_json(limit=50, channel=GLOBAL_CHANNEL, before_id=None):
+        """Get recent chat messages as a pre-serialized JSON array"""
+        return chat_history.recent_json(channel, limit, before_id)
     
     def __repr__(self):
         return f'<ChatMessage {self.id}: {self.character_name}: {self.message[:50]}...>'
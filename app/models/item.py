@@ -1,12 +1,15 @@
 from app import db
 from datetime import datetime
+import functools
 import json
+from sqlalchemy import event
 from app.models.item_constants import (
     ItemType, WeaponType, DamageType, MaterialType, 
-    QualityTier, SocketType, WearFlag, ItemFlag, ItemFlag2,
-    get_weapon_base_damage_type, get_weapon_base_speed,
+    QualityTier, SocketType, WearFlag, ItemFlag, ItemFlag2, ItemCategory,
+    get_item_category, get_weapon_base_damage_type, get_weapon_base_speed,
     get_material_weight_modifier, get_material_durability_modifier
 )
+from app.systems import item_templates
 
 class ItemTemplate(db.Model):
     """Template for items - defines base properties"""
@@ -81,8 +84,8 @@ class ItemTemplate(db.Model):
     max_enchantments = db.Column(db.Integer, default=0)  # How many enchantments can be applied
     enchantable = db.Column(db.Boolean, default=True)
     
-    # Relationships
-    items = db.relationship('Item', backref='template', lazy='dynamic')
+    # Relationships (Item.template resolves through the template registry instead)
+    items = db.relationship('Item', lazy='dynamic')
     
     def get_effective_weight(self):
         """Calculate weight with material modifier"""
@@ -116,6 +119,11 @@ class ItemTemplate(db.Model):
                 pass
         return DamageType.PHYSICAL.value
     
+    def get_category(self):
+        """ItemCategory bitmask for this template"""
+        return get_item_category(self.base_type, self.item_type, self.item_flags,
+                                 self.item_flags_2, self.wear_flags)
+    
     def has_flag(self, flag):
         """Check if template has a specific flag"""
         if isinstance(flag, str):
@@ -131,6 +139,30 @@ class ItemTemplate(db.Model):
     def __repr__(self):
         return f'<ItemTemplate {self.template_id}>'
 
+def memoized_stat(method):
+    """Cache a derived Item stat until the item's stats version changes
+    
+    The cache is keyed by the version counter that every socket, enchantment
+    and durability mutator bumps, plus the plain columns that feed the stats
+    (condition, quality, sharpness, balance, template). Results are shared
+    between calls, so callers must not modify them.
+    """
+    name = method.__name__
+    
+    @functools.wraps(method)
+    def wrapper(self):
+        key = (getattr(self, '_stats_version', 0), self.condition, self.quality_modifier,
+               self.sharpness, self.balance, self.template_id)
+        cache = getattr(self, '_stats_cache', None)
+        if cache is None or cache[0] != key:
+            cache = self._stats_cache = (key, {})
+        values = cache[1]
+        if name not in values:
+            values[name] = method(self)
+        return values[name]
+    
+    return wrapper
+
 class Item(db.Model):
     """Individual item instance"""
     __tablename__ = 'items'
@@ -185,6 +217,21 @@ class Item(db.Model):
     # Relationships
     contained_items = db.relationship('Item', backref=db.backref('container', remote_side=[id]), lazy='dynamic', foreign_keys=[container_id])
     
+    def invalidate_stats(self):
+        """Bump the stats version so memoized stats are recomputed"""
+        self._stats_version = getattr(self, '_stats_version', 0) + 1
+    
+    def stats_changed(self):
+        """Invalidate memoized stats and update the wearer's equipment totals"""
+        self.invalidate_stats()
+        from app.systems.stat_engine import get_stat_engine
+        get_stat_engine().item_changed(self)
+    
+    @property
+    def template(self):
+        """Read-only TemplateRecord for this item, from the in-memory registry"""
+        return item_templates.get_item_template_registry().get(self.template_id)
+    
     def get_display_name(self):
         """Get the display name including custom name and quality"""
         if self.custom_name:
@@ -209,9 +256,9 @@ class Item(db.Model):
         
         base_weight = self.template.get_effective_weight()
         
-        # Container weight reduction
+        # Container weight reduction (uses the eager-loaded container when present)
         if self.container_id:
-            container = Item.query.get(self.container_id)
+            container = self.container
             if container and container.template:
                 reduction = container.template.weight_reduction
                 base_weight *= (1.0 - reduction)
@@ -250,6 +297,7 @@ class Item(db.Model):
             })
         
         self.sockets = sockets
+        self.stats_changed()
     
     def socket_gem(self, socket_index, gem_item):
         """Socket a gem into this item"""
@@ -261,7 +309,7 @@ class Item(db.Model):
             return False, "Socket already filled"
         
         # Extract gem bonuses
-        gem_bonuses = gem_item.template.equipment_stats if gem_item.template else {}
+        gem_bonuses = item_templates.thaw(gem_item.template.equipment_stats) if gem_item.template else {}
         
         socket['filled'] = True
         socket['item_id'] = gem_item.id
@@ -271,6 +319,7 @@ class Item(db.Model):
         # Mark modified
         from sqlalchemy.orm.attributes import flag_modified
         flag_modified(self, 'sockets')
+        self.stats_changed()
         
         return True, "Gem socketed successfully"
     
@@ -293,6 +342,7 @@ class Item(db.Model):
         
         from sqlalchemy.orm.attributes import flag_modified
         flag_modified(self, 'sockets')
+        self.stats_changed()
         
         if destroy_gem:
             return None, "Gem destroyed"
@@ -326,9 +376,11 @@ class Item(db.Model):
         
         from sqlalchemy.orm.attributes import flag_modified
         flag_modified(self, 'enchantments')
+        self.stats_changed()
         
         return True, "Enchantment applied successfully"
     
+    @memoized_stat
     def get_effective_damage(self):
         """Calculate effective damage range with all modifiers"""
         if not self.template or not self.template.base_damage_min:
@@ -369,6 +421,7 @@ class Item(db.Model):
         
         return max(1, min_dmg), max(1, max_dmg)
     
+    @memoized_stat
     def get_damage_types(self):
         """Get all damage types this weapon deals"""
         if not self.is_weapon():
@@ -408,6 +461,7 @@ class Item(db.Model):
         
         return damage_types
     
+    @memoized_stat
     def get_attack_speed(self):
         """Get effective attack speed"""
         if not self.is_weapon() or not self.template:
@@ -427,6 +481,7 @@ class Item(db.Model):
         
         return base_speed
     
+    @memoized_stat
     def get_armor_class(self):
         """Get effective armor class"""
         if not self.template:
@@ -454,12 +509,13 @@ class Item(db.Model):
         
         return base_ac
     
+    @memoized_stat
     def get_damage_reduction(self):
         """Get damage reduction by type"""
         if not self.template:
             return {}
         
-        reduction = (self.template.damage_reduction or {}).copy()
+        reduction = item_templates.thaw(self.template.damage_reduction or {})
         
         # Add reductions from sockets
         if self.sockets:
@@ -480,12 +536,13 @@ class Item(db.Model):
         
         return reduction
     
+    @memoized_stat
     def get_effective_stats(self):
         """Get stats with quality and condition modifiers applied"""
         if not self.template or not self.template.equipment_stats:
             return {}
         
-        stats = self.template.equipment_stats.copy()
+        stats = item_templates.thaw(self.template.equipment_stats)
         condition_multiplier = self.condition / 100.0
         quality_multiplier = self.quality_modifier
         
@@ -538,7 +595,7 @@ class Item(db.Model):
         
         result = []
         for item_yield in base_yield:
-            yield_item = item_yield.copy()
+            yield_item = item_templates.thaw(item_yield)
             if 'quantity' in yield_item:
                 yield_item['quantity'] = max(1, int(yield_item['quantity'] * (1 + skill_bonus)))
             result.append(yield_item)
@@ -566,6 +623,7 @@ class Item(db.Model):
         
         self.current_durability = max(0, self.current_durability - amount)
         self.condition = int((self.current_durability / max_dur) * 100) if max_dur > 0 else 0
+        self.stats_changed()
         
         # Check for item breaking
         if self.current_durability <= 0:
@@ -590,43 +648,49 @@ class Item(db.Model):
         
         self.condition = int((self.current_durability / max_dur) * 100) if max_dur > 0 else 100
         self.last_repaired_at = datetime.utcnow()
+        self.stats_changed()
+    
+    def get_category(self):
+        """ItemCategory bitmask of this item's template (0 without a template)"""
+        template = self.template
+        return template.category if template is not None else 0
+    
+    def has_category(self, mask):
+        """Check if this item is in any of the ItemCategory bits in mask"""
+        return bool(self.get_category() & mask)
+    
+    @staticmethod
+    def filter_by_category(items, mask):
+        """Items from an iterable that are in any of the ItemCategory bits in mask"""
+        return [item for item in items if item.get_category() & mask]
     
     def is_equipment(self):
         """Check if this is equipment (weapon/armor/accessory/clothing)"""
-        if not self.template:
-            return False
-        base_type = self.template.base_type
-        return (base_type.startswith('weapon.') or 
-                base_type.startswith('armor.') or 
-                base_type.startswith('accessory.') or
-                base_type.startswith('clothing.'))
+        return self.has_category(ItemCategory.EQUIPMENT)
     
     def is_weapon(self):
         """Check if this is a weapon"""
-        return self.template and self.template.base_type.startswith('weapon.')
+        return self.has_category(ItemCategory.WEAPON)
     
     def is_armor(self):
         """Check if this is armor"""
-        return self.template and self.template.base_type.startswith('armor.')
+        return self.has_category(ItemCategory.ARMOR)
     
     def is_consumable(self):
         """Check if this is a consumable"""
-        return self.template and self.template.base_type.startswith('consumable.')
+        return self.has_category(ItemCategory.CONSUMABLE)
     
     def is_clothing(self):
         """Check if this is clothing"""
-        return self.template and self.template.base_type.startswith('clothing.')
+        return self.has_category(ItemCategory.CLOTHING)
     
     def is_container(self):
         """Check if this is a container"""
-        return self.template and (
-            self.template.base_type == 'container' or 
-            self.template.item_type == ItemType.CONTAINER
-        )
+        return self.has_category(ItemCategory.CONTAINER)
     
     def is_key(self):
         """Check if this is a key"""
-        return self.template and self.template.base_type == 'key'
+        return self.has_category(ItemCategory.KEY)
     
     def can_unlock_door(self, door_data):
         """Check if this key can unlock a specific door"""
@@ -643,3 +707,13 @@ class Item(db.Model):
     
     def __repr__(self):
         return f'<Item {self.name} (ID: {self.id})>'
+
+# Whole-value assignments and reloads from the database also invalidate stats
+@event.listens_for(Item.sockets, 'set')
+@event.listens_for(Item.enchantments, 'set')
+def _stats_attribute_set(item, value, oldvalue, initiator):
+    item.invalidate_stats()
+
+@event.listens_for(Item, 'refresh')
+def _stats_item_refreshed(item, context, attrs):
+    item.invalidate_stats()
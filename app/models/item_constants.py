@@ -3,7 +3,7 @@ Item constants and enums based on traditional MUD item system.
 Defines item types, flags, wear positions, weapon types, and damage types.
 """
 
-from enum import IntEnum, Enum
+from enum import IntEnum, IntFlag, Enum
 
 
 # ============================================================================
@@ -214,6 +214,66 @@ class WearFlag(Enum):
     TWO_HANDED = "two_handed"
 
 
+# ============================================================================
+# Item Categories
+# ============================================================================
+
+class ItemCategory(IntFlag):
+    """Category bits derived once per template from its base type, item type and flags"""
+    NONE = 0
+    WEAPON = 1 << 0
+    ARMOR = 1 << 1
+    CLOTHING = 1 << 2
+    ACCESSORY = 1 << 3
+    CONSUMABLE = 1 << 4
+    CONTAINER = 1 << 5
+    KEY = 1 << 6
+    TAKEABLE = 1 << 7  # WearFlag.TAKE
+    WEARABLE = 1 << 8  # Any wear slot besides TAKE
+    MAGIC = 1 << 9
+    CURSED = 1 << 10
+    NODROP = 1 << 11
+    QUEST_ITEM = 1 << 12
+
+    EQUIPMENT = WEAPON | ARMOR | CLOTHING | ACCESSORY
+
+
+# base_type prefixes and the category each one sets
+BASE_TYPE_CATEGORIES = (
+    ('weapon.', ItemCategory.WEAPON),
+    ('armor.', ItemCategory.ARMOR),
+    ('clothing.', ItemCategory.CLOTHING),
+    ('accessory.', ItemCategory.ACCESSORY),
+    ('consumable.', ItemCategory.CONSUMABLE),
+)
+
+# Item flags (either set) and the category each one sets
+FLAG_CATEGORIES = {
+    ItemFlag.MAGIC.value: ItemCategory.MAGIC,
+    ItemFlag.CURSED.value: ItemCategory.CURSED,
+    ItemFlag.NODROP.value: ItemCategory.NODROP,
+    ItemFlag2.QUEST_ITEM.value: ItemCategory.QUEST_ITEM,
+}
+
+
+def get_item_category(base_type, item_type=None, item_flags=(), item_flags_2=(), wear_flags=()) -> int:
+    """Compute the ItemCategory bitmask for a template's fields"""
+    base_type = base_type or ''
+    category = ItemCategory.NONE
+    for prefix, bit in BASE_TYPE_CATEGORIES:
+        if base_type.startswith(prefix):
+            category |= bit
+    if base_type == 'container' or item_type == ItemType.CONTAINER:
+        category |= ItemCategory.CONTAINER
+    if base_type == 'key':
+        category |= ItemCategory.KEY
+    for flag in list(item_flags or ()) + list(item_flags_2 or ()):
+        category |= FLAG_CATEGORIES.get(flag, ItemCategory.NONE)
+    for slot in wear_flags or ():
+        category |= ItemCategory.TAKEABLE if slot == WearFlag.TAKE.value else ItemCategory.WEARABLE
+    return int(category)
+
+
 # ============================================================================
 # Weapon Types
 # ============================================================================
@@ -60,6 +60,7 @@ class NPC(db.Model):
     faction = db.Column(db.String(50), nullable=True)
     reputation_required = db.Column(db.Integer, default=0)  # Minimum reputation to interact
     is_unique = db.Column(db.Boolean, default=False)  # Cannot respawn if killed
+    died_at = db.Column(db.DateTime, nullable=True, index=True)  # Set on death, cleared on respawn
     
     # Relationships
     inventory = db.relationship('Item', backref='owner_npc', lazy='dynamic', 
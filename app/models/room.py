@@ -26,6 +26,29 @@ class Area(db.Model):
     def __repr__(self):
         return f'<Area {self.name}>'
 
+class WorldVersion(db.Model):
+    """Single-row counter bumped on every world edit so other processes reload"""
+    __tablename__ = 'world_version'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<WorldVersion {self.version}>'
+
+class RoomItemRespawn(db.Model):
+    """A taken room spawn item waiting to respawn; kept so restarts keep the timer"""
+    __tablename__ = 'room_item_respawns'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    room_id = db.Column(db.Integer, db.ForeignKey('rooms.id'), nullable=False, index=True)
+    template_id = db.Column(db.String(100), nullable=False)  # ItemTemplate.template_id
+    due_at = db.Column(db.DateTime, nullable=False)
+    
+    def __repr__(self):
+        return f'<RoomItemRespawn {self.template_id} in {self.room_id} at {self.due_at}>'
+
 class Room(db.Model):
     """Individual room model"""
     __tablename__ = 'rooms'
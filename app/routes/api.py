@@ -1,9 +1,17 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
+from sqlalchemy import or_
+from sqlalchemy.orm import joinedload
 from app import db
 from app.models.character import Character
 from app.models.item import Item, ItemTemplate
+from app.models.item_constants import ItemCategory
 from app.models.room import Room
+from app.systems.world_graph import get_world_graph
+from app.systems.character_state import get_character_state_store
+from app.systems.session_registry import get_session_registry
+from app.systems.stat_engine import get_stat_engine
+from app.systems.vitals import sync_derived_vitals
 
 api_bp = Blueprint('api', __name__)
 
@@ -21,11 +29,19 @@ def get_inventory(character_id):
     bag_slots_data = {}
     total_slots = 20  # Base inventory slots
     
+    # One query for the character's items, its quick-slot bags and their
+    # containers; templates come from the in-memory registry
+    bag_ids = [bag_slots[str(slot_num)] for slot_num in range(5) if bag_slots.get(str(slot_num))]
+    items = Item.query.options(joinedload(Item.container)).filter(
+        or_(Item.owner_character_id == character.id, Item.id.in_(bag_ids))
+    ).order_by(Item.id).all()
+    items_by_id = {item.id: item for item in items}
+    
     # Process equipped bags in quick slots
     for slot_num in range(5):
         slot_key = str(slot_num)
         if slot_key in bag_slots and bag_slots[slot_key]:
-            bag_item = Item.query.get(bag_slots[slot_key])
+            bag_item = items_by_id.get(bag_slots[slot_key])
             if bag_item and bag_item.template:
                 bag_slots_data[slot_num] = {
                     'id': bag_item.id,
@@ -41,11 +57,15 @@ def get_inventory(character_id):
             bag_slots_data[slot_num] = None
     
     inventory = []
-    for item in character.inventory:
+    for item in items:
+        if item.owner_character_id != character.id:
+            continue
         # Skip equipped items - they appear in equipment slots, not inventory
         if item.equipped_character_id == character.id:
             continue
-            
+        
+        # One bitmask answers every category question for the item
+        category = item.get_category()
         item_data = {
             'id': item.id,
             'name': item.get_display_name(),
@@ -53,27 +73,27 @@ def get_inventory(character_id):
             'condition': item.condition,
             'weight': item.get_effective_weight(),
             'is_equipped': False,  # Already filtered out equipped items
-            'is_equipment': item.is_equipment(),
-            'is_weapon': item.is_weapon(),
-            'is_armor': item.is_armor(),
-            'is_consumable': item.is_consumable(),
-            'is_container': item.is_container(),
+            'is_equipment': bool(category & ItemCategory.EQUIPMENT),
+            'is_weapon': bool(category & ItemCategory.WEAPON),
+            'is_armor': bool(category & ItemCategory.ARMOR),
+            'is_consumable': bool(category & ItemCategory.CONSUMABLE),
+            'is_container': bool(category & ItemCategory.CONTAINER),
             'icon_path': item.template.icon_path if item.template and item.template.icon_path else None,
             'quality_tier': item.template.quality_tier if item.template else 'common',
         }
         
         # Add container info if applicable
-        if item.is_container() and item.template:
+        if category & ItemCategory.CONTAINER:
             item_data['container_slots'] = item.template.container_capacity
         
         # Add weapon stats if applicable
-        if item.is_weapon():
+        if category & ItemCategory.WEAPON:
             min_dmg, max_dmg = item.get_effective_damage()
             item_data['damage'] = f"{min_dmg}-{max_dmg}" if min_dmg else "N/A"
             item_data['attack_speed'] = item.get_attack_speed()
         
         # Add armor stats if applicable
-        if item.is_armor():
+        if category & ItemCategory.ARMOR:
             item_data['armor_class'] = item.get_armor_class()
         
         inventory.append(item_data)
@@ -106,10 +126,11 @@ def get_equipment(character_id):
     for slot in slots:
         equipment[slot] = None
     
-    # Get equipped items
-    for item in character.equipped_items:
+    # Get equipped items (and their containers) in one query
+    for item in character.equipped_items.options(joinedload(Item.container)):
         slot = item.equipped_slot
         if slot and slot in equipment:
+            category = item.get_category()
             item_data = {
                 'id': item.id,
                 'name': item.get_display_name(),
@@ -117,19 +138,19 @@ def get_equipment(character_id):
                 'condition': item.condition,
                 'weight': item.get_effective_weight(),
                 'slot': slot,
-                'is_weapon': item.is_weapon(),
-                'is_armor': item.is_armor(),
+                'is_weapon': bool(category & ItemCategory.WEAPON),
+                'is_armor': bool(category & ItemCategory.ARMOR),
                 'icon_path': item.template.icon_path if item.template and item.template.icon_path else None,
             }
             
             # Add weapon stats if applicable
-            if item.is_weapon():
+            if category & ItemCategory.WEAPON:
                 min_dmg, max_dmg = item.get_effective_damage()
                 item_data['damage'] = f"{min_dmg}-{max_dmg}" if min_dmg else "N/A"
                 item_data['attack_speed'] = item.get_attack_speed()
             
             # Add armor stats if applicable
-            if item.is_armor():
+            if category & ItemCategory.ARMOR:
                 item_data['armor_class'] = item.get_armor_class()
             
             equipment[slot] = item_data
@@ -162,6 +183,7 @@ def equip_item(character_id, item_id):
         target_slot = item.template.armor_slot
     
     # Unequip any item currently in the same slot
+    existing_item = None
     if target_slot:
         existing_item = Item.query.filter_by(
             equipped_character_id=character.id,
@@ -174,9 +196,17 @@ def equip_item(character_id, item_id):
     # Equip the new item
     item.equipped_character_id = character.id
     item.equipped_slot = target_slot
+    db.session.commit()
+    
+    # Bonus totals only change once the swap is committed
+    stat_engine = get_stat_engine()
+    if existing_item:
+        stat_engine.unequip(character, existing_item)
+    stat_engine.equip(character, item)
     
     # Recalculate character stats with new equipment
     character.calculate_derived_stats()
+    sync_derived_vitals(character)
     
     db.session.commit()
     
@@ -203,14 +233,50 @@ def unequip_item(character_id, item_id):
     
     item.equipped_character_id = None
     item.equipped_slot = None
+    db.session.commit()
+    get_stat_engine().unequip(character, item)
     
     # Recalculate character stats without this equipment
     character.calculate_derived_stats()
+    sync_derived_vitals(character)
     
     db.session.commit()
     
     return jsonify({'success': True, 'message': f'Unequipped {item.name}'})
 
+@api_bp.route('/presence')
+@login_required
+def get_presence():
+    """Get counts of connected players and characters"""
+    return jsonify(get_session_registry().presence())
+
+@api_bp.route('/admin/chat/search')
+@login_required
+def search_chat_archive():
+    """Search archived chat (admins only)
+    
+    Query args: q (keywords), character (name), character_id, channel,
+    start and end (ISO datetimes), limit.
+    """
+    if not current_user.is_admin:
+        return jsonify({'error': 'Admin access required'}), 403
+    
+    from app.chat_archive import chat_archive
+    try:
+        results = chat_archive.search(
+            keyword=request.args.get('q'),
+            character_id=request.args.get('character_id', type=int),
+            character_name=request.args.get('character'),
+            channel=request.args.get('channel'),
+            start=request.args.get('start'),
+            end=request.args.get('end'),
+            limit=max(1, min(request.args.get('limit', 100, type=int), 1000))
+        )
+    except ValueError as e:
+        return jsonify({'error': f'Invalid search: {e}'}), 400
+    
+    return jsonify({'results': results, 'count': len(results)})
+
 @api_bp.route('/room/<int:room_id>')
 @login_required
 def get_room(room_id):
@@ -219,7 +285,7 @@ def get_room(room_id):
     
     # Get characters in room
     characters = []
-    for char in room.get_characters_in_room():
+    for char in Character.query.filter(get_character_state_store().in_room_clause(room.id)):
         if char.id != current_user.id:  # Don't include self
             characters.append({
                 'id': char.id,
@@ -259,24 +325,27 @@ def move_character(character_id, direction):
         player_id=current_user.id
     ).first_or_404()
     
-    if not character.current_room:
+    world = get_world_graph()
+    room = world.get_room(character.current_room_id)
+    if not room:
         return jsonify({'error': 'Character not in a room'}), 400
     
-    target_room_id = character.current_room.get_exit_room(direction)
+    target_room_id, exit_key = room.resolve_exit(direction)
     if not target_room_id:
         return jsonify({'error': f'No exit to the {direction}'}), 400
     
-    target_room = Room.query.filter_by(room_id=target_room_id).first()
+    target_room = world.get_room_by_room_id(target_room_id)
     if not target_room:
         return jsonify({'error': 'Target room not found'}), 400
     
-    # Move character
-    character.current_room_id = target_room.id
-    character.x_coord = target_room.x_coord
-    character.y_coord = target_room.y_coord
-    character.z_coord = target_room.z_coord
-    
-    db.session.commit()
+    # Move character (written back by the character state flusher)
+    get_character_state_store().update(
+        character,
+        current_room_id=target_room.id,
+        x_coord=target_room.x_coord,
+        y_coord=target_room.y_coord,
+        z_coord=target_room.z_coord
+    )
     
     return jsonify({
         'success': True,
@@ -75,6 +75,18 @@ def register():
 @login_required
 def logout():
     """User logout"""
+    # Write back any characters still held by the write-behind store
+    from app.systems.character_state import get_character_state_store
+    from app.systems.combat import get_combat_engine
+    from app.systems.vitals import get_vitals_store
+    store = get_character_state_store()
+    vitals = get_vitals_store()
+    combat = get_combat_engine()
+    for character in current_user.characters:
+        combat.end_fights(character.id)
+        # Syncs its vitals first; regen stops with the character offline
+        vitals.remove(character.id)
+        store.release(character.id)
     logout_user()
     flash('You have been logged out', 'info')
     return redirect(url_for('auth.login'))
@@ -1,17 +1,24 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+import json
+from flask import Blueprint, Response, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
 from app import db
 from app.models.character import Character
 from app.models.room import Room
 from app.models.chat_message import ChatMessage
-from app.models.item import Item, ItemTemplate
+from app.models.item import Item
+from app.systems.world_graph import get_world_graph
+from app.systems.minimap_push import MINIMAP_RADIUS
+from app.systems.character_state import get_character_state_store
+from app.systems.combat import get_combat_engine
+from app.systems.item_templates import get_item_template_registry
+from app.systems.vitals import get_vitals_store, sync_derived_vitals
 from app.utils.race_loader import apply_racial_bonuses, get_racial_skills, get_racial_skill_bonuses, get_all_race_data
 
 game_bp = Blueprint('game', __name__)
 
 def get_starting_village_location():
     """Get the starting village room and coordinates"""
-    starting_room = Room.query.filter_by(room_id='room_001').first()
+    starting_room = get_world_graph().get_room_by_room_id('room_001')
     if starting_room:
         return starting_room, starting_room.x_coord, starting_room.y_coord, starting_room.z_coord
     # Default fallback to (0, 0, 0) if room not found
@@ -22,8 +29,9 @@ def give_starting_items(character):
     # Starting items: 2 potions and 1 cloth belt
     starting_item_templates = ['minor_health_potion', 'minor_mana_potion', 'cloth_belt']
     
+    templates = get_item_template_registry()
     for template_id in starting_item_templates:
-        template = ItemTemplate.query.filter_by(template_id=template_id).first()
+        template = templates.get_by_template_id(template_id)
         if template:
             item = Item(
                 template_id=template.id,
@@ -40,42 +48,40 @@ def give_starting_items(character):
     
     db.session.commit()
 
+def place_character(character, room_pk, x, y, z):
+    """Set a character's location, going through the state store if it is live"""
+    store = get_character_state_store()
+    if store.is_tracked(character.id):
+        store.update(character, current_room_id=room_pk, x_coord=x, y_coord=y, z_coord=z)
+        return
+    character.x_coord = x
+    character.y_coord = y
+    character.z_coord = z
+    if room_pk is not None:
+        character.current_room_id = room_pk
+    db.session.commit()
+
 def validate_character_location(character):
     """Validate character location and reset to starting village if invalid"""
     # Check if character has coordinates
     if character.x_coord is None or character.y_coord is None or character.z_coord is None:
         # Set to starting village
         room, x, y, z = get_starting_village_location()
-        character.x_coord = x
-        character.y_coord = y
-        character.z_coord = z
-        if room:
-            character.current_room_id = room.id
-        db.session.commit()
+        place_character(character, room.id if room else None, x, y, z)
         return True
     
     # Check if room exists at character's coordinates
-    room = Room.query.filter_by(
-        x_coord=character.x_coord,
-        y_coord=character.y_coord,
-        z_coord=character.z_coord
-    ).first()
+    room = get_world_graph().get_room_at(character.x_coord, character.y_coord, character.z_coord)
     
     if not room:
         # Room doesn't exist, move to starting village
         room, x, y, z = get_starting_village_location()
-        character.x_coord = x
-        character.y_coord = y
-        character.z_coord = z
-        if room:
-            character.current_room_id = room.id
-        db.session.commit()
+        place_character(character, room.id if room else None, x, y, z)
         return True
     
     # Update current_room_id to match coordinates
     if character.current_room_id != room.id:
-        character.current_room_id = room.id
-        db.session.commit()
+        place_character(character, room.id, room.x_coord, room.y_coord, room.z_coord)
     
     return False
 
@@ -153,6 +159,14 @@ def play_character(character_id):
 @login_required
 def logout_character():
     """Logout character and return to account screen"""
+    store = get_character_state_store()
+    vitals = get_vitals_store()
+    combat = get_combat_engine()
+    for character in current_user.characters:
+        combat.end_fights(character.id)
+        # Syncs its vitals first; regen stops with the character offline
+        vitals.remove(character.id)
+        store.release(character.id)
     flash('Character logged out', 'info')
     return redirect(url_for('game.index'))
 
@@ -285,6 +299,7 @@ def delete_character(character_id):
     ).first_or_404()
     
     character_name = character.name
+    get_character_state_store().discard(character.id)
     db.session.delete(character)
     db.session.commit()
     
@@ -334,6 +349,7 @@ def update_attributes(character_id):
     character.set_attribute_value(prime_attr, sub_attr, value)
     character.trial_points -= cost
     character.calculate_derived_stats()
+    sync_derived_vitals(character)
     
     db.session.commit()
     
@@ -346,73 +362,61 @@ def update_attributes(character_id):
 @game_bp.route('/api/chat/recent', methods=['GET'])
 @login_required
 def get_recent_chat():
-    """Get recent chat messages"""
-    limit = request.args.get('limit', 50, type=int)
-    
-    # Get recent chat messages from chat database
-    messages = ChatMessage.get_recent(limit)
-    
-    return jsonify({
-        'success': True,
-        'messages': messages
-    })
+    """Get recent chat messages
+    
+    Query args: limit, channel ('global', 'local:<room id>' or
+    'whisper:<id>:<id>') and before (message id, to page further back).
+    """
+    limit = max(0, min(request.args.get('limit', 50, type=int), 200))
+    channel = request.args.get('channel', 'global')
+    before_id = request.args.get('before', type=int)
+    
+    # Whisper history is only visible to the two participants
+    if channel.startswith('whisper:'):
+        participants = channel.split(':')[1:]
+        own_ids = {str(character.id) for character in current_user.characters}
+        if not own_ids.intersection(participants):
+            return jsonify({'success': False, 'error': 'Not allowed'}), 403
+    
+    # Served from the in-memory ring buffer as pre-serialized JSON
+    messages_json = ChatMessage.get_recent_json(limit, channel, before_id)
+    return Response('{"success": true, "messages": ' + messages_json + '}',
+                    mimetype='application/json')
 
 @game_bp.route('/api/minimap/<int:character_id>', methods=['GET'])
 @login_required
 def get_minimap_data(character_id):
-    """Get nearby rooms for minimap display"""
-    # Expire all objects in session to force fresh data from database
-    db.session.expire_all()
+    """Get nearby rooms for minimap display (cold start; updates arrive as minimap_delta)
     
+    Rooms come from the world graph's spatial index. The response carries an
+    ETag built from the versions of the tiles in view, so repeat requests for
+    an unchanged view are answered with 304 Not Modified.
+    """
     character = Character.query.filter_by(
         id=character_id, 
         player_id=current_user.id
     ).first_or_404()
     
-    print(f"[MINIMAP API] Getting minimap for character {character.name} (ID: {character_id})")
-    print(f"[MINIMAP API] Character coordinates from DB: ({character.x_coord}, {character.y_coord}, {character.z_coord})")
-    print(f"[MINIMAP API] Character current_room_id: {character.current_room_id}")
-    
     # Get character's current position
     char_x = character.x_coord or 0
     char_y = character.y_coord or 0
     char_z = character.z_coord or 0
     
-    print(f"[MINIMAP API] Using coordinates: ({char_x}, {char_y}, {char_z})")
-    
-    # Get nearby rooms (5 units in each direction)
-    nearby_range = 5
-    nearby_rooms = Room.query.filter(
-        Room.x_coord.between(char_x - nearby_range, char_x + nearby_range),
-        Room.y_coord.between(char_y - nearby_range, char_y + nearby_range),
-        Room.z_coord == char_z
-    ).all()
-    
-    print(f"[MINIMAP API] Found {len(nearby_rooms)} nearby rooms")
-    
-    # Format room data for minimap
-    rooms_data = []
-    for room in nearby_rooms:
-        rooms_data.append({
-            'id': room.id,
-            'room_id': room.room_id,
-            'name': room.name,
-            'x': room.x_coord,
-            'y': room.y_coord,
-            'z': room.z_coord,
-            'exits': room.exits or {}
-        })
-    
-    response_data = {
-        'success': True,
-        'rooms': rooms_data,
-        'player_position': {
-            'x': char_x,
-            'y': char_y,
-            'z': char_z
-        }
-    }
+    # Get nearby rooms (MINIMAP_RADIUS units in each direction)
+    nearby_range = MINIMAP_RADIUS
+    world = get_world_graph()
+    world.ensure_loaded()
+    spatial_index = world.spatial_index
     
-    print(f"[MINIMAP API] Returning player position: ({char_x}, {char_y}, {char_z})")
-    
-    return jsonify(response_data)
\ No newline at end of file
+    etag = spatial_index.minimap_etag(char_x, char_y, char_z, nearby_range)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        player_position = json.dumps({'x': char_x, 'y': char_y, 'z': char_z})
+        rooms_json = spatial_index.minimap_rooms_json(char_x, char_y, char_z, nearby_range)
+        body = f'{{"success": true, "rooms": {rooms_json}, "player_position": {player_position}}}'
+        response = Response(body, mimetype='application/json')
+    
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
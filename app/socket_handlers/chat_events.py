@@ -1,7 +1,11 @@
+from flask import request
 from flask_socketio import emit, join_room, leave_room
 from flask_login import current_user
-from app import db
 from app.models.character import Character
+from app.models.chat_message import ChatMessage
+from app.chat_history import GLOBAL_CHANNEL, local_channel, whisper_channel
+from app.systems.session_registry import get_session_registry
+from app.systems.chat_broadcast import get_chat_broadcaster
 
 def register_chat_events(socketio):
     """Register chat-related socket events"""
@@ -22,10 +26,10 @@ def register_chat_events(socketio):
         
         # Join appropriate chat room
         if channel == 'global':
-            join_room('chat_global')
+            get_chat_broadcaster().join(request.sid, character.player.censor_enabled)
         elif channel == 'local':
-            if character.current_room:
-                room_name = f"chat_room_{character.current_room.id}"
+            if character.current_room_id:
+                room_name = f"chat_room_{character.current_room_id}"
                 join_room(room_name)
         elif channel == 'guild':
             # TODO: Implement guild system
@@ -55,18 +59,23 @@ def register_chat_events(socketio):
             emit('error', {'message': 'Empty message'})
             return
         
-        # Emit message to appropriate channel
+        # Log the message to its history channel and emit it
         if channel == 'global':
-            emit('chat_message', {
+            chat_message = ChatMessage(character.id, character.name, message, GLOBAL_CHANNEL).save()
+            get_chat_broadcaster().broadcast({
+                'id': chat_message.id,
                 'character_name': character.name,
                 'message': message,
                 'channel': 'global',
                 'timestamp': get_timestamp()
-            }, room='chat_global')
+            })
         elif channel == 'local':
-            if character.current_room:
-                room_name = f"chat_room_{character.current_room.id}"
+            if character.current_room_id:
+                chat_message = ChatMessage(character.id, character.name, message,
+                                           local_channel(character.current_room_id)).save()
+                room_name = f"chat_room_{character.current_room_id}"
                 emit('chat_message', {
+                    'id': chat_message.id,
                     'character_name': character.name,
                     'message': message,
                     'channel': 'local',
@@ -75,14 +84,23 @@ def register_chat_events(socketio):
         elif channel == 'whisper':
             target_name = data.get('target')
             if target_name:
-                # TODO: Implement whisper system
-                emit('chat_message', {
+                target = Character.query.filter_by(name=target_name).first()
+                if not target:
+                    emit('error', {'message': f'No one named {target_name} exists.'})
+                    return
+                chat_message = ChatMessage(character.id, character.name, message,
+                                           whisper_channel(character.id, target.id)).save()
+                whisper = {
+                    'id': chat_message.id,
                     'character_name': character.name,
                     'message': message,
                     'channel': 'whisper',
-                    'target': target_name,
+                    'target': target.name,
                     'timestamp': get_timestamp()
-                })
+                }
+                emit('chat_message', whisper)
+                for sid in get_session_registry().sids_for_character(target.id):
+                    emit('chat_message', whisper, to=sid)
     
     @socketio.on('leave_chat')
     def handle_leave_chat(data):
@@ -98,22 +116,19 @@ def register_chat_events(socketio):
         
         # Leave appropriate chat room
         if channel == 'global':
-            leave_room('chat_global')
+            get_chat_broadcaster().leave(request.sid)
         elif channel == 'local':
-            if character.current_room:
-                room_name = f"chat_room_{character.current_room.id}"
+            if character.current_room_id:
+                room_name = f"chat_room_{character.current_room_id}"
                 leave_room(room_name)
         
         emit('chat_left', {'channel': channel})
 
 def get_current_character():
-    """Get the current user's active character (simplified for now)"""
+    """Get the character this connection joined the game with"""
     if not current_user.is_authenticated:
         return None
-    
-    # For now, return the first character
-    # Later we'll implement character selection
-    return current_user.characters.first()
+    return get_session_registry().resolve(request.sid)
 
 def get_timestamp():
     """Get current timestamp for chat messages"""
@@ -1,13 +1,28 @@
+import time
+from flask import request
 from flask_socketio import emit, join_room, leave_room
 from flask_login import current_user
-from app import db
 from app.models.character import Character
-from app.models.room import Room
-from app.systems.commands import CommandProcessor
+from app.models.item import Item
+from app.systems.commands import get_command_processor
+from app.systems.world_graph import get_world_graph
+from app.systems.minimap_push import get_minimap_push
+from app.systems.character_state import get_character_state_store
+from app.systems.session_registry import get_session_registry
+from app.systems.command_queue import get_command_queue, QueueFullError
+from app.systems.room_broadcast import get_room_broadcaster
+from app.systems.ownership import get_character_ownership
+from app.systems.chat_broadcast import get_chat_broadcaster
+from app.systems.stat_engine import get_stat_engine
+from app.systems.vitals import get_vitals_store
+from app.systems.combat import get_combat_engine
 
 def register_game_events(socketio):
     """Register game-related socket events"""
     
+    # Push map builder edits to clients whose minimap shows them
+    get_world_graph().add_listener(get_minimap_push().on_room_changed)
+    
     @socketio.on('connect')
     def handle_connect():
         """Handle client connection"""
@@ -20,11 +35,22 @@ def register_game_events(socketio):
     @socketio.on('disconnect')
     def handle_disconnect():
         """Handle client disconnection"""
-        if current_user.is_authenticated:
+        get_minimap_push().unsubscribe(request.sid)
+        registry = get_session_registry()
+        entry = registry.unregister(request.sid)
+        if entry:
+            store = get_character_state_store()
             # Leave all rooms
-            character = get_current_character()
-            if character and character.current_room:
-                leave_room(f"room_{character.current_room.id}")
+            room_id = store.get(entry.character_id, 'current_room_id')
+            if room_id:
+                leave_room(f"room_{room_id}")
+            if not registry.sids_for_character(entry.character_id):
+                # Write the character's live state back before it goes idle
+                get_combat_engine().end_fights(entry.character_id)
+                get_vitals_store().remove(entry.character_id)
+                store.release(entry.character_id)
+                get_stat_engine().discard(entry.character_id)
+                get_character_ownership().release(entry.character_id)
     
     @socketio.on('join_game')
     def handle_join_game(data):
@@ -47,18 +73,44 @@ def register_game_events(socketio):
             emit('error', {'message': 'Character not found'})
             return
         
+        # Another server process may already be running this character
+        if not get_character_ownership().acquire(character.id):
+            emit('error', {'message': 'This character is already in the game elsewhere.'})
+            return
+        
+        get_character_state_store().attach(character)
+        registry = get_session_registry()
+        registry.register(request.sid, character)
+        character = registry.resolve(request.sid)
+        
+        # Regeneration runs on the vitals arrays while the character is online
+        vitals = get_vitals_store()
+        vitals.add(character)
+        
         # Join character's current room
-        if character.current_room:
-            room_name = f"room_{character.current_room.id}"
+        room = get_world_graph().get_room(character.current_room_id)
+        if room:
+            room_name = f"room_{room.id}"
             join_room(room_name)
             emit('joined_room', {
-                'room_id': character.current_room.id,
-                'room_name': character.current_room.name
+                'room_id': room.id,
+                'room_name': room.name
             })
         
+        # Global chat arrives pre-censored according to the player's setting
+        get_chat_broadcaster().join(request.sid, character.player.censor_enabled)
+        
+        # Send the initial minimap; later changes arrive as deltas
+        get_minimap_push().subscribe(
+            request.sid, character.id,
+            (character.x_coord or 0, character.y_coord or 0, character.z_coord or 0)
+        )
+        
         emit('game_joined', {
             'character_id': character.id,
-            'character_name': character.name
+            'character_name': character.name,
+            'presence': registry.presence(),
+            'vitals': vitals.get(character.id)
         })
     
     @socketio.on('game_command')
@@ -73,57 +125,20 @@ def register_game_events(socketio):
             emit('error', {'message': 'Empty command'})
             return
         
-        character = get_current_character()
-        if not character:
+        entry = get_session_registry().get(request.sid)
+        if not entry:
             emit('error', {'message': 'No active character'})
             return
         
-        # Refresh character from database to ensure we have latest state
-        db.session.refresh(character)
-        
-        # Process command
-        processor = CommandProcessor()
-        result = processor.process_command(character, command)
-        
-        print(f"[SOCKET] Command: {command}")
-        print(f"[SOCKET] Result keys: {result.keys() if result else 'None'}")
-        print(f"[SOCKET] Result action: {result.get('action', 'NOT SET') if result else 'NO RESULT'}")
-        print(f"[SOCKET] Full result: {result}")
-        
-        # Refresh character to get latest coordinates after command execution
-        db.session.refresh(character)
-        
-        # Add character coordinates to result for immediate client-side update
-        result['character_position'] = {
-            'x': character.x_coord,
-            'y': character.y_coord,
-            'z': character.z_coord
-        }
-        
-        print(f"[SOCKET] Character position after command: ({character.x_coord}, {character.y_coord}, {character.z_coord})")
-        
-        # Emit result to client
-        emit('command_result', {
-            'command': command,
-            'result': result
-        })
-        
-        # If command affected room state, notify other players in room
-        if character.current_room and result.get('affects_room'):
-            room_name = f"room_{character.current_room.id}"
-            emit('room_update', {
-                'character_id': character.id,
-                'character_name': character.name,
-                'action': result.get('action'),
-                'message': result.get('room_message')
-            }, room=room_name, include_self=False)
-        
-        # If command was chat, emit chat message to all players
-        if result.get('action') == 'chat' and result.get('chat_message'):
-            # Add player's censor preference to the message
-            chat_data = result['chat_message'].copy()
-            chat_data['player_censor_enabled'] = character.player.censor_enabled
-            emit('chat_message', chat_data, broadcast=True)
+        # Commands run on the worker pool, in order per character
+        sid = request.sid
+        try:
+            get_command_queue().submit(
+                entry.character_id,
+                lambda job: run_game_command(socketio, sid, command, job)
+            )
+        except QueueFullError:
+            emit('error', {'message': 'You are sending commands too quickly. Slow down!'})
     
     @socketio.on('request_room_info')
     def handle_request_room_info():
@@ -133,15 +148,14 @@ def register_game_events(socketio):
             return
         
         character = get_current_character()
-        if not character or not character.current_room:
+        room = get_world_graph().get_room(character.current_room_id) if character else None
+        if not room:
             emit('error', {'message': 'Not in a room'})
             return
         
-        room = character.current_room
-        
         # Get other characters in room
         other_characters = []
-        for char in room.get_characters_in_room():
+        for char in Character.query.filter(get_character_state_store().in_room_clause(room.id)):
             if char.id != character.id:
                 other_characters.append({
                     'id': char.id,
@@ -151,7 +165,7 @@ def register_game_events(socketio):
         
         # Get items in room
         room_items = []
-        for item in room.get_items_in_room():
+        for item in Item.query.filter_by(room_id=room.id):
             room_items.append({
                 'id': item.id,
                 'name': item.name,
@@ -171,11 +185,73 @@ def register_game_events(socketio):
             'items': room_items
         })
 
+def run_game_command(socketio, sid, command, job):
+    """Execute a queued game command and emit its results (runs on a command worker)"""
+    character = get_session_registry().resolve(sid)
+    if not character:
+        socketio.emit('error', {'message': 'No active character'}, to=sid)
+        return
+    if not get_character_ownership().owns(character.id):
+        socketio.emit('error', {'message': 'This character is being run by another server.'}, to=sid)
+        return
+    
+    old_room_id = character.current_room_id
+    result = get_command_processor().process_command(character, command)
+    
+    # Add character coordinates to result for immediate client-side update
+    result['character_position'] = {
+        'x': character.x_coord,
+        'y': character.y_coord,
+        'z': character.z_coord
+    }
+    
+    # Push minimap changes if the move brought new rooms into view
+    if result.get('action') == 'move':
+        get_minimap_push().move(sid, (
+            result['character_position']['x'] or 0,
+            result['character_position']['y'] or 0,
+            result['character_position']['z'] or 0
+        ))
+    
+    # Report how long the command waited in the queue vs. ran
+    result['timing'] = {
+        'queue_wait_ms': round(job.queue_wait_ms, 2),
+        'exec_ms': round((time.perf_counter() - job.started_at) * 1000, 2)
+    }
+    
+    # Emit result to client
+    socketio.emit('command_result', {
+        'command': command,
+        'result': result
+    }, to=sid)
+    
+    # If command affected room state, notify other players in room
+    if result.get('affects_room'):
+        broadcaster = get_room_broadcaster()
+        event = {
+            'character_id': character.id,
+            'character_name': character.name,
+            'action': result.get('action'),
+            'message': result.get('room_message')
+        }
+        if result.get('action') == 'move' and old_room_id != character.current_room_id:
+            # Departure goes to the old room, arrival to the new one
+            broadcaster.publish(old_room_id, event, sender_sid=sid)
+            broadcaster.publish(character.current_room_id, dict(
+                event, action='arrive', message=f'{character.name} arrives.'
+            ), sender_sid=sid)
+            if old_room_id:
+                socketio.server.leave_room(sid, f"room_{old_room_id}", namespace='/')
+            socketio.server.enter_room(sid, f"room_{character.current_room_id}", namespace='/')
+        else:
+            broadcaster.publish(character.current_room_id, event, sender_sid=sid)
+    
+    # If command was chat, emit chat message to all players
+    if result.get('action') == 'chat' and result.get('chat_message'):
+        get_chat_broadcaster().broadcast(result['chat_message'])
+
 def get_current_character():
-    """Get the current user's active character (simplified for now)"""
+    """Get the character this connection joined the game with"""
     if not current_user.is_authenticated:
         return None
-    
-    # For now, return the first character
-    # Later we'll implement character selection
-    return current_user.characters.first()
+    return get_session_registry().resolve(request.sid)
@@ -0,0 +1,407 @@
+"""
+Write-behind persistence for live character state.
+
+Hot character fields (location, vitals, currency) change on nearly every
+command. Instead of committing each change, the CharacterStateStore keeps the
+live values in memory, tracks which characters are dirty and writes them back
+in one batched UPDATE per flush. Flushes happen on a configurable interval,
+when a character disconnects or logs out, and on the `save` command.
+
+Every change is first appended to a journal file, so a crash between flushes
+loses nothing: on the next start the journal is replayed into the database
+before any character is loaded. Appends are handed to the OS straight away,
+which survives a process crash; the fsync that also covers power loss happens
+once per flush interval rather than on every step a character takes.
+"""
+
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+
+from sqlalchemy import and_, bindparam, event, or_
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app import db
+
+# Character columns owned by the store while a character is being tracked
+TRACKED_FIELDS = (
+    'current_room_id', 'x_coord', 'y_coord', 'z_coord',
+    'current_hp', 'current_mana', 'current_movement',
+    'gold', 'silver', 'copper'
+)
+
+
+class CharacterStateStore:
+    """In-memory live character state with dirty tracking and batched flushes"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # Held across a whole flush so snapshots commit in the order they were taken
+        self._flush_lock = threading.Lock()
+        self._states = {}  # character id -> {field: value}
+        self._dirty = set()  # character ids with unflushed changes
+        self._app = None
+        self._journal_path = None
+        self._journal = None
+        self._fsync = True
+        self._segment = 0
+        self._recovered = False
+        self._timer = None
+        self.flush_interval = 5.0
+        self.stats = {'flushes': 0, 'rows_flushed': 0, 'last_flush_ms': 0.0}
+
+    def init_app(self, app):
+        """Configure the store from the app config"""
+        self._app = app
+        self.flush_interval = app.config.get('CHARACTER_FLUSH_INTERVAL', 5.0)
+        self._fsync = app.config.get('CHARACTER_JOURNAL_FSYNC', True)
+        path = app.config.get('CHARACTER_JOURNAL_PATH')
+        if path and not os.path.isabs(path):
+            path = os.path.join(app.instance_path, path)
+        self._install_listeners()
+        with self._lock:
+            self._close_journal()
+            self._journal_path = path
+            self._states = {}
+            self._dirty = set()
+            self._recovered = False
+
+    # ------------------------------------------------------------------
+    # Live state
+    # ------------------------------------------------------------------
+
+    def is_tracked(self, character_id):
+        return character_id in self._states
+
+    def get(self, character_id, field, default=None):
+        """Get a live field value for a tracked character"""
+        state = self._states.get(character_id)
+        if state is None:
+            return default
+        return state.get(field, default)
+
+    def in_room_clause(self, room_pk):
+        """SQL criterion matching characters whose live location is the given room
+
+        Tracked characters are matched on their in-memory location, since their
+        row may not have been flushed since they last moved.
+        """
+        from app.models.character import Character
+        with self._lock:
+            tracked = list(self._states)
+            present = [cid for cid, state in self._states.items()
+                       if state['current_room_id'] == room_pk]
+        clause = Character.current_room_id == room_pk
+        if tracked:
+            clause = and_(clause, Character.id.notin_(tracked))
+        if present:
+            clause = or_(clause, Character.id.in_(present))
+        return clause
+
+    def attach(self, character):
+        """Start tracking a character (if needed) and overlay its live state"""
+        self._ensure_recovered()
+        with self._lock:
+            state = self._states.get(character.id)
+            if state is None:
+                state = {field: getattr(character, field) for field in TRACKED_FIELDS}
+                self._states[character.id] = state
+            values = dict(state)
+        self._overlay(character, values)
+        return character
+
+    def apply(self, character):
+        """Overlay live state onto a loaded Character without marking it dirty"""
+        state = self._states.get(character.id)
+        if state is not None:
+            self._overlay(character, dict(state))
+        return character
+
+    def update(self, character, **fields):
+        """Change live fields; they are journaled now and written on the next flush"""
+        unknown = set(fields) - set(TRACKED_FIELDS)
+        if unknown:
+            raise ValueError(f"Untracked character fields: {', '.join(sorted(unknown))}")
+
+        self.attach(character)
+        with self._lock:
+            self._states[character.id].update(fields)
+            self._dirty.add(character.id)
+            self._write_journal(character.id, fields)
+        self._overlay(character, fields)
+
+    def update_many(self, changes):
+        """Change live fields for many tracked characters under one journal write
+
+        Args:
+            changes: dict of character id -> {field: value}; untracked ids are skipped
+
+        Returns:
+            list: Ids whose changes were applied
+        """
+        applied = []
+        with self._lock:
+            for character_id, fields in changes.items():
+                state = self._states.get(character_id)
+                if state is None:
+                    continue
+                state.update(fields)
+                self._dirty.add(character_id)
+                self._write_journal(character_id, fields, hand_off=False)
+                applied.append(character_id)
+            if self._journal is not None:
+                self._journal.flush()
+        return applied
+
+    def release(self, character_id):
+        """Flush a character and stop tracking it (disconnect/logout)"""
+        self.flush([character_id])
+        with self._lock:
+            if character_id not in self._dirty:
+                self._states.pop(character_id, None)
+
+    def discard(self, character_id):
+        """Forget a character without flushing (e.g. it was deleted)"""
+        with self._lock:
+            self._states.pop(character_id, None)
+            self._dirty.discard(character_id)
+
+    def dirty_count(self):
+        return len(self._dirty)
+
+    @staticmethod
+    def _overlay(character, values):
+        for field, value in values.items():
+            set_committed_value(character, field, value)
+
+    def _install_listeners(self):
+        """Re-apply live state whenever a tracked Character is (re)loaded
+
+        Commits expire instances, so without this a later attribute access would
+        read the stale row back from the database.
+        """
+        from app.models.character import Character
+        if not event.contains(Character, 'load', self._on_load):
+            event.listen(Character, 'load', self._on_load)
+            event.listen(Character, 'refresh', self._on_refresh)
+
+    def _on_load(self, character, context):
+        self.apply(character)
+
+    def _on_refresh(self, character, context, attrs):
+        self.apply(character)
+
+    # ------------------------------------------------------------------
+    # Flushing
+    # ------------------------------------------------------------------
+
+    def flush(self, character_ids=None):
+        """Write dirty characters back in one batched UPDATE
+
+        Args:
+            character_ids: Only flush these characters (default: all dirty)
+
+        Returns:
+            int: Number of character rows written
+
+        Raises:
+            Exception: The database error if the write fails; the rows stay
+                dirty and journaled for the next flush
+        """
+        with self._flush_lock:
+            with self._lock:
+                if character_ids is None:
+                    ids = set(self._dirty)
+                else:
+                    ids = self._dirty.intersection(character_ids)
+                if not ids:
+                    return 0
+                rows = [dict(self._states[cid], _id=cid) for cid in ids]
+                self._dirty -= ids
+                # The journal can only be retired when it holds nothing unflushed
+                segment = self._rotate_journal() if not self._dirty else None
+
+            started = time.perf_counter()
+            try:
+                self._write_rows(rows)
+            except Exception:
+                with self._lock:
+                    self._dirty |= ids
+                raise
+
+            if segment:
+                # Everything journaled up to this segment is committed now,
+                # including segments left behind by earlier failed flushes
+                self._retire_segments(segment)
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.stats['flushes'] += 1
+        self.stats['rows_flushed'] += len(rows)
+        self.stats['last_flush_ms'] = elapsed_ms
+        return len(rows)
+
+    def _write_rows(self, rows):
+        from app.models.character import Character
+
+        table = Character.__table__
+        stmt = (
+            table.update()
+            .where(table.c.id == bindparam('_id'))
+            .values({field: bindparam(field) for field in TRACKED_FIELDS})
+        )
+        with self._app_context():
+            db.session.execute(stmt, rows)
+            db.session.commit()
+
+    def _app_context(self):
+        from flask import has_app_context
+        from contextlib import nullcontext
+        if has_app_context() or self._app is None:
+            return nullcontext()
+        return self._app.app_context()
+
+    # ------------------------------------------------------------------
+    # Journal
+    # ------------------------------------------------------------------
+
+    def _write_journal(self, character_id, fields, hand_off=True):
+        """Append an entry; hand_off passes it to the OS now (fsync is periodic)"""
+        if not self._journal_path:
+            return
+        if self._journal is None:
+            os.makedirs(os.path.dirname(self._journal_path), exist_ok=True)
+            self._journal = open(self._journal_path, 'a', encoding='utf-8')
+        self._journal.write(json.dumps({'id': character_id, 'f': fields}) + '\n')
+        if hand_off:
+            self._journal.flush()
+
+    def _sync_journal(self):
+        """Force journaled entries to disk (once per flush interval)"""
+        with self._lock:
+            if self._journal is None:
+                return
+            self._journal.flush()
+            if self._fsync:
+                os.fsync(self._journal.fileno())
+
+    def _close_journal(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def _rotate_journal(self):
+        """Move the live journal aside; returns the segment path to delete after commit"""
+        if not self._journal_path or not os.path.exists(self._journal_path):
+            return None
+        self._close_journal()
+        self._segment += 1
+        segment = f"{self._journal_path}.{self._segment}"
+        os.replace(self._journal_path, segment)
+        return segment
+
+    def _retire_segments(self, newest):
+        """Delete the segment `newest` and every older one"""
+        cutoff = int(newest.rsplit('.', 1)[-1])
+        for number, path in self._journal_segments():
+            if number <= cutoff:
+                os.remove(path)
+
+    def _journal_segments(self):
+        """(number, path) of rotated journal segments, oldest first"""
+        segments = []
+        for path in glob.glob(f"{self._journal_path}.*"):
+            suffix = path.rsplit('.', 1)[-1]
+            if suffix.isdigit():
+                segments.append((int(suffix), path))
+        return sorted(segments)
+
+    def _journal_files(self):
+        segments = self._journal_segments()
+        if segments:
+            self._segment = max(self._segment, segments[-1][0])
+        files = [path for _, path in segments]
+        if os.path.exists(self._journal_path):
+            files.append(self._journal_path)
+        return files
+
+    def _ensure_recovered(self):
+        if not self._recovered:
+            with self._lock:
+                if not self._recovered:
+                    self.recover()
+
+    def recover(self):
+        """Replay journal entries left by a crash into the database"""
+        self._recovered = True
+        if not self._journal_path:
+            return 0
+
+        files = self._journal_files()
+        latest = {}
+        for path in files:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # Torn final write
+                    latest.setdefault(entry['id'], {}).update(entry['f'])
+
+        if latest:
+            from app.models.character import Character
+            table = Character.__table__
+            with self._app_context():
+                for character_id, fields in latest.items():
+                    db.session.execute(
+                        table.update().where(table.c.id == character_id).values(**fields)
+                    )
+                db.session.commit()
+            print(f"[CHARACTER STATE] Recovered journaled state for {len(latest)} characters")
+
+        self._close_journal()
+        for path in files:
+            os.remove(path)
+        return len(latest)
+
+    # ------------------------------------------------------------------
+    # Periodic flushing
+    # ------------------------------------------------------------------
+
+    def start(self, tick_engine):
+        """Flush every flush_interval seconds on the game tick"""
+        if self._timer is not None or not self.flush_interval:
+            return
+        self._timer = tick_engine.call_every(self.flush_interval * 1000, self._periodic_flush,
+                                             name='character-state-flush')
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Stop periodic flushing and write out everything still dirty"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self.flush()
+
+    def _periodic_flush(self):
+        try:
+            # Make the journal durable first, in case the database write fails
+            self._sync_journal()
+            self.flush()
+        except Exception as e:
+            print(f"[CHARACTER STATE ERROR] Periodic flush failed, "
+                  f"{self.dirty_count()} characters stay dirty and journaled: {e}")
+
+
+# Global character state store instance
+_character_state_store = None
+
+
+def get_character_state_store():
+    """Get the global character state store"""
+    global _character_state_store
+    if _character_state_store is None:
+        _character_state_store = CharacterStateStore()
+    return _character_state_store
@@ -0,0 +1,96 @@
+"""
+Global chat delivery with server-side censoring.
+
+Every client in the game sits in one of two Socket.IO rooms according to its
+player's censor setting. A global chat message is filtered once and emitted
+at most twice: the censored text to the censor-on room and the original text
+to the censor-off room. Filtering cost grows with the number of messages, not
+with the number of listeners, and clients no longer filter anything.
+"""
+
+import threading
+
+from app.word_filter import filter_message
+
+CENSORED_ROOM = 'chat_global_censored'
+UNCENSORED_ROOM = 'chat_global_uncensored'
+
+
+def chat_room(censor_enabled):
+    """Global chat room for a censor setting"""
+    return CENSORED_ROOM if censor_enabled else UNCENSORED_ROOM
+
+
+class ChatBroadcaster:
+    """Routes global chat to the censored and uncensored listener rooms"""
+
+    def __init__(self, emit=None, enter_room=None, leave_room=None):
+        self._lock = threading.Lock()
+        self._emit = emit
+        self._enter_room = enter_room
+        self._leave_room = leave_room
+        self.stats = {'messages': 0, 'censored': 0, 'emits': 0}
+
+    def _send(self, payload, to):
+        self.stats['emits'] += 1
+        if self._emit is not None:
+            self._emit(payload, to)
+        else:
+            from app import socketio
+            socketio.emit('chat_message', payload, to=to)
+
+    def _move(self, sid, enter, leave):
+        if self._enter_room is not None:
+            self._leave_room(sid, leave)
+            self._enter_room(sid, enter)
+        else:
+            from app import socketio
+            socketio.server.leave_room(sid, leave, namespace='/')
+            socketio.server.enter_room(sid, enter, namespace='/')
+
+    def join(self, sid, censor_enabled):
+        """Put a connection in the global chat room matching its setting"""
+        self._move(sid, chat_room(censor_enabled), chat_room(not censor_enabled))
+
+    def leave(self, sid):
+        """Stop delivering global chat to a connection"""
+        if self._leave_room is not None:
+            self._leave_room(sid, CENSORED_ROOM)
+            self._leave_room(sid, UNCENSORED_ROOM)
+        else:
+            from app import socketio
+            socketio.server.leave_room(sid, CENSORED_ROOM, namespace='/')
+            socketio.server.leave_room(sid, UNCENSORED_ROOM, namespace='/')
+
+    def set_censor(self, player_id, censor_enabled):
+        """Move every connection of a player after their setting changes"""
+        from app.systems.session_registry import get_session_registry
+        for sid in get_session_registry().sids_for_player(player_id):
+            self.join(sid, censor_enabled)
+
+    def broadcast(self, chat_data):
+        """Send a global chat message to everyone, censored where wanted"""
+        with self._lock:
+            self.stats['messages'] += 1
+        message = chat_data.get('message')
+        censored = filter_message(message)
+        if censored == message:
+            # Nothing to hide: both rooms get the same payload in one emit
+            self._send(chat_data, [CENSORED_ROOM, UNCENSORED_ROOM])
+            return
+        with self._lock:
+            self.stats['censored'] += 1
+        self._send(dict(chat_data, message=censored), CENSORED_ROOM)
+        self._send(chat_data, UNCENSORED_ROOM)
+
+
+# Global chat broadcaster instance
+_chat_broadcaster = None
+
+
+def get_chat_broadcaster():
+    """Get the global chat broadcaster"""
+    global _chat_broadcaster
+    if _chat_broadcaster is None:
+        _chat_broadcaster = ChatBroadcaster()
+    return _chat_broadcaster
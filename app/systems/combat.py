@@ -0,0 +1,563 @@
+"""
+Vectorized combat resolution.
+
+Every fighter (online character or NPC) is one row in a set of NumPy arrays:
+damage ranges and resistances have one column per DamageType, so a
+fighter's whole offence and defence are vectors. Each tick resolves every
+active fight in the world (or one room) at once:
+
+    ready swings      = readiness >= attack speed
+    hit               = rng < clamp(BASE_HIT - AC_STEP * target AC)
+    damage per type   = uniform(min, max) * (1 - resist% / 100) - flat reduction
+    damage            = sum over types, on hits only
+
+Resistances combine the defender's race (get_resistances) with the
+damage_reduction of their equipped items; attacks use the wielded weapon's
+get_effective_damage, get_damage_types and get_attack_speed. The RNG is
+seeded (COMBAT_SEED), so runs and benchmarks are reproducible.
+
+Character HP lives in the vitals store and is read and written there in one
+batch per tick. NPC HP lives here until the NPC dies (the respawn manager
+takes over) or stops fighting (written back in one batched UPDATE). A slain
+character is recalled to the starting room with 1 HP. A character leaving
+the game (disconnect, logout) ends its fights first.
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+from sqlalchemy import bindparam
+
+from app import db
+from app.models.item_constants import DamageType
+
+DAMAGE_TYPES = tuple(damage_type.value for damage_type in DamageType)
+TYPE_INDEX = {name: index for index, name in enumerate(DAMAGE_TYPES)}
+
+# Race resistance keys that are not DamageType values
+RESISTANCE_ALIASES = {
+    'radiant': ('holy', 'light'),
+    'necrotic': ('negative',),
+    'magic': ('energy',),
+    'nature': ('earth', 'water', 'air')
+}
+
+CHARACTER = 0
+NPC_FIGHTER = 1
+
+# Hit chance before armor, and how much each point of armor class removes
+BASE_HIT = 0.9
+AC_STEP = 0.01
+MIN_HIT = 0.05
+MAX_HIT = 0.95
+
+# Fists when nothing is wielded
+UNARMED_DAMAGE = (1, 3)
+UNARMED_TYPE = 'bludgeoning'
+
+# Resistances never go past this
+MAX_RESIST = 90
+
+INITIAL_CAPACITY = 64
+
+# One tick's swings as parallel arrays of fighter slots, plus the slots that died
+CombatRound = namedtuple('CombatRound', 'attackers targets hits damage dead')
+EMPTY_ROUND = CombatRound(*(np.zeros(0, dtype=np.int64) for _ in range(5)))
+
+
+def type_vector(values):
+    """Map {damage type name: value} onto a vector (unknown names are ignored)"""
+    vector = np.zeros(len(DAMAGE_TYPES))
+    for name, value in values.items():
+        for type_name in RESISTANCE_ALIASES.get(name, (name,)):
+            index = TYPE_INDEX.get(type_name)
+            if index is not None:
+                vector[index] += value
+    return vector
+
+
+def attack_profile(weapon):
+    """(min damage vector, max damage vector, seconds per swing) for a weapon"""
+    low = np.zeros(len(DAMAGE_TYPES))
+    high = np.zeros(len(DAMAGE_TYPES))
+    if weapon is None:
+        low[TYPE_INDEX[UNARMED_TYPE]], high[TYPE_INDEX[UNARMED_TYPE]] = UNARMED_DAMAGE
+        return low, high, 1.0
+
+    base_min, base_max = weapon.get_effective_damage()
+    for entry in weapon.get_damage_types():
+        index = TYPE_INDEX.get(entry['type'])
+        if index is None:
+            continue
+        if 'percentage' in entry:
+            low[index] += (base_min or 0) * entry['percentage'] / 100
+            high[index] += (base_max or 0) * entry['percentage'] / 100
+        else:
+            low[index] += entry.get('min', 0)
+            high[index] += entry.get('max', 0)
+    return low, np.maximum(low, high), weapon.get_attack_speed() or 1.0
+
+
+def defense_profile(entity, items):
+    """(resist % vector, flat reduction vector, armor class) for a fighter"""
+    resist = np.minimum(type_vector(entity.get_resistances() or {}), MAX_RESIST)
+    reduction = np.zeros(len(DAMAGE_TYPES))
+    armor_class = 0
+    for item in items:
+        armor_class += item.get_armor_class() or 0
+        reduction += type_vector(item.get_damage_reduction() or {})
+    return resist, reduction, armor_class
+
+
+def wielded_weapon(items):
+    weapons = [item for item in items if item.is_weapon()]
+    for item in weapons:
+        if item.equipped_slot == 'main_hand':
+            return item
+    return weapons[0] if weapons else None
+
+
+class CombatEngine:
+    """All ongoing fights as NumPy arrays, resolved in one batch per tick"""
+
+    def __init__(self, seed=None, tick_ms=100, announce=None):
+        self._lock = threading.RLock()
+        self._announce = announce
+        self.tick_ms = tick_ms
+        self.recall_room = 'room_001'
+        self.rng = np.random.default_rng(seed)
+        self._slots = {}  # (kind, entity id) -> slot
+        self._free = []
+        self._size = 0
+        self.names = []
+        self._allocate(INITIAL_CAPACITY)
+        self.stats = {'ticks': 0, 'fighters': 0, 'attacks': 0, 'hits': 0, 'damage': 0,
+                      'deaths': 0, 'last_tick_ms': 0.0}
+
+    def init_app(self, app):
+        """Configure the engine from the app config"""
+        self.tick_ms = app.config.get('GAME_TICK_RATE', self.tick_ms)
+        self.recall_room = app.config.get('STARTING_LOCATION', self.recall_room)
+        self.reset(app.config.get('COMBAT_SEED'))
+
+    def reset(self, seed=None):
+        """End every fight and reseed the RNG"""
+        with self._lock:
+            self.rng = np.random.default_rng(seed)
+            self._slots = {}
+            self._free = []
+            self._size = 0
+            self.names = []
+            self._allocate(INITIAL_CAPACITY, keep=False)
+
+    def _allocate(self, capacity, keep=True):
+        def grow(name, shape, dtype, fill=0):
+            new = np.full(shape, fill, dtype=dtype)
+            old = getattr(self, name, None) if keep else None
+            if old is not None:
+                new[:len(old)] = old
+            setattr(self, name, new)
+
+        types = len(DAMAGE_TYPES)
+        grow('active', capacity, bool, False)
+        grow('kind', capacity, np.int8)
+        grow('entity', capacity, np.int64, -1)
+        grow('room', capacity, np.int64, -1)
+        grow('hp', capacity, np.float64)
+        grow('armor', capacity, np.float64)
+        grow('speed', capacity, np.float64, 1.0)
+        grow('ready', capacity, np.float64)
+        grow('target', capacity, np.int64, -1)
+        grow('damage_min', (capacity, types), np.float64)
+        grow('damage_max', (capacity, types), np.float64)
+        grow('resist', (capacity, types), np.float64)
+        grow('reduction', (capacity, types), np.float64)
+        self.names.extend([None] * (capacity - len(self.names)))
+
+    # ------------------------------------------------------------------
+    # Fighters
+    # ------------------------------------------------------------------
+
+    def add_fighter(self, kind, entity_id, name, room_pk, hp, attack, defense):
+        """Place a fighter in the arrays (or refresh one already there)
+
+        A fighter already in the arrays keeps its HP there; only its name,
+        room and attack/defence profiles are refreshed.
+
+        Args:
+            kind: CHARACTER or NPC_FIGHTER
+            hp: Starting HP, used only when the fighter is new
+            attack: (min damage vector, max damage vector, seconds per swing)
+            defense: (resist % vector, flat reduction vector, armor class)
+
+        Returns:
+            int: The fighter's slot
+        """
+        with self._lock:
+            slot = self._slots.get((kind, entity_id))
+            if slot is None:
+                if self._free:
+                    slot = self._free.pop()
+                else:
+                    if self._size == len(self.active):
+                        self._allocate(len(self.active) * 2)
+                    slot = self._size
+                    self._size += 1
+                self._slots[(kind, entity_id)] = slot
+                self.ready[slot] = 0
+                self.target[slot] = -1
+                self.hp[slot] = hp
+            self.active[slot] = True
+            self.kind[slot] = kind
+            self.entity[slot] = entity_id
+            self.names[slot] = name
+            self.room[slot] = room_pk if room_pk is not None else -1
+            self.damage_min[slot], self.damage_max[slot], self.speed[slot] = attack
+            self.resist[slot], self.reduction[slot], self.armor[slot] = defense
+            return slot
+
+    def current_hp(self, entity):
+        """Live HP of a Character or NPC row
+
+        NPCs already fighting use the arrays (the row is only written when the
+        fight ends); online characters use the vitals store.
+        """
+        from app.models.character import Character
+        from app.systems.vitals import get_vitals_store
+
+        kind = CHARACTER if isinstance(entity, Character) else NPC_FIGHTER
+        with self._lock:
+            slot = self._slots.get((kind, entity.id))
+            if slot is not None:
+                return float(self.hp[slot])
+        if kind == CHARACTER:
+            vitals = get_vitals_store().get(entity.id)
+            if vitals:
+                return vitals['hp']
+        return entity.current_hp or 0
+
+    def _profile(self, entity):
+        """add_fighter() arguments for a Character or NPC row (reads the database)"""
+        from app.models.character import Character
+
+        items = entity.equipped_items.all()
+        kind = CHARACTER if isinstance(entity, Character) else NPC_FIGHTER
+        return (kind, entity.id, entity.name, entity.current_room_id, self.current_hp(entity),
+                attack_profile(wielded_weapon(items)), defense_profile(entity, items))
+
+    def engage(self, attacker, defender):
+        """Start a fight between two Character/NPC rows in the same room
+
+        The defender fights back unless it is already fighting someone.
+
+        Returns:
+            str: Why the fight cannot start, or None
+        """
+        from app.systems.world_graph import get_world_graph
+
+        if attacker.current_room_id != defender.current_room_id:
+            return 'They are not here.'
+        room = get_world_graph().get_room(attacker.current_room_id)
+        if room is not None and room.is_safe:
+            return 'You cannot fight here.'
+        if self.current_hp(defender) <= 0:
+            return f'{defender.name} is already dead.'
+
+        # Equipment and resistances are loaded before the tick can be held up
+        attacker_profile = self._profile(attacker)
+        defender_profile = self._profile(defender)
+        with self._lock:
+            attacker_slot = self.add_fighter(*attacker_profile)
+            defender_slot = self.add_fighter(*defender_profile)
+            self.target[attacker_slot] = defender_slot
+            if self.target[defender_slot] < 0:
+                self.target[defender_slot] = attacker_slot
+        return None
+
+    def engage_ids(self, attacker_key, defender_key):
+        """engage() by ('character' | 'npc', id) keys"""
+        from app.models.character import Character
+        from app.models.npc import NPC
+        models = {'character': Character, 'npc': NPC}
+        attacker = db.session.get(models[attacker_key[0]], attacker_key[1])
+        defender = db.session.get(models[defender_key[0]], defender_key[1])
+        if attacker is None or defender is None:
+            return 'They are not here.'
+        return self.engage(attacker, defender)
+
+    def is_fighting(self, kind, entity_id):
+        slot = self._slots.get((kind, entity_id))
+        return slot is not None and self.target[slot] >= 0
+
+    def end_fights(self, character_id):
+        """Take a character leaving the game out of combat
+
+        Its opponents stop attacking it and leave the arrays on the next tick
+        if nobody else is fighting them.
+        """
+        with self._lock:
+            slot = self._slots.get((CHARACTER, character_id))
+            if slot is not None:
+                self._release(np.array([slot]))
+
+    def _release(self, slots):
+        """Drop fighters from the arrays, writing surviving NPCs' HP back"""
+        from app.models.npc import NPC
+
+        npc_rows = []
+        for slot in slots:
+            if self.kind[slot] == NPC_FIGHTER and self.hp[slot] > 0:
+                npc_rows.append({'_id': int(self.entity[slot]), '_hp': int(self.hp[slot])})
+            self._slots.pop((int(self.kind[slot]), int(self.entity[slot])), None)
+            self.active[slot] = False
+            self.entity[slot] = -1
+            self.target[slot] = -1
+            self.names[slot] = None
+            self._free.append(int(slot))
+        self.target[np.isin(self.target, slots)] = -1
+
+        if npc_rows:
+            table = NPC.__table__
+            db.session.execute(
+                table.update().where(table.c.id == bindparam('_id')).values(current_hp=bindparam('_hp')),
+                npc_rows
+            )
+            db.session.commit()
+
+    # ------------------------------------------------------------------
+    # Resolution
+    # ------------------------------------------------------------------
+
+    def _refresh_characters(self, size):
+        """Pull live HP and room for character fighters"""
+        from app.systems.character_state import get_character_state_store
+        from app.systems.vitals import get_vitals_store
+
+        slots = np.flatnonzero(self.active[:size] & (self.kind[:size] == CHARACTER))
+        if not len(slots):
+            return
+        hp = get_vitals_store().hp_of(self.entity[slots])
+        online = ~np.isnan(hp)
+        self.hp[slots[online]] = hp[online]
+        store = get_character_state_store()
+        for slot in slots:
+            room_pk = store.get(int(self.entity[slot]), 'current_room_id')
+            if room_pk is not None:
+                self.room[slot] = room_pk
+
+    def resolve(self, room_pk=None):
+        """Resolve one tick of every active fight (optionally in one room only)
+
+        Returns:
+            CombatRound: Every swing this tick and the fighters that died
+        """
+        with self._lock:
+            size = self._size
+            if not size:
+                return EMPTY_ROUND
+            self._refresh_characters(size)
+
+            fighting = self.active[:size] & (self.target[:size] >= 0)
+            if room_pk is not None:
+                fighting &= self.room[:size] == room_pk
+            fighters = np.flatnonzero(fighting)
+            targets = self.target[fighters]
+
+            # Fights end when the target is gone, dead or in another room
+            valid = (self.active[targets] & (self.hp[targets] > 0) & (self.hp[fighters] > 0)
+                     & (self.room[targets] == self.room[fighters]))
+            self.target[fighters[~valid]] = -1
+            fighters = fighters[valid]
+
+            self.ready[fighters] += self.tick_ms / 1000
+            attackers = fighters[self.ready[fighters] >= self.speed[fighters]]
+            self.ready[attackers] -= self.speed[attackers]
+            targets = self.target[attackers]
+
+            hit_chance = np.clip(BASE_HIT - self.armor[targets] * AC_STEP, MIN_HIT, MAX_HIT)
+            hits = self.rng.random(len(attackers)) < hit_chance
+            rolls = self.rng.random((len(attackers), len(DAMAGE_TYPES)))
+            low = self.damage_min[attackers]
+            raw = low + rolls * (self.damage_max[attackers] - low)
+            dealt = raw * (1 - self.resist[targets] / 100) - self.reduction[targets]
+            dealt = np.where(raw > 0, np.maximum(dealt, 0), 0)
+            damage = np.rint(dealt.sum(axis=1)) * hits
+
+            np.subtract.at(self.hp, targets, damage)
+            np.maximum(self.hp, 0, out=self.hp)
+
+            # Characters take their damage in the vitals store
+            struck = targets[self.kind[targets] == CHARACTER]
+            if len(struck):
+                from app.systems.vitals import get_vitals_store
+                victims, index = np.unique(struck, return_inverse=True)
+                totals = np.zeros(len(victims))
+                np.add.at(totals, index, damage[self.kind[targets] == CHARACTER])
+                hp = get_vitals_store().damage_many(self.entity[victims], totals)
+                online = ~np.isnan(hp)
+                self.hp[victims[online]] = hp[online]
+
+            dead = np.unique(targets[self.hp[targets] <= 0])
+            self.stats['attacks'] += len(attackers)
+            self.stats['hits'] += int(hits.sum())
+            self.stats['damage'] += int(damage.sum())
+            self.stats['fighters'] = len(fighters)
+            return CombatRound(attackers, targets, hits, damage, dead)
+
+    def describe(self, combat_round):
+        """One event dict per swing in a round"""
+        return [{
+            'room_id': int(self.room[attacker]),
+            'attacker': self.names[attacker],
+            'target': self.names[target],
+            'hit': bool(hit),
+            'damage': int(amount)
+        } for attacker, target, hit, amount in zip(*combat_round[:4])]
+
+    def tick(self, room_pk=None):
+        """Resolve, announce the blows and deal with the dead"""
+        started = time.perf_counter()
+        combat_round = self.resolve(room_pk)
+        dead = combat_round.dead
+        events = self.describe(combat_round)
+        for event in events:
+            if event['hit']:
+                message = f"{event['attacker']} hits {event['target']} for {event['damage']} damage."
+            else:
+                message = f"{event['attacker']} misses {event['target']}."
+            self.announce(event['room_id'], 'combat', message)
+
+        with self._lock:
+            if len(dead):
+                self._bury(dead)
+            # Fighters nobody is fighting any more leave the arrays
+            size = self._size
+            targeted = np.zeros(size, dtype=bool)
+            targeted[self.target[:size][self.target[:size] >= 0]] = True
+            idle = np.flatnonzero(self.active[:size] & (self.target[:size] < 0) & ~targeted)
+            if len(idle):
+                self._release(idle)
+
+        self.stats['ticks'] += 1
+        self.stats['last_tick_ms'] = (time.perf_counter() - started) * 1000
+        return events
+
+    def _bury(self, dead):
+        from app.models.npc import NPC
+        from app.systems.respawn import get_respawn_manager
+
+        respawn = get_respawn_manager()
+        for slot in dead:
+            self.announce(int(self.room[slot]), 'death', f"{self.names[slot]} has been slain!")
+            if self.kind[slot] == NPC_FIGHTER:
+                npc = db.session.get(NPC, int(self.entity[slot]))
+                if npc is not None:
+                    npc.current_hp = 0
+                    respawn.npc_died(npc)
+        self.stats['deaths'] += len(dead)
+        db.session.commit()
+        characters = [int(self.entity[slot]) for slot in dead if self.kind[slot] == CHARACTER]
+        self._release(dead)
+        for character_id in characters:
+            self._recall(character_id)
+
+    def _recall(self, character_id):
+        """Send a slain character back to the starting room with 1 HP"""
+        from app.models.character import Character
+        from app.systems.character_state import get_character_state_store
+        from app.systems.vitals import get_vitals_store
+        from app.systems.world_graph import get_world_graph
+
+        store = get_character_state_store()
+        if not store.is_tracked(character_id):
+            return  # Left the game; its state was already written back
+        get_vitals_store().adjust(character_id, hp=1)
+        character = db.session.get(Character, character_id)
+        room = get_world_graph().get_room_by_room_id(self.recall_room)
+        if character is None or room is None:
+            return
+        old_room_pk = store.get(character_id, 'current_room_id', character.current_room_id)
+        store.update(character, current_room_id=room.id, x_coord=room.x_coord,
+                     y_coord=room.y_coord, z_coord=room.z_coord)
+        if old_room_pk != room.id:
+            self.announce(room.id, 'arrive', f"{character.name} appears, looking battered.")
+        self._move_sessions(character, old_room_pk, room)
+
+    def _move_sessions(self, character, old_room_pk, room):
+        """Move a recalled character's connections to their new room"""
+        from app.systems.session_registry import get_session_registry
+
+        sids = get_session_registry().sids_for_character(character.id)
+        if not sids:
+            return
+        from app import socketio
+        from app.systems.commands import get_command_processor
+        from app.systems.minimap_push import get_minimap_push
+
+        position = {'x': room.x_coord, 'y': room.y_coord, 'z': room.z_coord}
+        description = get_command_processor()._format_room_description(room, character)
+        for sid in sids:
+            if old_room_pk:
+                socketio.server.leave_room(sid, f"room_{old_room_pk}", namespace='/')
+            socketio.server.enter_room(sid, f"room_{room.id}", namespace='/')
+            get_minimap_push().move(sid, (room.x_coord or 0, room.y_coord or 0, room.z_coord or 0))
+            socketio.emit('command_result', {
+                'command': 'recall',
+                'result': {
+                    'message': f"You have been slain!\n\n{description}",
+                    'action': 'move',
+                    'character_position': position
+                }
+            }, to=sid)
+
+    def announce(self, room_pk, action, message):
+        event = {'action': action, 'message': message}
+        if self._announce is not None:
+            self._announce(room_pk, event)
+        else:
+            from app.systems.room_broadcast import get_room_broadcaster
+            get_room_broadcaster().publish(room_pk, event)
+
+    def start(self, tick_engine):
+        """Resolve fights as a phase of every game tick"""
+        tick_engine.add_phase('combat', self.tick)
+
+
+def cmd_kill(character, args, unparsed_args, command_key=None):
+    """Attack an NPC in the room"""
+    from app.models.npc import NPC
+
+    if not args:
+        return {'error': 'Kill whom?'}
+    target = ' '.join(args).lower()
+    npc = None
+    for candidate in NPC.query.filter_by(current_room_id=character.current_room_id):
+        if candidate.name.lower().startswith(target):
+            npc = candidate
+            break
+    if npc is None:
+        return {'error': f'You don\'t see "{" ".join(args)}" here.'}
+
+    error = get_combat_engine().engage(character, npc)
+    if error:
+        return {'error': error}
+    return {
+        'message': f'You attack {npc.name}!',
+        'affects_room': True,
+        'action': 'attack',
+        'room_message': f'{character.name} attacks {npc.name}!'
+    }
+
+
+# Global combat engine instance
+_combat_engine = None
+
+
+def get_combat_engine():
+    """Get the global combat engine"""
+    global _combat_engine
+    if _combat_engine is None:
+        _combat_engine = CombatEngine()
+    return _combat_engine
@@ -0,0 +1,149 @@
+"""
+Per-character command queue executed by a worker pool.
+
+Socket handlers only enqueue commands. Each character has its own FIFO queue
+and is scheduled on at most one worker at a time, so a character's commands
+run strictly in the order they were sent while different characters run in
+parallel. Queues are bounded; a client that floods commands gets a
+back-pressure error instead of growing the backlog.
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+
+
+class QueueFullError(Exception):
+    """Raised when a character already has the maximum number of queued commands"""
+    pass
+
+
+class CommandJob:
+    """A queued command and its timing
+
+    The callable receives the job itself, so it can report its queue wait and
+    elapsed execution time (from started_at) in its own output.
+    """
+
+    def __init__(self, character_id, func):
+        self.character_id = character_id
+        self.func = func
+        self.enqueued_at = time.perf_counter()
+        self.started_at = None
+        self.queue_wait_ms = 0.0
+        self.exec_ms = 0.0
+
+
+class CommandQueue:
+    """Per-character FIFO command queues served by a pool of worker threads"""
+
+    def __init__(self, workers=4, max_depth=16):
+        self.workers = workers
+        self.max_depth = max_depth
+        self._app = None
+        self._lock = threading.Lock()
+        self._pending = {}  # character id -> deque of CommandJob
+        self._scheduled = set()  # character ids waiting in or held by a worker
+        self._ready = queue.Queue()
+        self._threads = []
+        self.stats = {
+            'executed': 0,
+            'rejected': 0,
+            'queue_wait_ms_total': 0.0,
+            'exec_ms_total': 0.0,
+            'max_queue_wait_ms': 0.0
+        }
+
+    def init_app(self, app):
+        """Configure the queue from the app config"""
+        self._app = app
+        self.workers = app.config.get('COMMAND_WORKERS', self.workers)
+        self.max_depth = app.config.get('COMMAND_QUEUE_DEPTH', self.max_depth)
+
+    def submit(self, character_id, func):
+        """Queue a callable to run after the character's earlier commands
+
+        Raises:
+            QueueFullError: If the character's queue is at max_depth
+        """
+        job = CommandJob(character_id, func)
+        with self._lock:
+            pending = self._pending.setdefault(character_id, deque())
+            if len(pending) >= self.max_depth:
+                self.stats['rejected'] += 1
+                raise QueueFullError(f'Too many queued commands (limit {self.max_depth})')
+            pending.append(job)
+            schedule = character_id not in self._scheduled
+            if schedule:
+                self._scheduled.add(character_id)
+        if schedule:
+            self._ready.put(character_id)
+        self._ensure_workers()
+        return job
+
+    def depth(self, character_id):
+        pending = self._pending.get(character_id)
+        return len(pending) if pending else 0
+
+    def _ensure_workers(self):
+        if len(self._threads) >= self.workers:
+            return
+        with self._lock:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(
+                    target=self._work, name=f'command-worker-{len(self._threads)}', daemon=True
+                )
+                self._threads.append(thread)
+                thread.start()
+
+    def _work(self):
+        while True:
+            character_id = self._ready.get()
+            with self._lock:
+                job = self._pending[character_id].popleft()
+
+            started = job.started_at = time.perf_counter()
+            job.queue_wait_ms = (started - job.enqueued_at) * 1000
+            try:
+                self._run(job)
+            except Exception as e:
+                print(f"[COMMAND QUEUE ERROR] {e}")
+                import traceback
+                traceback.print_exc()
+            job.exec_ms = (time.perf_counter() - started) * 1000
+            self._record(job)
+
+            # Hand the character back to the pool only once this command is done
+            with self._lock:
+                if self._pending[character_id]:
+                    self._ready.put(character_id)
+                else:
+                    del self._pending[character_id]
+                    self._scheduled.discard(character_id)
+
+    def _run(self, job):
+        if self._app is None:
+            job.func(job)
+            return
+        with self._app.app_context():
+            job.func(job)
+
+    def _record(self, job):
+        with self._lock:
+            self.stats['executed'] += 1
+            self.stats['queue_wait_ms_total'] += job.queue_wait_ms
+            self.stats['exec_ms_total'] += job.exec_ms
+            self.stats['max_queue_wait_ms'] = max(self.stats['max_queue_wait_ms'], job.queue_wait_ms)
+
+
+# Global command queue instance
+_command_queue = None
+
+
+def get_command_queue():
+    """Get the global command queue"""
+    global _command_queue
+    if _command_queue is None:
+        _command_queue = CommandQueue()
+    return _command_queue
@@ -1,98 +1,166 @@
 import re
+import threading
 from app import db
 from app.models.character import Character
-from app.models.room import Room
 from app.models.item import Item
 from app.models.chat_message import ChatMessage
+from app.systems.world_graph import get_world_graph
+from app.systems.character_state import get_character_state_store
+from app.systems.session_registry import get_session_registry
+from app.systems.chat_broadcast import get_chat_broadcaster
+from app.systems.stat_engine import get_stat_engine
+from app.systems.vitals import get_vitals_store
+from app.systems.respawn import get_respawn_manager
+
+# Tokens are "double quoted", 'single quoted' or runs of non-space characters
+TOKEN_PATTERN = re.compile(r'"([^"]*)"|\'([^\']*)\'|([^ ]+)')
+
+
+def tokenize(command_text):
+    """Split command text in one pass
+
+    Returns:
+        tuple: (parts, unparsed_args) where unparsed_args is the raw text
+        after the first token
+    """
+    parts = []
+    first_end = None
+    for match in TOKEN_PATTERN.finditer(command_text):
+        if first_end is None:
+            first_end = match.end()
+        token = match.group(1) or match.group(2) or match.group(3)
+        if token:
+            parts.append(token)
+    unparsed_args = command_text[first_end:].lstrip() if first_end is not None else ''
+    return parts, unparsed_args
+
+
+class CommandTrie:
+    """Prefix trie resolving commands and their abbreviations
+
+    Every node remembers the first command registered beneath it, so an
+    abbreviation resolves to the earliest registered command it prefixes
+    (n -> north, l -> look, ex -> examine, i -> inventory).
+    """
+
+    def __init__(self):
+        self.children = {}
+        self.exact = None  # Command whose full name ends at this node
+        self.first = None  # First registered command with this prefix
+
+    def insert(self, name):
+        node = self
+        for char in name:
+            node = node.children.setdefault(char, CommandTrie())
+            if node.first is None:
+                node.first = name
+        node.exact = name
+
+    def lookup(self, prefix):
+        node = self
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node.exact or node.first
+
 
 class CommandProcessor:
     """Process and execute game commands"""
     
     def __init__(self):
-        self.commands = {
-            'north': self.cmd_move,
-            'south': self.cmd_move,
-            'east': self.cmd_move,
-            'west': self.cmd_move,
-            'up': self.cmd_move,
-            'down': self.cmd_move,
-            'look': self.cmd_look,
-            'examine': self.cmd_examine,
-            'inventory': self.cmd_inventory,
-            'get': self.cmd_get,
-            'take': self.cmd_get,
-            'drop': self.cmd_drop,
-            'equip': self.cmd_equip,
-            'unequip': self.cmd_unequip,
-            'go': self.cmd_go,
-            'say': self.cmd_say,
-            'emote': self.cmd_emote,
-            'chat': self.cmd_chat,
-            'censor': self.cmd_censor,
-            'who': self.cmd_who,
-            'help': self.cmd_help,
-            'quit': self.cmd_quit,
-            'save': self.cmd_save
-        }
+        self._lock = threading.Lock()
+        self.commands = {}
+        self._trie = CommandTrie()
+        
+        builtins = [
+            ('north', self.cmd_move),
+            ('south', self.cmd_move),
+            ('east', self.cmd_move),
+            ('west', self.cmd_move),
+            ('up', self.cmd_move),
+            ('down', self.cmd_move),
+            ('look', self.cmd_look),
+            ('examine', self.cmd_examine),
+            ('inventory', self.cmd_inventory),
+            ('get', self.cmd_get),
+            ('take', self.cmd_get),
+            ('drop', self.cmd_drop),
+            ('equip', self.cmd_equip),
+            ('unequip', self.cmd_unequip),
+            ('go', self.cmd_go),
+            ('say', self.cmd_say),
+            ('emote', self.cmd_emote),
+            ('chat', self.cmd_chat),
+            ('censor', self.cmd_censor),
+            ('who', self.cmd_who),
+            ('help', self.cmd_help),
+            ('quit', self.cmd_quit),
+            ('save', self.cmd_save)
+        ]
+        for name, handler in builtins:
+            self.register(name, handler)
+    
+    def register(self, name, handler):
+        """Register a command
+        
+        Args:
+            name: Full command name; abbreviations resolve to the earliest
+                registered command they prefix
+            handler: Callable taking (character, args, unparsed_args, command_key)
+                and returning a result dict
+        """
+        name = name.lower()
+        with self._lock:
+            self.commands[name] = handler
+            self._trie.insert(name)
+    
+    def resolve(self, command):
+        """Resolve a (possibly abbreviated) command to its full name"""
+        return self._trie.lookup(command.lower())
     
     def process_command(self, character, command_text):
         """Process a command and return the result"""
-        import re
-        # Regex to split command and arguments, supporting quoted strings
-        pattern = r'"([^"]*)"|\'([^\']*)\'|([^ ]+)'
-        matches = re.findall(pattern, command_text)
-        parts = []
-        for m in matches:
-            if m[0]:
-                parts.append(m[0])
-            elif m[1]:
-                parts.append(m[1])
-            elif m[2]:
-                parts.append(m[2])
+        parts, unparsed_args = tokenize(command_text)
         if not parts:
             return {'error': 'Empty command'}
 
         command = parts[0].lower()
-        args = parts[1:] if len(parts) > 1 else []
-
-        # Compute unparsed_args: skip the first match in command_text
-        # Find the first match (the command) in the original string
-        match_iter = re.finditer(pattern, command_text)
-        try:
-            first_match = next(match_iter)
-            end_idx = first_match.end()
-            unparsed_args = command_text[end_idx:].lstrip()
-        except StopIteration:
-            unparsed_args = ''
+        args = parts[1:]
 
-        # First pass: exact match
-        if command in self.commands:
-            try:
-                return self.commands[command](character, args, unparsed_args, command)
-                # For directional commands, pass the direction as the first argument
-                if command in ['north', 'n', 'south', 's', 'east', 'e', 'west', 'w', 'up', 'u', 'down', 'd']:
-                    print(f"[PROCESS_COMMAND] Processing directional command: {command}")
-                    result = self.commands[command](character, command, args)
-                    print(f"[PROCESS_COMMAND] Got result with keys: {result.keys() if result else 'None'}")
-                    print(f"[PROCESS_COMMAND] Result action: {result.get('action', 'NOT SET') if result else 'NO RESULT'}")
-                    return result
-                else:
-                    return self.commands[command](character, args)
-            except Exception as e:
-                print(f"[PROCESS_COMMAND ERROR] {str(e)}")
-                import traceback
-                traceback.print_exc()
-                return {'error': f'Command error: {str(e)}'}
+        cmd_name = self.resolve(command)
+        if cmd_name is None:
+            return {'error': f'Unknown command: {command}. Type "help" for available commands.'}
 
-        # Second pass: startswith match (in insertion order)
-        for cmd_name in self.commands:
-            if cmd_name.startswith(command):
-                try:
-                    return self.commands[cmd_name](character, args, unparsed_args, cmd_name)
-                except Exception as e:
-                    return {'error': f'Command error: {str(e)}'}
-
-        return {'error': f'Unknown command: {command}. Type "help" for available commands.'}
+        try:
+            return self.commands[cmd_name](character, args, unparsed_args, cmd_name)
+        except Exception as e:
+            print(f"[PROCESS_COMMAND ERROR] {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return {'error': f'Command error: {str(e)}'}
+    
+    def _get_room(self, character):
+        """Get the character's current room from the world graph"""
+        return get_world_graph().get_room(character.current_room_id)
+    
+    def _get_characters_in_room(self, room):
+        """Get all characters currently in a room"""
+        return Character.query.filter(get_character_state_store().in_room_clause(room.id)).all()
+    
+    def _move_character(self, character, room):
+        """Place a character in a room via the write-behind state store"""
+        get_character_state_store().update(
+            character,
+            current_room_id=room.id,
+            x_coord=room.x_coord,
+            y_coord=room.y_coord,
+            z_coord=room.z_coord
+        )
+    
+    def _get_items_in_room(self, room):
+        """Get all items currently in a room"""
+        return Item.query.filter_by(room_id=room.id).all()
     
     def _format_room_description(self, room, character, include_items_and_chars=True):
         """Format a room description with exits, items, and characters
@@ -115,13 +183,13 @@ class CommandProcessor:
         
         if include_items_and_chars:
             # Add characters in room
-            other_chars = [char for char in room.get_characters_in_room() if char.id != character.id]
+            other_chars = [char for char in self._get_characters_in_room(room) if char.id != character.id]
             if other_chars:
                 char_names = [char.name for char in other_chars]
                 description += f"\n\n<b>Also here:</b> {', '.join(char_names)}"
             
             # Add items in room
-            room_items = room.get_items_in_room()
+            room_items = self._get_items_in_room(room)
             if room_items:
                 item_names = [item.name for item in room_items]
                 description += f"\n\n<b>Items:</b> {', '.join(item_names)}"
@@ -130,11 +198,10 @@ class CommandProcessor:
     
     def cmd_look(self, character, args, unparsed_args, command_key=None):
         """Look at room or object"""
-        if not character.current_room:
+        room = self._get_room(character)
+        if not room:
             return {'error': 'You are not in a room'}
         
-        room = character.current_room
-        
         if not args:
             # Look at room - use helper method
             return {
@@ -173,15 +240,15 @@ class CommandProcessor:
         if not args:
             return {'error': 'Get what?'}
         
-        if not character.current_room:
+        room = self._get_room(character)
+        if not room:
             return {'error': 'You are not in a room'}
         
         target = ' '.join(args)
-        room = character.current_room
         
         # Find item in room
         item = None
-        for room_item in room.get_items_in_room():
+        for room_item in self._get_items_in_room(room):
             if target.lower() in room_item.name.lower():
                 item = room_item
                 break
@@ -195,6 +262,9 @@ class CommandProcessor:
         
         db.session.commit()
         
+        # The room's spawn list brings a replacement back later
+        get_respawn_manager().item_taken(room.id, item)
+        
         return {
             'message': f'You pick up {item.name}.',
             'affects_room': True,
@@ -207,7 +277,8 @@ class CommandProcessor:
         if not args:
             return {'error': 'Drop what?'}
         
-        if not character.current_room:
+        room = self._get_room(character)
+        if not room:
             return {'error': 'You are not in a room'}
         
         target = ' '.join(args)
@@ -223,14 +294,17 @@ class CommandProcessor:
             return {'error': f'You don\'t have "{target}".'}
         
         # Unequip if equipped
-        if item.equipped_character_id == character.id:
+        was_equipped = item.equipped_character_id == character.id
+        if was_equipped:
             item.equipped_character_id = None
         
         # Move item to room
         item.owner_character_id = None
-        item.room_id = character.current_room.id
+        item.room_id = room.id
         
         db.session.commit()
+        if was_equipped:
+            get_stat_engine().unequip(character, item)
         
         return {
             'message': f'You drop {item.name}.',
@@ -261,8 +335,8 @@ class CommandProcessor:
         
         # Equip item
         item.equipped_character_id = character.id
-        
         db.session.commit()
+        get_stat_engine().equip(character, item)
         
         return {'message': f'You equip {item.name}.'}
     
@@ -286,14 +360,15 @@ class CommandProcessor:
         
         # Unequip item
         item.equipped_character_id = None
-        
         db.session.commit()
+        get_stat_engine().unequip(character, item)
         
         return {'message': f'You unequip {item.name}.'}
     
     def cmd_move(self, character, args, extra_args, direction_cmd):
         """Move in a direction (called by directional commands)"""
-        if not character.current_room:
+        room = self._get_room(character)
+        if not room:
             return {'error': 'You are not in a room'}
         
         # Map short commands to full directions
@@ -310,35 +385,20 @@ class CommandProcessor:
         if not direction:
             return {'error': 'Invalid direction'}
         
-        room = character.current_room
-        
-        target_room_id = room.get_exit_room(direction)
+        target_room_id, exit_key = room.resolve_exit(direction)
         if not target_room_id:
             return {'error': f'You can\'t go {direction} from here.'}
         
-        target_room = Room.query.filter_by(room_id=target_room_id).first()
+        target_room = get_world_graph().get_room_by_room_id(target_room_id)
         if not target_room:
             return {'error': 'Target room not found.'}
         
-        # Move character
+        # Move character (written back by the character state flusher)
         old_coords = (character.x_coord, character.y_coord, character.z_coord)
-        character.current_room_id = target_room.id
-        character.x_coord = target_room.x_coord
-        character.y_coord = target_room.y_coord
-        character.z_coord = target_room.z_coord
+        self._move_character(character, target_room)
         
         print(f"[MOVE] Character ID: {character.id}")
         print(f"[MOVE] Moving from {old_coords} to ({target_room.x_coord}, {target_room.y_coord}, {target_room.z_coord})")
-        print(f"[MOVE] Character coords before commit: ({character.x_coord}, {character.y_coord}, {character.z_coord})")
-        
-        db.session.commit()
-        
-        print(f"[MOVE] Character coords after commit: ({character.x_coord}, {character.y_coord}, {character.z_coord})")
-        
-        # Verify the update persisted
-        db.session.refresh(character)
-        print(f"[MOVE] Character coords after refresh: ({character.x_coord}, {character.y_coord}, {character.z_coord})")
-        print(f"[MOVE] ✅ Database update confirmed for character {character.id}")
         
         # Get formatted room description (same as look command)
         room_description = self._format_room_description(target_room, character, include_items_and_chars=True)
@@ -360,39 +420,26 @@ class CommandProcessor:
         if not args:
             return {'error': 'Go where?'}
         
-        if not character.current_room:
+        room = self._get_room(character)
+        if not room:
             return {'error': 'You are not in a room'}
         
         direction = args[0].lower()
-        room = character.current_room
         
-        target_room_id, exit_key = room.get_exit_room(direction)
+        target_room_id, exit_key = room.resolve_exit(direction)
         if not target_room_id:
             return {'error': f'You can\'t go {direction} from here.'}
         
-        target_room = Room.query.filter_by(room_id=target_room_id).first()
+        target_room = get_world_graph().get_room_by_room_id(target_room_id)
         if not target_room:
             return {'error': 'Target room not found.'}
         
-        # Move character
+        # Move character (written back by the character state flusher)
         old_coords = (character.x_coord, character.y_coord, character.z_coord)
-        character.current_room_id = target_room.id
-        character.x_coord = target_room.x_coord
-        character.y_coord = target_room.y_coord
-        character.z_coord = target_room.z_coord
+        self._move_character(character, target_room)
         
         print(f"[GO] Character ID: {character.id}")
         print(f"[GO] Moving from {old_coords} to ({target_room.x_coord}, {target_room.y_coord}, {target_room.z_coord})")
-        print(f"[GO] Character coords before commit: ({character.x_coord}, {character.y_coord}, {character.z_coord})")
-        
-        db.session.commit()
-        
-        print(f"[GO] Character coords after commit: ({character.x_coord}, {character.y_coord}, {character.z_coord})")
-        
-        # Verify the update persisted
-        db.session.refresh(character)
-        print(f"[GO] Character coords after refresh: ({character.x_coord}, {character.y_coord}, {character.z_coord})")
-        print(f"[GO] ✅ Database update confirmed for character {character.id}")
         
         # Get formatted room description (same as look command)
         room_description = self._format_room_description(target_room, character, include_items_and_chars=True)
@@ -454,14 +501,10 @@ class CommandProcessor:
         # Save to chat database
         chat_message.save()
         
-        # Format message with timestamp
-        timestamp = chat_message.timestamp.strftime('%H:%M:%S')
-        formatted_message = f'[chat] {timestamp} {character.name}: {message}'
-        
+        # Global chat goes out through the censored/uncensored chat rooms only,
+        # never through the (unfiltered) room broadcast
         return {
-            'affects_room': True,
             'action': 'chat',
-            'room_message': formatted_message,
             'chat_message': chat_message.to_dict()
         }
     
@@ -475,13 +518,23 @@ class CommandProcessor:
 
         db.session.commit()
 
+        # Move this player's connections to the matching global chat room
+        get_chat_broadcaster().set_censor(player.id, player.censor_enabled)
+
         status = "on" if player.censor_enabled else "off"
         return {'message': f'Chat censoring turned {status}.'}
     
     def cmd_who(self, character, args, unparsed_args, command_key=None):
         """Show who is online"""
-        # TODO: Implement online player list
-        return {'message': 'Online players: (feature not implemented yet)'}
+        registry = get_session_registry()
+        presence = registry.presence()
+        
+        message = f"<b>Players online: {presence['players']}</b>\n"
+        for entry in registry.online_characters():
+            you = " (you)" if entry.character_id == character.id else ""
+            message += f"  {entry.character_name}{you}\n"
+        
+        return {'message': message}
     
     def cmd_help(self, character, args, unparsed_args, command_key=None):
         """Show help"""
@@ -496,6 +549,8 @@ class CommandProcessor:
   look/l, examine/ex <object>, get/take <item>, drop <item>
 <u>Equipment:</u>
   equip <item>, unequip <item>, inventory/i
+<u>Combat:</u>
+  kill <target>
 <u>Social:</u>
   say <message>, emote <action>, chat <message>, censor, who
 <u>System:</u>
@@ -510,6 +565,8 @@ class CommandProcessor:
     def cmd_save(self, character, args, unparsed_args, command_key=None):
         """Save character"""
         db.session.commit()
+        get_vitals_store().sync([character.id])
+        get_character_state_store().flush([character.id])
         return {'message': 'Character saved.'}
     
     def _look_at_object(self, character, target):
@@ -519,15 +576,17 @@ class CommandProcessor:
             if target.lower() in item.name.lower():
                 return {'message': f'<b>{item.name}</b>\n{item.description or "No description available."}'}
         
+        room = self._get_room(character)
+        
         # Check room items
-        if character.current_room:
-            for item in character.current_room.get_items_in_room():
+        if room:
+            for item in self._get_items_in_room(room):
                 if target.lower() in item.name.lower():
                     return {'message': f'<b>{item.name}</b>\n{item.description or "No description available."}'}
         
         # Check other characters
-        if character.current_room:
-            for char in character.current_room.get_characters_in_room():
+        if room:
+            for char in self._get_characters_in_room(room):
                 if char.id != character.id and target.lower() in char.name.lower():
                     return {'message': f'<b>{char.name}</b>\n{char.description or "No description available."}'}
         
@@ -537,3 +596,15 @@ class CommandProcessor:
         """Examine an object in detail"""
         # For now, same as look
         return self._look_at_object(character, target)
+
+
+# Global command processor instance
+_command_processor = None
+
+
+def get_command_processor():
+    """Get the global command processor"""
+    global _command_processor
+    if _command_processor is None:
+        _command_processor = CommandProcessor()
+    return _command_processor
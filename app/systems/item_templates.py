@@ -0,0 +1,267 @@
+"""
+In-memory registry of item templates.
+
+Every ItemTemplate row is loaded once into an immutable TemplateRecord,
+indexed by primary key and by template_id string. Records carry the derived
+values items ask for constantly (effective weight and durability, base damage
+type, the ItemCategory bitmask) already computed, so Item methods resolve their
+template and its properties without SQL. Any insert, update or delete of an
+ItemTemplate through the ORM drops the registry once its transaction commits
+(a rolled back change leaves it alone); the next lookup reloads it.
+"""
+
+import threading
+from types import MappingProxyType
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models.item_constants import (
+    ItemCategory, WeaponType, DamageType, MaterialType,
+    get_item_category, get_weapon_base_damage_type, get_material_weight_modifier,
+    get_material_durability_modifier
+)
+
+# Session.info key marking a transaction that changed templates
+PENDING_KEY = 'item_templates_changed'
+
+# Columns copied from ItemTemplate into each record
+TEMPLATE_COLUMNS = (
+    'id', 'template_id', 'name', 'description', 'icon_path',
+    'item_type', 'base_type', 'subtype',
+    'weight', 'value', 'quality_tier', 'material',
+    'item_flags', 'item_flags_2', 'wear_flags',
+    'socket_count', 'socket_types',
+    'weapon_type', 'weapon_flags', 'base_damage_min', 'base_damage_max',
+    'attack_speed', 'damage_types',
+    'armor_class', 'armor_slot', 'damage_reduction',
+    'container_capacity', 'container_weight_capacity', 'weight_reduction',
+    'consumable_charges', 'consumable_effects',
+    'components_required', 'crafting_skill', 'crafting_difficulty',
+    'disassembly_data', 'equipment_stats', 'requirements',
+    'max_durability', 'max_enchantments', 'enchantable'
+)
+
+
+def freeze(value):
+    """Read-only copy of a JSON value (dicts become mappingproxies, lists tuples)"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value):
+    """Plain mutable copy of a frozen JSON value"""
+    if isinstance(value, (dict, MappingProxyType)):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+
+class TemplateRecord:
+    """Immutable snapshot of an ItemTemplate row with precomputed properties"""
+
+    __slots__ = TEMPLATE_COLUMNS + (
+        'effective_weight', 'effective_durability', 'base_damage_type', 'category'
+    )
+
+    def __init__(self, template):
+        for column in TEMPLATE_COLUMNS:
+            object.__setattr__(self, column, freeze(getattr(template, column)))
+
+        derived = {
+            'effective_weight': self._compute_effective_weight(),
+            'effective_durability': self._compute_effective_durability(),
+            'base_damage_type': self._compute_base_damage_type(),
+            'category': get_item_category(
+                self.base_type, self.item_type, self.item_flags, self.item_flags_2, self.wear_flags
+            )
+        }
+        for name, value in derived.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'TemplateRecord is read-only (tried to set {name})')
+
+    def __delattr__(self, name):
+        raise AttributeError(f'TemplateRecord is read-only (tried to delete {name})')
+
+    def _compute_effective_weight(self):
+        if not self.material:
+            return self.weight
+        try:
+            return self.weight * get_material_weight_modifier(MaterialType(self.material))
+        except (ValueError, KeyError):
+            return self.weight
+
+    def _compute_effective_durability(self):
+        if not self.material:
+            return self.max_durability
+        try:
+            return int(self.max_durability * get_material_durability_modifier(MaterialType(self.material)))
+        except (ValueError, KeyError):
+            return self.max_durability
+
+    def _compute_base_damage_type(self):
+        if self.weapon_type is not None:
+            try:
+                return get_weapon_base_damage_type(WeaponType(self.weapon_type)).value
+            except ValueError:
+                pass
+        return DamageType.PHYSICAL.value
+
+    def has_category(self, mask):
+        """True if the template is in any of the ItemCategory bits in mask"""
+        return bool(self.category & mask)
+
+    @property
+    def is_equipment(self):
+        return bool(self.category & ItemCategory.EQUIPMENT)
+
+    @property
+    def is_weapon(self):
+        return bool(self.category & ItemCategory.WEAPON)
+
+    @property
+    def is_armor(self):
+        return bool(self.category & ItemCategory.ARMOR)
+
+    @property
+    def is_consumable(self):
+        return bool(self.category & ItemCategory.CONSUMABLE)
+
+    @property
+    def is_clothing(self):
+        return bool(self.category & ItemCategory.CLOTHING)
+
+    @property
+    def is_container(self):
+        return bool(self.category & ItemCategory.CONTAINER)
+
+    @property
+    def is_key(self):
+        return bool(self.category & ItemCategory.KEY)
+
+    # Same interface as ItemTemplate
+    def get_effective_weight(self):
+        return self.effective_weight
+
+    def get_effective_durability(self):
+        return self.effective_durability
+
+    def get_base_damage_type(self):
+        return self.base_damage_type
+
+    def has_flag(self, flag):
+        """Check if template has a specific flag"""
+        value = flag if isinstance(flag, str) else flag.value
+        return value in (self.item_flags or ()) or value in (self.item_flags_2 or ())
+
+    def can_wear_at(self, slot):
+        """Check if item can be worn at a specific slot"""
+        value = slot if isinstance(slot, str) else slot.value
+        return value in (self.wear_flags or ())
+
+    def __repr__(self):
+        return f'<TemplateRecord {self.template_id}>'
+
+
+class ItemTemplateRegistry:
+    """Process-wide, read-only cache of item templates"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._listening = False
+        self.by_pk = {}
+        self.by_template_id = {}
+
+    @property
+    def is_loaded(self):
+        return self._loaded
+
+    def load(self):
+        """Load every template from the database (requires an app context)"""
+        from app.models.item import ItemTemplate
+        self._install_listeners()
+
+        by_pk = {}
+        by_template_id = {}
+        for template in ItemTemplate.query.all():
+            record = TemplateRecord(template)
+            by_pk[record.id] = record
+            by_template_id[record.template_id] = record
+
+        # Swap both indexes at once so readers never see a partial registry
+        with self._lock:
+            self.by_pk = MappingProxyType(by_pk)
+            self.by_template_id = MappingProxyType(by_template_id)
+            self._loaded = True
+
+        print(f"[ITEM TEMPLATES] Loaded {len(by_pk)} templates")
+
+    def ensure_loaded(self):
+        """Load the registry on first use"""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.load()
+
+    def invalidate(self):
+        """Drop everything; the next lookup reloads from the database"""
+        with self._lock:
+            self._loaded = False
+
+    def get(self, pk):
+        """Get a template by primary key"""
+        if pk is None:
+            return None
+        self.ensure_loaded()
+        return self.by_pk.get(pk)
+
+    def get_by_template_id(self, template_id):
+        """Get a template by its string template_id"""
+        if not template_id:
+            return None
+        self.ensure_loaded()
+        return self.by_template_id.get(template_id)
+
+    def _install_listeners(self):
+        if self._listening:
+            return
+        from app.models.item import ItemTemplate
+        for name in ('after_insert', 'after_update', 'after_delete'):
+            event.listen(ItemTemplate, name, self._on_template_changed)
+        event.listen(Session, 'after_commit', self._on_commit)
+        event.listen(Session, 'after_rollback', self._on_rollback)
+        self._listening = True
+
+    def _on_template_changed(self, mapper, connection, template):
+        # Flushed but not committed: other sessions would reload the old rows
+        session = Session.object_session(template)
+        if session is not None:
+            session.info[PENDING_KEY] = True
+        else:
+            self.invalidate()
+
+    def _on_commit(self, session):
+        if session.info.pop(PENDING_KEY, False):
+            self.invalidate()
+
+    def _on_rollback(self, session):
+        session.info.pop(PENDING_KEY, None)
+
+
+# Global item template registry instance
+_item_template_registry = None
+
+
+def get_item_template_registry():
+    """Get the global item template registry"""
+    global _item_template_registry
+    if _item_template_registry is None:
+        _item_template_registry = ItemTemplateRegistry()
+    return _item_template_registry
@@ -0,0 +1,124 @@
+"""
+Push-based minimap updates over Socket.IO.
+
+Each connected client has a minimap view: the set of rooms within
+MINIMAP_RADIUS of its character. When a move changes that set, or the map
+builder edits a room near the view, the client receives a `minimap_delta`
+event carrying only the rooms that were added (or changed) and the ids of
+the rooms that were removed. The HTTP minimap endpoint is only needed for a
+cold start.
+"""
+
+import threading
+
+from app.systems.spatial_index import minimap_entry
+from app.systems.world_graph import get_world_graph
+
+# Rooms within this many units (per axis) of the character are shown
+MINIMAP_RADIUS = 5
+
+
+class MinimapView:
+    """What one client currently has on its minimap"""
+
+    def __init__(self, character_id, position):
+        self.character_id = character_id
+        self.position = position
+        self.room_pks = set()
+
+    def contains(self, room):
+        x, y, z = self.position
+        return (room.z_coord == z and
+                abs(room.x_coord - x) <= MINIMAP_RADIUS and
+                abs(room.y_coord - y) <= MINIMAP_RADIUS)
+
+
+class MinimapPushService:
+    """Tracks per-client minimap views and emits deltas"""
+
+    def __init__(self, emit=None):
+        self._lock = threading.Lock()
+        self._views = {}  # sid -> MinimapView
+        self._emit = emit
+
+    def _send(self, sid, payload):
+        if self._emit is not None:
+            self._emit(sid, payload)
+        else:
+            from app import socketio
+            socketio.emit('minimap_delta', payload, to=sid)
+
+    def _payload(self, view, added, removed, reset=False):
+        x, y, z = view.position
+        return {
+            'reset': reset,
+            'added': [minimap_entry(room) for room in added],
+            'removed': sorted(removed),
+            'player_position': {'x': x, 'y': y, 'z': z}
+        }
+
+    def subscribe(self, sid, character_id, position):
+        """Start tracking a client and send it the full view"""
+        view = MinimapView(character_id, position)
+        rooms = get_world_graph().get_rooms_in_radius(*position, MINIMAP_RADIUS)
+        view.room_pks = {room.id for room in rooms}
+        with self._lock:
+            self._views[sid] = view
+        self._send(sid, self._payload(view, rooms, [], reset=True))
+
+    def unsubscribe(self, sid):
+        """Stop tracking a client"""
+        with self._lock:
+            self._views.pop(sid, None)
+
+    def move(self, sid, position):
+        """Update a client's position; emits a delta if the visible rooms changed"""
+        with self._lock:
+            view = self._views.get(sid)
+        if view is None or view.position == position:
+            return None
+
+        view.position = position
+        rooms = get_world_graph().get_rooms_in_radius(*position, MINIMAP_RADIUS)
+        visible = {room.id: room for room in rooms}
+        added = [room for pk, room in visible.items() if pk not in view.room_pks]
+        removed = view.room_pks - visible.keys()
+        view.room_pks = set(visible)
+
+        if not added and not removed:
+            return None
+        payload = self._payload(view, added, removed)
+        self._send(sid, payload)
+        return payload
+
+    def on_room_changed(self, old, new):
+        """World graph listener: push map builder edits to clients that can see them"""
+        with self._lock:
+            views = list(self._views.items())
+
+        for sid, view in views:
+            added = []
+            removed = set()
+            if new is not None and view.contains(new):
+                added.append(new)
+                view.room_pks.add(new.id)
+            elif old is not None and old.id in view.room_pks:
+                removed.add(old.id)
+                view.room_pks.discard(old.id)
+            if added or removed:
+                self._send(sid, self._payload(view, added, removed))
+
+    def view_count(self):
+        return len(self._views)
+
+
+# Global minimap push service instance
+_minimap_push = None
+
+
+def get_minimap_push():
+    """Get the global minimap push service"""
+    global _minimap_push
+    if _minimap_push is None:
+        _minimap_push = MinimapPushService()
+    return _minimap_push
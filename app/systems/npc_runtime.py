@@ -0,0 +1,413 @@
+"""
+NPC behaviour runtime.
+
+NPCs are partitioned by zone: the area their room belongs to, or the room
+itself when it has no area. Each tick only the NPCs in zones with an online
+player, plus NPCs that have a pending timer, are active; everything else is
+parked and costs nothing. The active set is rebuilt only when the set of
+occupied zones (or the NPC population) changes.
+
+Active NPCs are grouped by ai_behavior and each group is handed to that
+behaviour's batch function in one call. Per-tick cost (active and parked
+counts, time per behaviour) is kept in stats.
+
+With several server processes only the world leader (see ownership) runs
+NPCs. It counts players on other processes as present too, from their
+character rows, refreshed every REMOTE_PLAYERS_INTERVAL_MS.
+"""
+
+import threading
+import time
+
+from sqlalchemy import event
+
+from app import db
+
+# How often the leader re-reads where other processes' players are
+REMOTE_PLAYERS_INTERVAL_MS = 5000
+
+
+class NpcState:
+    """Runtime state of one NPC in the world"""
+
+    __slots__ = ('id', 'npc_id', 'name', 'room_id', 'behavior', 'is_hostile', 'dialogue',
+                 'target_id', 'seen', 'pending_timers')
+
+    def __init__(self, npc):
+        self.id = npc.id
+        self.target_id = None  # character an aggressive NPC has turned on
+        self.seen = set()  # characters a merchant has already greeted
+        self.pending_timers = 0
+        self.update(npc)
+
+    def update(self, npc):
+        self.npc_id = npc.npc_id
+        self.name = npc.name
+        self.room_id = npc.current_room_id
+        self.behavior = npc.ai_behavior or 'passive'
+        self.is_hostile = bool(npc.is_hostile)
+        self.dialogue = dict(npc.dialogue or {})
+
+    def __repr__(self):
+        return f'<NpcState {self.name} ({self.behavior})>'
+
+
+# ----------------------------------------------------------------------
+# Behaviours: each receives every active NPC with that behaviour at once
+# ----------------------------------------------------------------------
+
+def passive_batch(runtime, npcs, players_by_room):
+    """Passive NPCs only react when something is done to them"""
+
+
+def aggressive_batch(runtime, npcs, players_by_room):
+    """Turn on the first player in the room (hostile ones attack); forget targets that left"""
+    for npc in npcs:
+        players = players_by_room.get(npc.room_id)
+        if not players:
+            npc.target_id = None
+            continue
+        if any(character_id == npc.target_id for character_id, _ in players):
+            continue
+        npc.target_id, target_name = players[0]
+        runtime.announce(npc, 'threaten', f'{npc.name} snarls and turns on {target_name}!')
+        if npc.is_hostile:
+            from app.systems.combat import get_combat_engine
+            from app.systems.ownership import get_character_ownership
+            # A character's fights run on the process that owns it
+            if get_character_ownership().owns(npc.target_id):
+                get_combat_engine().engage_ids(('npc', npc.id), ('character', npc.target_id))
+
+
+def merchant_batch(runtime, npcs, players_by_room):
+    """Greet each player once when they enter the merchant's room"""
+    for npc in npcs:
+        players = players_by_room.get(npc.room_id, ())
+        greeting = npc.dialogue.get('greeting') or 'Welcome! Care to see my wares?'
+        for character_id, character_name in players:
+            if character_id not in npc.seen:
+                runtime.announce(npc, 'greet', f"{npc.name} says to {character_name}, '{greeting}'")
+        npc.seen = {character_id for character_id, _ in players}
+
+
+DEFAULT_BEHAVIORS = {
+    'passive': passive_batch,
+    'aggressive': aggressive_batch,
+    'merchant': merchant_batch
+}
+
+
+class NpcRuntime:
+    """Ticks the NPCs near players, in one batch per behaviour"""
+
+    def __init__(self, announce=None):
+        self._lock = threading.RLock()
+        self._announce = announce
+        self._loaded = False
+        self._listening = False
+        self._tick_engine = None
+        self._remote_timer = None
+        self._npcs = {}  # npc pk -> NpcState
+        self._by_zone = {}  # zone -> set of npc pks
+        self._awake = set()  # npc pks with pending timers
+        self._changed = set()  # npc pks written since the last tick
+        self._occupied = frozenset()
+        self._groups = {}  # behaviour -> active NpcStates outside _awake
+        self._stale = True
+        self._remote_players = []  # (room pk, id, name) played on other processes
+        self.behaviors = dict(DEFAULT_BEHAVIORS)
+        self.stats = {
+            'ticks': 0,
+            'active': 0,
+            'parked': 0,
+            'rebuilds': 0,
+            'last_tick_ms': 0.0,
+            'behaviors': {}  # behaviour -> {'npcs': count, 'ms': time}
+        }
+
+    # ------------------------------------------------------------------
+    # Population
+    # ------------------------------------------------------------------
+
+    def load(self):
+        """Load every NPC placed in a room (requires an app context)"""
+        from app.models.npc import NPC
+        self._install_listeners()
+        npcs = {npc.id: NpcState(npc) for npc in NPC.query.filter(NPC.current_room_id.isnot(None))}
+        with self._lock:
+            self._npcs = npcs
+            self._by_zone = {}
+            for state in npcs.values():
+                self._by_zone.setdefault(self._zone(state.room_id), set()).add(state.id)
+            self._awake = set()
+            self._changed = set()
+            self._stale = True
+            self._loaded = True
+
+    def ensure_loaded(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.load()
+
+    def invalidate(self):
+        """Drop everything; the next tick reloads from the database"""
+        with self._lock:
+            self._loaded = False
+            self._npcs = {}
+            self._by_zone = {}
+            self._awake = set()
+            self._changed = set()
+            self._occupied = frozenset()
+            self._groups = {}
+            self._stale = True
+
+    def get(self, npc_pk):
+        return self._npcs.get(npc_pk)
+
+    def upsert(self, npc):
+        """Add an NPC or pick up changes to one (room, behaviour, dialogue)"""
+        if not self._loaded:
+            return
+        with self._lock:
+            state = self._npcs.get(npc.id)
+            if state is not None:
+                self._unplace(state)
+                state.update(npc)
+            else:
+                state = NpcState(npc)
+            if state.room_id is None:
+                self._npcs.pop(state.id, None)
+                self._awake.discard(state.id)
+            else:
+                self._npcs[state.id] = state
+                self._by_zone.setdefault(self._zone(state.room_id), set()).add(state.id)
+            self._stale = True
+
+    def remove(self, npc_pk):
+        with self._lock:
+            state = self._npcs.pop(npc_pk, None)
+            if state is not None:
+                self._unplace(state)
+                self._awake.discard(npc_pk)
+                self._stale = True
+
+    def move(self, npc_pk, room_pk):
+        """Move an NPC between rooms without a database round trip"""
+        with self._lock:
+            state = self._npcs.get(npc_pk)
+            if state is None:
+                return
+            self._unplace(state)
+            state.room_id = room_pk
+            self._by_zone.setdefault(self._zone(room_pk), set()).add(npc_pk)
+            self._stale = True
+
+    def _unplace(self, state):
+        zone = self._zone(state.room_id)
+        members = self._by_zone.get(zone)
+        if members is not None:
+            members.discard(state.id)
+            if not members:
+                del self._by_zone[zone]
+
+    @staticmethod
+    def _zone(room_pk):
+        from app.systems.world_graph import get_world_graph
+        room = get_world_graph().get_room(room_pk)
+        if room is not None and room.area_id is not None:
+            return ('area', room.area_id)
+        return ('room', room_pk)
+
+    def _on_room_changed(self, old, new):
+        """A room moved to another area (or was removed): re-partition"""
+        if old is not None and new is not None and old.area_id == new.area_id:
+            return
+        with self._lock:
+            self._by_zone = {}
+            for state in self._npcs.values():
+                self._by_zone.setdefault(self._zone(state.room_id), set()).add(state.id)
+            self._stale = True
+
+    def _install_listeners(self):
+        if self._listening:
+            return
+        from app.models.npc import NPC
+        from app.systems.world_graph import get_world_graph
+        get_world_graph().add_listener(self._on_room_changed)
+        event.listen(NPC, 'after_insert', self._on_npc_changed)
+        event.listen(NPC, 'after_update', self._on_npc_changed)
+        event.listen(NPC, 'after_delete', self._on_npc_changed)
+        self._listening = True
+
+    def mark_changed(self, npc_pks):
+        """Re-read these NPCs on the next tick (for writes that bypass the ORM)"""
+        if not self._loaded:
+            return  # A load reads them anyway
+        with self._lock:
+            self._changed.update(npc_pks)
+
+    def _on_npc_changed(self, mapper, connection, npc):
+        # Picked up on the next tick; no queries from inside a flush
+        self.mark_changed([npc.id])
+
+    def _apply_changes(self):
+        """Re-read NPC rows written since the last tick in one query"""
+        from app.models.npc import NPC
+        with self._lock:
+            changed, self._changed = self._changed, set()
+        found = {npc.id: npc for npc in NPC.query.filter(NPC.id.in_(changed))}
+        for npc_pk in changed:
+            if npc_pk in found:
+                self.upsert(found[npc_pk])
+            else:
+                self.remove(npc_pk)
+
+    # ------------------------------------------------------------------
+    # Behaviours and timers
+    # ------------------------------------------------------------------
+
+    def register_behavior(self, name, batch):
+        """Dispatch NPCs with ai_behavior == name to batch(runtime, npcs, players_by_room)"""
+        self.behaviors[name] = batch
+
+    def schedule(self, npc_pk, delay_ms, callback):
+        """Run callback(state) after delay_ms, keeping the NPC active until then"""
+        with self._lock:
+            state = self._npcs.get(npc_pk)
+            if state is None:
+                return None
+            state.pending_timers += 1
+            self._awake.add(npc_pk)
+
+        def fire():
+            with self._lock:
+                state.pending_timers -= 1
+                if not state.pending_timers:
+                    self._awake.discard(npc_pk)
+            if self._npcs.get(npc_pk) is state:
+                callback(state)
+
+        return self._tick_engine.call_later(delay_ms, fire, name=f'npc-{npc_pk}')
+
+    def announce(self, npc, action, message):
+        """Tell the NPC's room what it did"""
+        event = {'npc_id': npc.id, 'npc_name': npc.name, 'action': action, 'message': message}
+        if self._announce is not None:
+            self._announce(npc.room_id, event)
+        else:
+            from app.systems.room_broadcast import get_room_broadcaster
+            get_room_broadcaster().publish(npc.room_id, event)
+
+    # ------------------------------------------------------------------
+    # Tick
+    # ------------------------------------------------------------------
+
+    def players_by_room(self):
+        """Online characters grouped by live room: room pk -> [(id, name)]"""
+        from app.systems.character_state import get_character_state_store
+        from app.systems.session_registry import get_session_registry
+        store = get_character_state_store()
+        rooms = {}
+        for entry in get_session_registry().online_characters():
+            room_pk = store.get(entry.character_id, 'current_room_id')
+            if room_pk is not None:
+                rooms.setdefault(room_pk, []).append((entry.character_id, entry.character_name))
+        for room_pk, character_id, name in self._remote_players:
+            rooms.setdefault(room_pk, []).append((character_id, name))
+        return rooms
+
+    def refresh_remote_players(self):
+        """Read where characters leased by other processes are (leader only)"""
+        from app.models.character import Character
+        from app.systems.ownership import get_character_ownership
+
+        ownership = get_character_ownership()
+        remote = []
+        if ownership.shared and ownership.is_leader:
+            ids = [cid for cid in ownership.leased_character_ids() if not ownership.owns(cid)]
+            if ids:
+                remote = db.session.query(
+                    Character.current_room_id, Character.id, Character.name
+                ).filter(Character.id.in_(ids), Character.current_room_id.isnot(None)).all()
+        self._remote_players = [tuple(row) for row in remote]
+        return len(self._remote_players)
+
+    def tick(self, players_by_room=None):
+        """Run one batch per behaviour over the active NPCs"""
+        from app.systems.ownership import get_character_ownership
+        if not get_character_ownership().is_leader:
+            if self._loaded:
+                # Another process runs the NPCs now; reload if we lead again
+                self.invalidate()
+            return
+        started = time.perf_counter()
+        self.ensure_loaded()
+        if self._changed:
+            self._apply_changes()
+        if players_by_room is None:
+            players_by_room = self.players_by_room()
+
+        with self._lock:
+            occupied = frozenset(self._zone(room_pk) for room_pk in players_by_room)
+            if self._stale or occupied != self._occupied:
+                self._rebuild(occupied)
+            groups = {behavior: list(npcs) for behavior, npcs in self._groups.items()}
+            for npc_pk in self._awake:
+                state = self._npcs[npc_pk]
+                if self._zone(state.room_id) not in occupied:
+                    groups.setdefault(state.behavior, []).append(state)
+
+        behaviors = {}
+        active = 0
+        for behavior, npcs in groups.items():
+            batch = self.behaviors.get(behavior, passive_batch)
+            batch_started = time.perf_counter()
+            try:
+                batch(self, npcs, players_by_room)
+            except Exception as e:
+                print(f"[NPC ERROR] Behaviour {behavior}: {e}")
+            behaviors[behavior] = {
+                'npcs': len(npcs),
+                'ms': (time.perf_counter() - batch_started) * 1000
+            }
+            active += len(npcs)
+
+        self.stats['ticks'] += 1
+        self.stats['active'] = active
+        self.stats['parked'] = len(self._npcs) - active
+        self.stats['behaviors'] = behaviors
+        self.stats['last_tick_ms'] = (time.perf_counter() - started) * 1000
+        return active
+
+    def _rebuild(self, occupied):
+        groups = {}
+        for zone in occupied:
+            for npc_pk in self._by_zone.get(zone, ()):
+                state = self._npcs[npc_pk]
+                groups.setdefault(state.behavior, []).append(state)
+        self._groups = groups
+        self._occupied = occupied
+        self._stale = False
+        self.stats['rebuilds'] += 1
+
+    def start(self, tick_engine):
+        """Run the NPCs as a phase of every game tick"""
+        self._tick_engine = tick_engine
+        tick_engine.add_phase('npcs', self.tick)
+        if self._remote_timer is None:
+            self._remote_timer = tick_engine.call_every(
+                REMOTE_PLAYERS_INTERVAL_MS, self.refresh_remote_players, name='npc-remote-players'
+            )
+
+
+# Global NPC runtime instance
+_npc_runtime = None
+
+
+def get_npc_runtime():
+    """Get the global NPC runtime"""
+    global _npc_runtime
+    if _npc_runtime is None:
+        _npc_runtime = NpcRuntime()
+    return _npc_runtime
@@ -0,0 +1,258 @@
+"""
+Character ownership leases for multi-process deployments.
+
+When several game server processes share one database, each character must
+be driven by exactly one of them: its live state, command queue and session
+entry all live in that process's memory. A process takes a lease on a
+character when a client joins the game with it and keeps renewing it while
+the character is connected. Another process asking for the same character
+is refused until the lease is released or expires.
+
+World-level systems (NPC behaviour, respawns) must also run in only one
+process, or every process would move the same NPCs and spawn the same items.
+They are driven by whichever process holds the world leader lease, taken and
+renewed the same way; another process takes over once it expires.
+
+With a Socket.IO message queue configured the leases are Redis keys
+(SET NX PX); in single-process mode they are kept in memory.
+"""
+
+import atexit
+import os
+import socket
+import threading
+import time
+import uuid
+
+# Lease lifetime; leases are renewed every third of this
+LEASE_TTL_MS = 30000
+
+KEY_PREFIX = 'mudra:character_owner:'
+LEADER_KEY = 'mudra:world_leader'
+
+
+class LocalLeaseBackend:
+    """In-process leases for single-worker mode"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._leases = {}  # key -> (owner, expires_at)
+
+    def acquire(self, key, owner, ttl_ms):
+        now = time.monotonic()
+        with self._lock:
+            current = self._leases.get(key)
+            if current and current[0] != owner and current[1] > now:
+                return False
+            self._leases[key] = (owner, now + ttl_ms / 1000)
+            return True
+
+    def renew(self, key, owner, ttl_ms):
+        with self._lock:
+            current = self._leases.get(key)
+            if not current or current[0] != owner:
+                return False
+            self._leases[key] = (owner, time.monotonic() + ttl_ms / 1000)
+            return True
+
+    def release(self, key, owner):
+        with self._lock:
+            current = self._leases.get(key)
+            if current and current[0] == owner:
+                del self._leases[key]
+
+    def owner(self, key):
+        current = self._leases.get(key)
+        if current and current[1] > time.monotonic():
+            return current[0]
+        return None
+
+    def keys(self, prefix):
+        now = time.monotonic()
+        with self._lock:
+            return [key for key, (_, expires_at) in self._leases.items()
+                    if key.startswith(prefix) and expires_at > now]
+
+
+class RedisLeaseBackend:
+    """Leases stored as Redis keys shared by all workers"""
+
+    def __init__(self, client):
+        self._redis = client
+
+    def acquire(self, key, owner, ttl_ms):
+        if self._redis.set(key, owner, nx=True, px=ttl_ms):
+            return True
+        # Re-joining a character this worker already owns just renews it
+        return self.renew(key, owner, ttl_ms)
+
+    def renew(self, key, owner, ttl_ms):
+        return self._if_owner(key, owner, lambda pipe: pipe.pexpire(key, ttl_ms))
+
+    def release(self, key, owner):
+        self._if_owner(key, owner, lambda pipe: pipe.delete(key))
+
+    def owner(self, key):
+        value = self._redis.get(key)
+        return value.decode('utf-8') if value is not None else None
+
+    def keys(self, prefix):
+        return [key.decode('utf-8') for key in self._redis.scan_iter(match=f"{prefix}*")]
+
+    def _if_owner(self, key, owner, action):
+        """Apply an action to a key only while this worker still owns it"""
+        import redis
+        with self._redis.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                value = pipe.get(key)
+                if value is None or value.decode('utf-8') != owner:
+                    pipe.unwatch()
+                    return False
+                pipe.multi()
+                action(pipe)
+                pipe.execute()
+                return True
+            except redis.WatchError:
+                return False
+
+
+class CharacterOwnership:
+    """Leases that pin each character to a single worker process"""
+
+    def __init__(self, backend=None, owner_id=None, ttl_ms=LEASE_TTL_MS):
+        self.backend = backend or LocalLeaseBackend()
+        self.owner_id = owner_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.ttl_ms = ttl_ms
+        self._lock = threading.Lock()
+        self._held = set()  # character ids leased by this worker
+        self._leader = False
+        self._timer = None
+        self.campaign()
+
+    @property
+    def shared(self):
+        """True when other processes lease from the same backend"""
+        return isinstance(self.backend, RedisLeaseBackend)
+
+    @property
+    def is_leader(self):
+        """Whether this worker runs the world-level systems"""
+        return self._leader
+
+    def init_app(self, app):
+        """Use Redis leases when Socket.IO runs across processes"""
+        with self._lock:
+            self._held = set()
+        self._leader = False
+        if app.config.get('SOCKETIO_MESSAGE_QUEUE'):
+            from app import get_redis
+            from app.systems.tick_engine import get_tick_engine
+            self.backend = RedisLeaseBackend(get_redis())
+            self.campaign()
+            self.start(get_tick_engine())
+        else:
+            self.backend = LocalLeaseBackend()
+            self.campaign()
+
+    @staticmethod
+    def _key(character_id):
+        return f"{KEY_PREFIX}{character_id}"
+
+    def acquire(self, character_id):
+        """Take the lease on a character; False if another worker holds it"""
+        if not self.backend.acquire(self._key(character_id), self.owner_id, self.ttl_ms):
+            return False
+        with self._lock:
+            self._held.add(character_id)
+        return True
+
+    def release(self, character_id):
+        with self._lock:
+            self._held.discard(character_id)
+        self.backend.release(self._key(character_id), self.owner_id)
+
+    def owns(self, character_id):
+        return character_id in self._held
+
+    def owner_of(self, character_id):
+        return self.backend.owner(self._key(character_id))
+
+    def leased_character_ids(self):
+        """Ids of every character leased by any worker"""
+        return [int(key[len(KEY_PREFIX):]) for key in self.backend.keys(KEY_PREFIX)]
+
+    def campaign(self):
+        """Renew the world leader lease, or take it if nobody holds it
+
+        Returns:
+            bool: Whether this worker is the leader
+        """
+        if self._leader and not self.backend.renew(LEADER_KEY, self.owner_id, self.ttl_ms):
+            self._leader = False
+            print(f"[OWNERSHIP] Warning: {self.owner_id} lost the world leader lease")
+        if not self._leader and self.backend.acquire(LEADER_KEY, self.owner_id, self.ttl_ms):
+            self._leader = True
+            if self.shared:
+                print(f"[OWNERSHIP] {self.owner_id} is now the world leader")
+        return self._leader
+
+    def resign(self):
+        """Give up the leader lease so another worker takes over at once"""
+        if self._leader:
+            self._leader = False
+            self.backend.release(LEADER_KEY, self.owner_id)
+
+    def renew_all(self):
+        """Extend every lease this worker holds; returns ids whose lease was lost"""
+        with self._lock:
+            held = list(self._held)
+        lost = []
+        for character_id in held:
+            if not self.backend.renew(self._key(character_id), self.owner_id, self.ttl_ms):
+                lost.append(character_id)
+        if lost:
+            with self._lock:
+                self._held.difference_update(lost)
+            print(f"[OWNERSHIP] Warning: lost leases on characters {lost}")
+        return lost
+
+    def start(self, tick_engine):
+        """Renew held leases every third of their lifetime on the game tick"""
+        if self._timer is not None:
+            return
+        self._timer = tick_engine.call_every(self.ttl_ms / 3, self._periodic_renew,
+                                             name='ownership-renew')
+        atexit.register(self.resign)
+
+    def _periodic_renew(self):
+        try:
+            for character_id in self.renew_all():
+                self._drop_local_state(character_id)
+            self.campaign()
+        except Exception as e:
+            print(f"[OWNERSHIP ERROR] {e}")
+
+    @staticmethod
+    def _drop_local_state(character_id):
+        """Forget a character another worker now owns, without writing it back"""
+        from app.systems.character_state import get_character_state_store
+        from app.systems.combat import get_combat_engine
+        from app.systems.stat_engine import get_stat_engine
+        from app.systems.vitals import get_vitals_store
+        get_combat_engine().end_fights(character_id)
+        get_vitals_store().remove(character_id, sync=False)
+        get_character_state_store().discard(character_id)
+        get_stat_engine().discard(character_id)
+
+
+# Global character ownership instance
+_character_ownership = None
+
+
+def get_character_ownership():
+    """Get the global character ownership leases"""
+    global _character_ownership
+    if _character_ownership is None:
+        _character_ownership = CharacterOwnership()
+    return _character_ownership
@@ -0,0 +1,377 @@
+"""
+Respawns for NPCs and room item spawns.
+
+Room.npcs and Room.items list the NPC and item template ids a room should
+hold. When an NPC dies (and is neither unique nor respawn_time 0) or a
+spawned item is taken, a respawn entry goes on a timing wheel: O(1) to
+schedule, and each tick only touches the entries that are due. Everything
+due on a tick is written in one transaction: one bulk INSERT for the items
+and one executemany UPDATE putting the NPCs back in their room at full
+vitals (NPC rows are unique per npc_id, so they are restored, not copied).
+
+NPC deaths are persisted as NPC.died_at and taken items as RoomItemRespawn
+rows with their due time, so after a restart the pending respawns are rebuilt
+from the database on their original schedule. Room item spawns missing
+without such a row spawn straight away.
+
+A batch that fails to spawn is retried with exponential backoff, from
+RETRY_BASE_SECONDS up to RETRY_MAX_SECONDS, so a persistent error does not
+fill the log on every tick.
+
+With several server processes only the world leader (see ownership) spawns.
+Deaths and taken items recorded by other processes reach it through the
+database: the leader re-runs recovery every RESPAWN_RESCAN_INTERVAL seconds.
+"""
+
+import math
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, delete, func, insert
+
+from app import db
+from app.systems.tick_engine import TimingWheel
+
+# Delay before the first retry of a failed spawn batch, doubled per failure
+RETRY_BASE_SECONDS = 1
+RETRY_MAX_SECONDS = 60
+
+
+class RespawnEntry:
+    """One pending spawn on the wheel"""
+
+    __slots__ = ('due_tick', 'kind', 'key', 'room_pk', 'row_id', 'cancelled')
+
+    def __init__(self, due_tick, kind, key, room_pk, row_id=None):
+        self.due_tick = due_tick
+        self.kind = kind  # 'npc' (key: NPC pk) or 'item' (key: template_id)
+        self.key = key
+        self.room_pk = room_pk
+        self.row_id = row_id  # RoomItemRespawn row to delete once spawned
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class RespawnManager:
+    """Schedules respawns on a timing wheel and spawns one batch per tick"""
+
+    def __init__(self, tick_ms=100):
+        self._lock = threading.Lock()
+        self._app = None
+        self.tick_ms = tick_ms
+        self.item_respawn_time = 300
+        self._wheel = TimingWheel()
+        self._npcs = {}  # NPC pk -> pending entry
+        self._items = Counter()  # (room pk, template_id) -> pending entries
+        self._item_rows = set()  # RoomItemRespawn ids on the wheel
+        self._retry = []  # entries from a tick whose transaction failed
+        self._retry_tick = 0  # retried on or after this tick
+        self._failures = 0  # consecutive failed spawn batches
+        self._recovered = False
+        self.rescan_interval = 0
+        self._rescan_timer = None
+        self.stats = {'scheduled': 0, 'items_spawned': 0, 'npcs_spawned': 0, 'last_tick_ms': 0.0}
+
+    def init_app(self, app):
+        """Configure the manager from the app config"""
+        self._app = app
+        self.tick_ms = app.config.get('GAME_TICK_RATE', self.tick_ms)
+        self.item_respawn_time = app.config.get('ITEM_RESPAWN_TIME', 300)
+        # Only needed when other processes record deaths the leader must see
+        self.rescan_interval = (app.config.get('RESPAWN_RESCAN_INTERVAL', 30)
+                                if app.config.get('SOCKETIO_MESSAGE_QUEUE') else 0)
+        self.reset()
+
+    def reset(self):
+        """Drop every pending respawn; the next tick rebuilds them from the database"""
+        with self._lock:
+            self._wheel = TimingWheel()
+            self._npcs = {}
+            self._items = Counter()
+            self._item_rows = set()
+            self._retry = []
+            self._retry_tick = 0
+            self._failures = 0
+            self._recovered = False
+
+    def pending(self):
+        return len(self._npcs) + sum(self._items.values())
+
+    # ------------------------------------------------------------------
+    # Scheduling
+    # ------------------------------------------------------------------
+
+    def _ticks(self, seconds):
+        return max(1, math.ceil(seconds * 1000 / self.tick_ms))
+
+    def _schedule(self, delay_seconds, kind, key, room_pk, row_id=None):
+        ticks = self._ticks(delay_seconds)
+        with self._lock:
+            entry = RespawnEntry(self._wheel.current_tick + ticks, kind, key, room_pk, row_id)
+            self._wheel.add(entry)
+            if kind == 'npc':
+                self._npcs[key] = entry
+            else:
+                self._items[(room_pk, key)] += 1
+                if row_id is not None:
+                    self._item_rows.add(row_id)
+            self.stats['scheduled'] += 1
+        return entry
+
+    def npc_died(self, npc):
+        """Record an NPC's death and schedule its respawn; the caller commits"""
+        home = self.home_room(npc.npc_id) or npc.current_room_id
+        npc.died_at = datetime.utcnow()
+        npc.current_room_id = None
+        if npc.is_unique or not npc.respawn_time or home is None:
+            return None
+        if npc.id in self._npcs:
+            return self._npcs[npc.id]
+        return self._schedule(npc.respawn_time, 'npc', npc.id, home)
+
+    def item_taken(self, room_pk, item):
+        """Record and schedule a replacement when a room's spawned item is taken"""
+        from app.systems.world_graph import get_world_graph
+        from app.models.item import Item
+        from app.models.room import RoomItemRespawn
+
+        room = get_world_graph().get_room(room_pk)
+        template = item.template
+        if room is None or template is None or template.template_id not in room.items:
+            return None
+        wanted = room.items.count(template.template_id)
+        present = Item.query.filter(Item.room_id == room_pk,
+                                    Item.template_id == template.id).count()
+        # Rows rather than the wheel, which only the leader fills
+        pending = RoomItemRespawn.query.filter_by(room_id=room_pk,
+                                                  template_id=template.template_id).count()
+        if present + pending >= wanted:
+            return None
+        row = RoomItemRespawn(room_id=room_pk, template_id=template.template_id,
+                              due_at=datetime.utcnow() + timedelta(seconds=self.item_respawn_time))
+        db.session.add(row)
+        db.session.commit()
+        return self._schedule(self.item_respawn_time, 'item', template.template_id, room_pk,
+                              row.id)
+
+    @staticmethod
+    def home_room(npc_id):
+        """The room whose spawn list names this NPC"""
+        from app.systems.world_graph import get_world_graph
+        graph = get_world_graph()
+        graph.ensure_loaded()
+        for room in list(graph.rooms_by_pk.values()):
+            if npc_id in room.npcs:
+                return room.id
+        return None
+
+    # ------------------------------------------------------------------
+    # Recovery
+    # ------------------------------------------------------------------
+
+    def recover(self):
+        """Rebuild pending respawns from the database (requires an app context)
+
+        Dead NPCs are rescheduled from died_at + respawn_time and taken items
+        from their RoomItemRespawn rows (already due ones spawn on the next
+        tick). NPCs named in a room's spawn list that were never placed, and
+        room items missing without a row, spawn on the next tick.
+        """
+        from app.models.item import Item
+        from app.models.npc import NPC
+        from app.models.room import RoomItemRespawn
+        from app.systems.item_templates import get_item_template_registry
+        from app.systems.world_graph import get_world_graph
+
+        first = not self._recovered
+        scheduled = self.stats['scheduled']
+        self._recovered = True
+        graph = get_world_graph()
+        graph.ensure_loaded()
+        rooms = list(graph.rooms_by_pk.values())
+        now = datetime.utcnow()
+
+        homes = {}
+        for room in rooms:
+            for npc_id in room.npcs:
+                homes.setdefault(npc_id, room.id)
+        if homes:
+            absent = NPC.query.filter(NPC.npc_id.in_(list(homes)),
+                                      NPC.current_room_id.is_(None)).all()
+            for npc in absent:
+                if npc.id in self._npcs:
+                    continue
+                if npc.died_at is None:
+                    self._schedule(0, 'npc', npc.id, homes[npc.npc_id])
+                elif npc.respawn_time and not npc.is_unique:
+                    due = npc.died_at + timedelta(seconds=npc.respawn_time)
+                    self._schedule(max(0.0, (due - now).total_seconds()), 'npc', npc.id,
+                                   homes[npc.npc_id])
+
+        for row in RoomItemRespawn.query.all():
+            if row.id not in self._item_rows:
+                self._schedule(max(0.0, (row.due_at - now).total_seconds()), 'item',
+                               row.template_id, row.room_id, row.id)
+
+        spawn_rooms = {room.id: Counter(room.items) for room in rooms if room.items}
+        if spawn_rooms:
+            registry = get_item_template_registry()
+            present = Counter()
+            rows = db.session.query(Item.room_id, Item.template_id, func.count(Item.id)).filter(
+                Item.room_id.in_(list(spawn_rooms))
+            ).group_by(Item.room_id, Item.template_id)
+            for room_pk, template_pk, count in rows:
+                template = registry.get(template_pk)
+                if template is not None:
+                    present[(room_pk, template.template_id)] = count
+            for room_pk, wanted in spawn_rooms.items():
+                for template_id, count in wanted.items():
+                    key = (room_pk, template_id)
+                    for _ in range(count - present[key] - self._items[key]):
+                        self._schedule(0, 'item', template_id, room_pk)
+
+        if first or self.stats['scheduled'] != scheduled:
+            print(f"[RESPAWN] {self.pending()} respawns pending after recovery")
+
+    def rescan(self):
+        """Pick up deaths and taken items recorded by other processes (leader only)"""
+        from app.systems.ownership import get_character_ownership
+        if self._recovered and get_character_ownership().is_leader:
+            self.recover()
+
+    # ------------------------------------------------------------------
+    # Tick
+    # ------------------------------------------------------------------
+
+    def tick(self):
+        """Spawn everything due on this tick in one transaction"""
+        from app.systems.ownership import get_character_ownership
+        if not get_character_ownership().is_leader:
+            if self._recovered or self._npcs or self._items:
+                # The leader spawns; rebuild from the database if we lead again
+                self.reset()
+            return 0
+        if not self._recovered:
+            self.recover()
+        with self._lock:
+            due = self._wheel.advance()
+            if self._retry and self._wheel.current_tick >= self._retry_tick:
+                due = self._retry + due
+                self._retry = []
+        if not due:
+            return 0
+
+        started = time.perf_counter()
+        try:
+            items, npcs = self._spawn(due)
+        except Exception as e:
+            db.session.rollback()
+            self._failures += 1
+            delay = min(RETRY_BASE_SECONDS * 2 ** (self._failures - 1), RETRY_MAX_SECONDS)
+            print(f"[RESPAWN] Spawn failed ({self._failures} in a row), "
+                  f"retrying {len(due)} entries in {delay}s: {e}")
+            with self._lock:
+                self._retry.extend(due)
+                self._retry_tick = self._wheel.current_tick + self._ticks(delay)
+            return 0
+
+        self._failures = 0
+        with self._lock:
+            for entry in due:
+                if entry.kind == 'npc':
+                    self._npcs.pop(entry.key, None)
+                else:
+                    self._items[(entry.room_pk, entry.key)] -= 1
+                    self._item_rows.discard(entry.row_id)
+            self._items += Counter()  # Drop zero counts
+        self.stats['items_spawned'] += items
+        self.stats['npcs_spawned'] += npcs
+        self.stats['last_tick_ms'] = (time.perf_counter() - started) * 1000
+        return items + npcs
+
+    def _spawn(self, due):
+        from app.models.item import Item
+        from app.models.npc import NPC
+        from app.models.room import RoomItemRespawn
+        from app.systems.item_templates import get_item_template_registry
+        from app.systems.world_graph import get_world_graph
+
+        registry = get_item_template_registry()
+        graph = get_world_graph()
+        item_rows = []
+        npc_rows = []
+        # Spawned or no longer spawnable either way
+        done_rows = [entry.row_id for entry in due if entry.row_id is not None]
+        for entry in due:
+            room = graph.get_room(entry.room_pk)
+            if room is None:
+                continue
+            if entry.kind == 'item':
+                template = registry.get_by_template_id(entry.key)
+                if template is None:
+                    continue
+                item_rows.append({
+                    'template_id': template.id,
+                    'name': template.name,
+                    'description': template.description,
+                    'room_id': room.id,
+                    'condition': 100,
+                    'current_durability': template.max_durability
+                })
+            else:
+                npc_rows.append({
+                    '_id': entry.key,
+                    '_room': room.id,
+                    '_x': room.x_coord,
+                    '_y': room.y_coord,
+                    '_z': room.z_coord
+                })
+
+        if item_rows:
+            db.session.execute(insert(Item), item_rows)
+        if done_rows:
+            db.session.execute(delete(RoomItemRespawn).where(RoomItemRespawn.id.in_(done_rows)))
+        if npc_rows:
+            table = NPC.__table__
+            db.session.execute(
+                table.update().where(table.c.id == bindparam('_id')).values(
+                    current_room_id=bindparam('_room'),
+                    x_coord=bindparam('_x'),
+                    y_coord=bindparam('_y'),
+                    z_coord=bindparam('_z'),
+                    died_at=None,
+                    current_hp=table.c.max_hp,
+                    current_mana=table.c.max_mana,
+                    current_movement=table.c.max_movement
+                ),
+                npc_rows
+            )
+        db.session.commit()
+
+        if npc_rows:
+            from app.systems.npc_runtime import get_npc_runtime
+            get_npc_runtime().mark_changed([row['_id'] for row in npc_rows])
+        return len(item_rows), len(npc_rows)
+
+    def start(self, tick_engine):
+        """Spawn due entries as a phase of every game tick"""
+        tick_engine.add_phase('respawn', self.tick)
+        if self._rescan_timer is None and self.rescan_interval:
+            self._rescan_timer = tick_engine.call_every(self.rescan_interval * 1000, self.rescan,
+                                                        name='respawn-rescan')
+
+
+# Global respawn manager instance
+_respawn_manager = None
+
+
+def get_respawn_manager():
+    """Get the global respawn manager"""
+    global _respawn_manager
+    if _respawn_manager is None:
+        _respawn_manager = RespawnManager()
+    return _respawn_manager
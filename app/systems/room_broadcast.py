@@ -0,0 +1,80 @@
+"""
+Coalesced room broadcasts.
+
+Room-scoped events (arrivals, departures, says, emotes, item pickups) are
+buffered for one frame (a game tick) and sent as a single `room_updates`
+payload per room. Senders are excluded with one skip_sid list on the room
+emit; each sender then gets its own payload with everyone else's events, so
+nobody sees their own actions echoed and no per-message recipient filtering
+is needed.
+"""
+
+import threading
+
+
+class RoomBroadcaster:
+    """Buffers room events and flushes one batch per room per frame"""
+
+    def __init__(self, emit=None):
+        self._lock = threading.Lock()
+        self._pending = {}  # room pk -> list of (sender sid, event)
+        self._emit = emit
+        self.stats = {'events': 0, 'batches': 0, 'emits': 0}
+
+    def _send(self, payload, to, skip_sid=None):
+        self.stats['emits'] += 1
+        if self._emit is not None:
+            self._emit(payload, to, skip_sid)
+        else:
+            from app import socketio
+            socketio.emit('room_updates', payload, to=to, skip_sid=skip_sid)
+
+    def publish(self, room_pk, event, sender_sid=None):
+        """Queue an event for everyone in a room except its sender"""
+        if room_pk is None:
+            return
+        with self._lock:
+            self._pending.setdefault(room_pk, []).append((sender_sid, event))
+            self.stats['events'] += 1
+
+    def flush(self):
+        """Send everything buffered since the last flush"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        for room_pk, entries in pending.items():
+            room = f"room_{room_pk}"
+            events = [event for _, event in entries]
+            senders = []
+            for sid, _ in entries:
+                if sid is not None and sid not in senders:
+                    senders.append(sid)
+
+            self.stats['batches'] += 1
+            self._send({'room_id': room_pk, 'events': events}, room, skip_sid=senders or None)
+
+            # Senders still need the events other people caused this frame
+            for sender in senders:
+                others = [event for sid, event in entries if sid != sender]
+                if others:
+                    self._send({'room_id': room_pk, 'events': others}, sender)
+
+    def start(self, tick_engine):
+        """Flush once per frame as the last phase of every game tick"""
+        tick_engine.add_phase('room-broadcast', self.flush)
+
+    def stop(self, tick_engine):
+        tick_engine.remove_phase('room-broadcast')
+        self.flush()
+
+
+# Global room broadcaster instance
+_room_broadcaster = None
+
+
+def get_room_broadcaster():
+    """Get the global room broadcaster"""
+    global _room_broadcaster
+    if _room_broadcaster is None:
+        _room_broadcaster = RoomBroadcaster()
+    return _room_broadcaster
@@ -0,0 +1,145 @@
+"""
+Registry of connected Socket.IO sessions and their active characters.
+
+The character a client picks in `join_game` is recorded against its sid
+together with a detached handle of the Character row. Later socket events
+resolve their character from the sid without querying: the handle is merged
+into the event's session with load=False and the live write-behind state is
+overlaid on top. Handles are dropped whenever the Character row is updated
+through the ORM, so the next event reloads it once.
+"""
+
+import threading
+
+from sqlalchemy import event, inspect
+
+from app import db
+from app.systems.character_state import get_character_state_store
+
+
+class SessionEntry:
+    """One connected client"""
+
+    def __init__(self, sid, player_id, character_id, character_name, handle):
+        self.sid = sid
+        self.player_id = player_id
+        self.character_id = character_id
+        self.character_name = character_name
+        self.handle = handle
+
+
+class SessionRegistry:
+    """Maps Socket.IO sids to the character each client is playing"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = {}  # sid -> SessionEntry
+        self._listening = False
+
+    def register(self, sid, character):
+        """Record the character chosen for a connection
+
+        The instance is detached from the current session and becomes the
+        cached handle; callers should use resolve() afterwards.
+        """
+        self._install_listeners()
+        handle = self._detach(character)
+        entry = SessionEntry(sid, handle.player_id, handle.id, handle.name, handle)
+        with self._lock:
+            self._sessions[sid] = entry
+        return entry
+
+    def unregister(self, sid):
+        """Forget a connection; returns its entry (or None)"""
+        with self._lock:
+            return self._sessions.pop(sid, None)
+
+    def get(self, sid):
+        return self._sessions.get(sid)
+
+    def resolve(self, sid):
+        """Get the active Character for a sid, attached to the current session"""
+        entry = self._sessions.get(sid)
+        if entry is None:
+            return None
+
+        handle = entry.handle
+        if handle is None:
+            from app.models.character import Character
+            character = db.session.get(Character, entry.character_id)
+            if character is None:
+                self.unregister(sid)
+                return None
+            handle = self._detach(character)
+            entry.handle = handle
+            entry.character_name = handle.name
+
+        character = db.session.merge(handle, load=False)
+        return get_character_state_store().apply(character)
+
+    def invalidate(self, character_id):
+        """Drop cached handles for a character; the next resolve reloads it"""
+        with self._lock:
+            for entry in self._sessions.values():
+                if entry.character_id == character_id:
+                    entry.handle = None
+
+    def sids_for_character(self, character_id):
+        return [sid for sid, entry in list(self._sessions.items())
+                if entry.character_id == character_id]
+
+    def sids_for_player(self, player_id):
+        return [sid for sid, entry in list(self._sessions.items())
+                if entry.player_id == player_id]
+
+    def online_characters(self):
+        """Entries for each distinct online character, sorted by name"""
+        by_character = {}
+        for entry in list(self._sessions.values()):
+            by_character.setdefault(entry.character_id, entry)
+        return sorted(by_character.values(), key=lambda entry: entry.character_name.lower())
+
+    def presence(self):
+        """Counts of connections, online characters and online players"""
+        entries = list(self._sessions.values())
+        return {
+            'connections': len(entries),
+            'characters': len({entry.character_id for entry in entries}),
+            'players': len({entry.player_id for entry in entries})
+        }
+
+    @staticmethod
+    def _detach(character):
+        """Detach a fully loaded Character to use as a cached handle"""
+        state = inspect(character)
+        if state.expired_attributes:
+            db.session.refresh(character)
+        # Related rows (player, items) are not cached; they load per event
+        for key in state.mapper.relationships.keys():
+            state.dict.pop(key, None)
+        if state.session is not None:
+            db.session.expunge(character)
+        return character
+
+    def _install_listeners(self):
+        if self._listening:
+            return
+        from app.models.character import Character
+        event.listen(Character, 'after_update', self._on_character_updated)
+        event.listen(Character, 'after_delete', self._on_character_updated)
+        self._listening = True
+
+    def _on_character_updated(self, mapper, connection, character):
+        self.invalidate(character.id)
+
+
+# Global session registry instance
+_session_registry = None
+
+
+def get_session_registry():
+    """Get the global session registry"""
+    global _session_registry
+    if _session_registry is None:
+        _session_registry = SessionRegistry()
+    return _session_registry
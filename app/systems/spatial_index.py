@@ -0,0 +1,135 @@
+"""
+Z-layered grid index of rooms for minimap queries.
+
+Rooms are bucketed into square tiles per z-level so "rooms within radius R on
+level z" only touches the handful of tiles overlapping the query box. Each
+tile keeps a version counter and the pre-serialized minimap JSON of its
+rooms, so minimap responses can be answered with an ETag/304 when nothing in
+view has changed and otherwise assembled without re-serializing rooms.
+"""
+
+import hashlib
+import itertools
+import json
+import threading
+
+# Width/height of a tile in room coordinates
+TILE_SIZE = 8
+
+# Versions are drawn from one counter so a rebuilt tile never reuses an old ETag
+_tile_versions = itertools.count(1)
+
+
+def minimap_entry(room):
+    """Minimap representation of a room node"""
+    return {
+        'id': room.id,
+        'room_id': room.room_id,
+        'name': room.name,
+        'x': room.x_coord,
+        'y': room.y_coord,
+        'z': room.z_coord,
+        'exits': room.exits or {}
+    }
+
+
+class MinimapTile:
+    """One tile of the grid: the rooms it holds and their serialized form"""
+
+    def __init__(self, key):
+        self.key = key  # (z, tile_x, tile_y)
+        self.rooms = {}  # room pk -> RoomNode
+        self.fragments = {}  # room pk -> serialized minimap JSON
+        self.version = next(_tile_versions)
+
+    def put(self, room):
+        self.rooms[room.id] = room
+        self.fragments[room.id] = json.dumps(minimap_entry(room))
+        self.version = next(_tile_versions)
+
+    def discard(self, room_pk):
+        if room_pk in self.rooms:
+            del self.rooms[room_pk]
+            del self.fragments[room_pk]
+            self.version = next(_tile_versions)
+
+
+class SpatialIndex:
+    """Grid/bucket index of room nodes keyed by z-level and tile"""
+
+    def __init__(self, tile_size=TILE_SIZE):
+        self.tile_size = tile_size
+        self._lock = threading.RLock()
+        self._layers = {}  # z -> {(tile_x, tile_y): MinimapTile}
+        self._room_tiles = {}  # room pk -> tile holding it
+
+    def _tile_coords(self, x, y):
+        return x // self.tile_size, y // self.tile_size
+
+    def clear(self):
+        with self._lock:
+            self._layers = {}
+            self._room_tiles = {}
+
+    def add(self, room):
+        """Add or move a room node"""
+        with self._lock:
+            self.remove(room.id)
+            tile_x, tile_y = self._tile_coords(room.x_coord, room.y_coord)
+            layer = self._layers.setdefault(room.z_coord, {})
+            tile = layer.get((tile_x, tile_y))
+            if tile is None:
+                tile = layer[(tile_x, tile_y)] = MinimapTile((room.z_coord, tile_x, tile_y))
+            tile.put(room)
+            self._room_tiles[room.id] = tile
+
+    def remove(self, room_pk):
+        """Remove a room node by primary key"""
+        with self._lock:
+            tile = self._room_tiles.pop(room_pk, None)
+            if tile is not None:
+                tile.discard(room_pk)
+
+    def tiles_in_radius(self, x, y, z, radius):
+        """Tiles overlapping the square of the given radius around (x, y) on level z"""
+        layer = self._layers.get(z)
+        if not layer:
+            return []
+        min_tx, min_ty = self._tile_coords(x - radius, y - radius)
+        max_tx, max_ty = self._tile_coords(x + radius, y + radius)
+        tiles = []
+        for tile_x in range(min_tx, max_tx + 1):
+            for tile_y in range(min_ty, max_ty + 1):
+                tile = layer.get((tile_x, tile_y))
+                if tile is not None:
+                    tiles.append(tile)
+        return tiles
+
+    def rooms_in_radius(self, x, y, z, radius):
+        """Room nodes within radius (per axis) of (x, y) on level z"""
+        with self._lock:
+            rooms = []
+            for tile in self.tiles_in_radius(x, y, z, radius):
+                for room in tile.rooms.values():
+                    if abs(room.x_coord - x) <= radius and abs(room.y_coord - y) <= radius:
+                        rooms.append(room)
+            return rooms
+
+    def minimap_etag(self, x, y, z, radius):
+        """ETag for a minimap view; changes whenever any tile in view changes"""
+        with self._lock:
+            tiles = self.tiles_in_radius(x, y, z, radius)
+            state = f"{x},{y},{z},{radius}|" + ';'.join(
+                f"{tile.key}:{tile.version}" for tile in tiles
+            )
+        return hashlib.sha1(state.encode('utf-8')).hexdigest()
+
+    def minimap_rooms_json(self, x, y, z, radius):
+        """Serialized JSON array of the minimap rooms in view"""
+        with self._lock:
+            fragments = []
+            for tile in self.tiles_in_radius(x, y, z, radius):
+                for room_pk, room in tile.rooms.items():
+                    if abs(room.x_coord - x) <= radius and abs(room.y_coord - y) <= radius:
+                        fragments.append(tile.fragments[room_pk])
+        return '[' + ', '.join(fragments) + ']'
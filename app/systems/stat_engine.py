@@ -0,0 +1,177 @@
+"""
+Incremental equipment bonus totals for characters.
+
+The first time a character's bonuses are needed, its equipped items are
+scanned once. After that the running totals are only adjusted: equipping adds
+the item's contribution, unequipping subtracts it, and a change to an
+equipped item (durability, sockets, enchantments) swaps its old contribution
+for the new one. Character.calculate_derived_stats reads the totals, so max
+HP/mana/movement are recomputed without touching the items. check() compares
+the totals with a full recomputation.
+
+Callers report equip and unequip only after the change is committed, so a
+rolled back change never reaches the totals.
+"""
+
+import threading
+
+# Equipment stats that feed derived stats
+BONUS_STATS = ('health', 'mana', 'movement', 'strength', 'intellect')
+
+
+def empty_bonuses():
+    return {stat: 0 for stat in BONUS_STATS}
+
+
+def item_bonuses(item):
+    """The bonuses one equipped item contributes"""
+    bonuses = empty_bonuses()
+    if item.template and item.template.equipment_stats:
+        for stat, value in item.get_effective_stats().items():
+            if stat in bonuses:
+                bonuses[stat] += value
+    return bonuses
+
+
+class EquipmentTotals:
+    """Running bonus totals for one character"""
+
+    def __init__(self):
+        self.totals = empty_bonuses()
+        self.contributions = {}  # item id -> bonuses dict
+
+    def add(self, item_id, bonuses):
+        self.remove(item_id)
+        self.contributions[item_id] = bonuses
+        for stat, value in bonuses.items():
+            self.totals[stat] += value
+
+    def remove(self, item_id):
+        bonuses = self.contributions.pop(item_id, None)
+        if bonuses:
+            for stat, value in bonuses.items():
+                self.totals[stat] -= value
+
+
+class StatEngine:
+    """Per-character equipment bonus totals maintained by deltas"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._characters = {}  # character id -> EquipmentTotals
+        self._item_owner = {}  # equipped item id -> character id
+        self.stats = {'scans': 0, 'deltas': 0}
+
+    def is_tracked(self, character_id):
+        return character_id in self._characters
+
+    def equipment_bonuses(self, character):
+        """Current equipment bonus totals for a character (a copy)"""
+        with self._lock:
+            entry = self._characters.get(character.id)
+        if entry is None:
+            entry = self._scan(character)
+        with self._lock:
+            return dict(entry.totals)
+
+    def _scan(self, character):
+        entry = EquipmentTotals()
+        for item in character.equipped_items:
+            entry.add(item.id, item_bonuses(item))
+        with self._lock:
+            self._forget(character.id)
+            self._characters[character.id] = entry
+            for item_id in entry.contributions:
+                self._item_owner[item_id] = character.id
+            self.stats['scans'] += 1
+        return entry
+
+    def equip(self, character, item):
+        """Add (or refresh) an item's contribution once its equipping is committed"""
+        if not self.is_tracked(character.id):
+            self._scan(character)  # The scan includes the committed item
+            return
+        bonuses = item_bonuses(item)
+        with self._lock:
+            entry = self._characters.get(character.id)
+            if entry is None:
+                return  # Discarded meanwhile; the next read rescans
+            entry.add(item.id, bonuses)
+            self._item_owner[item.id] = character.id
+            self.stats['deltas'] += 1
+
+    def unequip(self, character, item):
+        """Remove an item's contribution once its unequipping is committed"""
+        if not self.is_tracked(character.id):
+            self._scan(character)
+            return
+        with self._lock:
+            entry = self._characters.get(character.id)
+            if entry is None:
+                return
+            entry.remove(item.id)
+            self._item_owner.pop(item.id, None)
+            self.stats['deltas'] += 1
+
+    def item_changed(self, item):
+        """Re-read an equipped item whose stats may have changed"""
+        character_id = self._item_owner.get(item.id)
+        if character_id is None:
+            return
+        if item.equipped_character_id != character_id:
+            with self._lock:
+                entry = self._characters.get(character_id)
+                if entry is not None:
+                    entry.remove(item.id)
+                self._item_owner.pop(item.id, None)
+            return
+        bonuses = item_bonuses(item)
+        with self._lock:
+            entry = self._characters.get(character_id)
+            if entry is not None and item.id in entry.contributions:
+                entry.add(item.id, bonuses)
+                self.stats['deltas'] += 1
+
+    def discard(self, character_id):
+        """Forget a character; the next read rescans its equipment"""
+        with self._lock:
+            self._forget(character_id)
+
+    def clear(self):
+        """Forget every character"""
+        with self._lock:
+            self._characters = {}
+            self._item_owner = {}
+
+    def _forget(self, character_id):
+        entry = self._characters.pop(character_id, None)
+        if entry is not None:
+            for item_id in entry.contributions:
+                if self._item_owner.get(item_id) == character_id:
+                    del self._item_owner[item_id]
+
+    def check(self, character):
+        """Compare the running totals with a full recomputation
+
+        Returns:
+            dict: stat -> (running total, recomputed total) for every mismatch
+        """
+        expected = empty_bonuses()
+        for item in character.equipped_items:
+            for stat, value in item_bonuses(item).items():
+                expected[stat] += value
+        actual = self.equipment_bonuses(character)
+        return {stat: (actual[stat], expected[stat])
+                for stat in BONUS_STATS if actual[stat] != expected[stat]}
+
+
+# Global stat engine instance
+_stat_engine = None
+
+
+def get_stat_engine():
+    """Get the global stat engine"""
+    global _stat_engine
+    if _stat_engine is None:
+        _stat_engine = StatEngine()
+    return _stat_engine
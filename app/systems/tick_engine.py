@@ -0,0 +1,318 @@
+"""
+Game tick engine.
+
+A single loop advances the game in fixed steps of GAME_TICK_RATE
+milliseconds. Each tick runs, in order:
+
+1. The timers phase: callbacks scheduled on a hierarchical timing wheel
+   (one-shot or repeating) whose time has come. Scheduling and cancelling
+   are O(1) and a tick only touches the due slot, however many timers are
+   pending. If the phase runs past its time budget, the remaining due
+   callbacks move to the next tick instead of stretching this one.
+2. The registered phases (room broadcasts, regen, NPCs, ...), each with its
+   own time budget.
+
+If the loop falls behind it catches up with back-to-back ticks, so game time
+keeps pace with wall-clock time; beyond MAX_CATCH_UP ticks the backlog is
+dropped. Ticks and phases that overrun their budget are logged as warnings.
+All periodic game work is scheduled here instead of starting its own timer
+thread.
+"""
+
+import threading
+import time
+from collections import deque
+
+# Slots per wheel level; level n slots each span the whole of level n-1
+WHEEL_SLOTS = (256, 64, 64, 64)
+
+# Most ticks run back-to-back to catch up before the backlog is dropped
+MAX_CATCH_UP = 10
+
+# Minimum seconds between two overrun warnings
+WARNING_INTERVAL = 5.0
+
+
+class TimerHandle:
+    """A scheduled callback; call cancel() to stop it"""
+
+    __slots__ = ('due_tick', 'interval', 'callback', 'name', 'cancelled')
+
+    def __init__(self, due_tick, interval, callback, name):
+        self.due_tick = due_tick
+        self.interval = interval  # ticks between repeats, or None for one-shot
+        self.callback = callback
+        self.name = name
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def __repr__(self):
+        return f'<TimerHandle {self.name} @{self.due_tick}>'
+
+
+class TimingWheel:
+    """Hierarchical timing wheel keyed by tick number
+
+    Level 0 has one slot per tick. Each higher level has slots spanning a
+    whole revolution of the level below; when the lower level wraps around,
+    the matching higher slot is cascaded down. Timers further out than the
+    top level wait in an unordered overflow list; once per revolution of the
+    whole wheel every overflow timer is placed again, landing in a wheel slot
+    if it is now within range or going back to the overflow list if not.
+    """
+
+    def __init__(self, slots=WHEEL_SLOTS):
+        self.slots = slots
+        self.spans = []
+        span = 1
+        for count in slots:
+            self.spans.append(span)
+            span *= count
+        self.horizon = span  # ticks covered by the whole wheel
+        self.levels = [[[] for _ in range(count)] for count in slots]
+        self.overflow = []
+        self.current_tick = 0
+        self.size = 0
+
+    def add(self, handle):
+        """Place a timer; its due_tick must be after current_tick"""
+        self.size += 1
+        self._place(handle)
+
+    def _place(self, handle):
+        delay = handle.due_tick - self.current_tick
+        for level, count in enumerate(self.slots):
+            span = self.spans[level]
+            if delay < count * span:
+                self.levels[level][(handle.due_tick // span) % count].append(handle)
+                return
+        self.overflow.append(handle)
+
+    def advance(self):
+        """Move to the next tick and return the timers due on it"""
+        self.current_tick += 1
+        tick = self.current_tick
+
+        # Cascade higher levels whose slot starts on this tick
+        for level in range(1, len(self.slots)):
+            span = self.spans[level]
+            if tick % span:
+                break
+            slot = self.levels[level][(tick // span) % self.slots[level]]
+            self.levels[level][(tick // span) % self.slots[level]] = []
+            for handle in slot:
+                self._place(handle)
+        if tick % self.horizon == 0 and self.overflow:
+            overflow, self.overflow = self.overflow, []
+            for handle in overflow:
+                self._place(handle)
+
+        index = tick % self.slots[0]
+        due, self.levels[0][index] = self.levels[0][index], []
+        self.size -= len(due)
+        return [handle for handle in due if not handle.cancelled]
+
+
+class TickEngine:
+    """Fixed-step game loop with a timing wheel and budgeted phases"""
+
+    def __init__(self, tick_ms=100):
+        self.tick_ms = tick_ms
+        self.timer_budget_ms = tick_ms / 2
+        self._app = None
+        self._lock = threading.Lock()
+        self._wheel = TimingWheel()
+        self._deferred = deque()  # due timers pushed out of an over-budget tick
+        self._phases = []  # (name, func, budget_ms)
+        self._thread = None
+        self._stop = threading.Event()
+        self._last_warning = 0.0
+        self.stats = {
+            'ticks': 0,
+            'overruns': 0,
+            'caught_up': 0,
+            'dropped': 0,
+            'timers_run': 0,
+            'timers_deferred': 0,
+            'last_tick_ms': 0.0,
+            'phase_ms': {}
+        }
+
+    def init_app(self, app):
+        """Configure the engine from the app config"""
+        self._app = app
+        self.tick_ms = app.config.get('GAME_TICK_RATE', self.tick_ms)
+        self.timer_budget_ms = self.tick_ms / 2
+
+    @property
+    def current_tick(self):
+        return self._wheel.current_tick
+
+    # ------------------------------------------------------------------
+    # Registration
+    # ------------------------------------------------------------------
+
+    def add_phase(self, name, func, budget_ms=None):
+        """Run func() once per tick, after the timers, in registration order
+
+        Args:
+            name: Phase name for logs and stats
+            func: Callable taking no arguments
+            budget_ms: Time the phase may take before a warning is logged
+        """
+        with self._lock:
+            self._phases = [phase for phase in self._phases if phase[0] != name]
+            self._phases.append((name, func, budget_ms))
+
+    def remove_phase(self, name):
+        with self._lock:
+            self._phases = [phase for phase in self._phases if phase[0] != name]
+
+    def _ticks(self, ms):
+        return max(1, int(round(ms / self.tick_ms)))
+
+    def call_later(self, delay_ms, callback, name=None):
+        """Run callback() once, delay_ms from now (at least one tick)"""
+        return self._schedule(self._ticks(delay_ms), None, callback, name)
+
+    def call_every(self, interval_ms, callback, name=None, first_delay_ms=None):
+        """Run callback() every interval_ms until the handle is cancelled"""
+        interval = self._ticks(interval_ms)
+        delay = self._ticks(first_delay_ms) if first_delay_ms is not None else interval
+        return self._schedule(delay, interval, callback, name)
+
+    def _schedule(self, delay, interval, callback, name):
+        with self._lock:
+            handle = TimerHandle(self._wheel.current_tick + delay, interval, callback,
+                                 name or getattr(callback, '__name__', 'timer'))
+            self._wheel.add(handle)
+        return handle
+
+    def pending(self):
+        """Number of scheduled timers (including cancelled ones not yet reached)"""
+        return self._wheel.size + len(self._deferred)
+
+    # ------------------------------------------------------------------
+    # Ticking
+    # ------------------------------------------------------------------
+
+    def tick(self):
+        """Advance one tick: due timers, then every phase"""
+        started = time.perf_counter()
+        if self._app is not None:
+            with self._app.app_context():
+                self._run_tick()
+        else:
+            self._run_tick()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        self.stats['ticks'] += 1
+        self.stats['last_tick_ms'] = elapsed_ms
+        if elapsed_ms > self.tick_ms:
+            self.stats['overruns'] += 1
+            self._warn(f"tick {self.current_tick} took {elapsed_ms:.1f}ms "
+                       f"(tick rate {self.tick_ms}ms)")
+
+    def _run_tick(self):
+        with self._lock:
+            due = self._wheel.advance()
+        self._deferred.extend(due)
+
+        self._run_timers()
+
+        with self._lock:
+            phases = list(self._phases)
+        for name, func, budget_ms in phases:
+            started = time.perf_counter()
+            try:
+                func()
+            except Exception as e:
+                print(f"[TICK ERROR] Phase {name}: {e}")
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.stats['phase_ms'][name] = elapsed_ms
+            if budget_ms is not None and elapsed_ms > budget_ms:
+                self._warn(f"phase {name} took {elapsed_ms:.1f}ms (budget {budget_ms}ms)")
+
+    def _run_timers(self):
+        started = time.perf_counter()
+        deadline = started + self.timer_budget_ms / 1000
+        while self._deferred:
+            if time.perf_counter() > deadline:
+                # Out of budget: the rest runs first thing next tick
+                self.stats['timers_deferred'] += len(self._deferred)
+                self._warn(f"timers over budget, {len(self._deferred)} deferred to next tick")
+                break
+            handle = self._deferred.popleft()
+            if handle.cancelled:
+                continue
+            try:
+                handle.callback()
+            except Exception as e:
+                print(f"[TICK ERROR] Timer {handle.name}: {e}")
+            self.stats['timers_run'] += 1
+            if handle.interval and not handle.cancelled:
+                with self._lock:
+                    handle.due_tick = self._wheel.current_tick + handle.interval
+                    self._wheel.add(handle)
+        self.stats['phase_ms']['timers'] = (time.perf_counter() - started) * 1000
+
+    def _warn(self, message):
+        now = time.monotonic()
+        if now - self._last_warning >= WARNING_INTERVAL:
+            self._last_warning = now
+            print(f"[TICK] Warning: {message}")
+
+    # ------------------------------------------------------------------
+    # Loop
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Run the game loop on a background thread"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='game-tick', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        interval = self.tick_ms / 1000
+        next_tick = time.monotonic() + interval
+        while not self._stop.is_set():
+            delay = next_tick - time.monotonic()
+            if delay > 0 and self._stop.wait(delay):
+                break
+
+            # Fixed steps: run every tick that has come due, up to a limit
+            steps = 0
+            while time.monotonic() >= next_tick and steps < MAX_CATCH_UP:
+                self.tick()
+                next_tick += interval
+                steps += 1
+            if steps > 1:
+                self.stats['caught_up'] += steps - 1
+
+            behind = int((time.monotonic() - next_tick) / interval)
+            if behind >= 1 and steps >= MAX_CATCH_UP:
+                self.stats['dropped'] += behind
+                self._warn(f"fell {behind} ticks behind; skipping ahead")
+                next_tick += behind * interval
+
+
+# Global tick engine instance
+_tick_engine = None
+
+
+def get_tick_engine():
+    """Get the global tick engine"""
+    global _tick_engine
+    if _tick_engine is None:
+        _tick_engine = TickEngine()
+    return _tick_engine
@@ -0,0 +1,324 @@
+"""
+Columnar vitals for online characters.
+
+HP, mana and movement of every online character live in NumPy arrays, one
+row per character slot and one column per vital. Regeneration is a single
+vectorized step per game tick: add rate * tick length, clamp to the maximum.
+A client is only sent a `vitals_update` when one of its values crosses a
+display threshold (a DISPLAY_STEPS-th of its maximum), not on every tick.
+
+The arrays are the live values while a character is online. Every
+VITALS_SYNC_INTERVAL seconds the values that changed in whole points are
+handed to the character state store in one batch, and its batched UPDATE
+writes them to the database.
+"""
+
+import threading
+
+import numpy as np
+
+# Column order of the vitals arrays
+VITALS = ('hp', 'mana', 'movement')
+CURRENT_FIELDS = ('current_hp', 'current_mana', 'current_movement')
+MAX_FIELDS = ('max_hp', 'max_mana', 'max_movement')
+
+# Clients are told about a change once it moves a value by this fraction of max
+DISPLAY_STEPS = 20
+
+INITIAL_CAPACITY = 64
+
+
+class VitalsStore:
+    """Online characters' vitals as NumPy arrays indexed by slot"""
+
+    def __init__(self, emit=None, tick_ms=100):
+        self._lock = threading.Lock()
+        self._emit = emit
+        self._app = None
+        self.tick_ms = tick_ms
+        self.sync_interval = 5.0
+        self._timer = None
+        self._slots = {}  # character id -> slot
+        self._free = []
+        self._size = 0  # slots in use are all below this
+        self._allocate(INITIAL_CAPACITY)
+        self.stats = {'ticks': 0, 'updates_sent': 0, 'rows_synced': 0}
+
+    def init_app(self, app):
+        """Configure the store from the app config"""
+        self._app = app
+        self.tick_ms = app.config.get('GAME_TICK_RATE', self.tick_ms)
+        self.sync_interval = app.config.get('VITALS_SYNC_INTERVAL', 5.0)
+        with self._lock:
+            self._slots = {}
+            self._free = []
+            self._size = 0
+            self._allocate(INITIAL_CAPACITY)
+
+    def _allocate(self, capacity):
+        """(Re)size the arrays, keeping the rows in use"""
+        def grow(old, dtype, fill=0):
+            new = np.full((capacity, len(VITALS)), fill, dtype=dtype)
+            if old is not None:
+                new[:len(old)] = old
+            return new
+
+        self.current = grow(getattr(self, 'current', None), np.float64)
+        self.maximum = grow(getattr(self, 'maximum', None), np.float64)
+        self.rate = grow(getattr(self, 'rate', None), np.float64)  # per second
+        self.shown = grow(getattr(self, 'shown', None), np.int32)  # last display step sent
+        self.synced = grow(getattr(self, 'synced', None), np.int64)  # last whole values synced
+        ids = np.full(capacity, -1, dtype=np.int64)
+        if getattr(self, 'ids', None) is not None:
+            ids[:len(self.ids)] = self.ids
+        self.ids = ids
+
+    # ------------------------------------------------------------------
+    # Membership
+    # ------------------------------------------------------------------
+
+    def is_online(self, character_id):
+        return character_id in self._slots
+
+    def add(self, character):
+        """Start regenerating a character (on join); its values come from the ORM"""
+        with self._lock:
+            slot = self._slots.get(character.id)
+            if slot is None:
+                if self._free:
+                    slot = self._free.pop()
+                else:
+                    if self._size == len(self.ids):
+                        self._allocate(len(self.ids) * 2)
+                    slot = self._size
+                    self._size += 1
+                self._slots[character.id] = slot
+                self.ids[slot] = character.id
+            self._load(slot, character)
+            self.current[slot] = [getattr(character, field) or 0 for field in CURRENT_FIELDS]
+            np.minimum(self.current[slot], self.maximum[slot], out=self.current[slot])
+            self.synced[slot] = self.current[slot]
+            self.shown[slot] = self._steps(slot)
+
+    def refresh(self, character):
+        """Pick up new maximums and regen rates (attributes or equipment changed)"""
+        with self._lock:
+            slot = self._slots.get(character.id)
+            if slot is None:
+                return
+            self._load(slot, character)
+            np.minimum(self.current[slot], self.maximum[slot], out=self.current[slot])
+
+    def _load(self, slot, character):
+        self.maximum[slot] = [getattr(character, field) or 0 for field in MAX_FIELDS]
+        self.rate[slot] = character.get_regen_rates()
+
+    def remove(self, character_id, sync=True):
+        """Stop regenerating a character (on disconnect), syncing it first unless told not to"""
+        if sync:
+            self.sync([character_id])
+        with self._lock:
+            slot = self._slots.pop(character_id, None)
+            if slot is None:
+                return
+            self.ids[slot] = -1
+            for array in (self.current, self.maximum, self.rate, self.shown, self.synced):
+                array[slot] = 0
+            self._free.append(slot)
+
+    def clear(self):
+        """Forget every character without syncing"""
+        with self._lock:
+            self._slots = {}
+            self._free = []
+            self._size = 0
+            self.ids[:] = -1
+            for array in (self.current, self.maximum, self.rate, self.shown, self.synced):
+                array[:] = 0
+
+    # ------------------------------------------------------------------
+    # Reading and changing values
+    # ------------------------------------------------------------------
+
+    def get(self, character_id):
+        """Whole-point vitals for an online character, or None"""
+        with self._lock:
+            slot = self._slots.get(character_id)
+            if slot is None:
+                return None
+            return self._payload(slot)
+
+    def adjust(self, character_id, hp=0, mana=0, movement=0):
+        """Add (or with negative values, subtract) vitals, clamped to [0, max]
+
+        Returns:
+            dict: The new whole-point vitals, or None if the character is offline
+        """
+        with self._lock:
+            slot = self._slots.get(character_id)
+            if slot is None:
+                return None
+            values = self.current[slot] + (hp, mana, movement)
+            self.current[slot] = np.clip(values, 0, self.maximum[slot])
+            return self._payload(slot)
+
+    def hp_of(self, character_ids):
+        """Current HP of many characters as an array (NaN for offline ones)"""
+        with self._lock:
+            slots = np.array([self._slots.get(character_id, -1) for character_id in character_ids],
+                             dtype=np.int64)
+            hp = self.current[slots, 0]
+            hp[slots < 0] = np.nan
+            return hp
+
+    def damage_many(self, character_ids, amounts):
+        """Subtract HP from many characters at once, clamped at 0
+
+        Returns:
+            numpy.ndarray: HP afterwards (NaN for offline characters)
+        """
+        with self._lock:
+            slots = np.array([self._slots.get(character_id, -1) for character_id in character_ids],
+                             dtype=np.int64)
+            online = slots >= 0
+            hp_column = self.current[:, 0]  # A view: updates land in self.current
+            online_slots = slots[online]
+            np.subtract.at(hp_column, online_slots, np.asarray(amounts, dtype=np.float64)[online])
+            hp_column[online_slots] = np.maximum(hp_column[online_slots], 0)
+            hp = np.full(len(slots), np.nan)
+            hp[online] = hp_column[online_slots]
+            return hp
+
+    def _payload(self, slot):
+        current = np.floor(self.current[slot]).astype(np.int64)
+        maximum = self.maximum[slot].astype(np.int64)
+        payload = {'character_id': int(self.ids[slot])}
+        for index, name in enumerate(VITALS):
+            payload[name] = int(current[index])
+            payload[f'max_{name}'] = int(maximum[index])
+        return payload
+
+    def _steps(self, slots):
+        """Display step (0..DISPLAY_STEPS) of each value"""
+        maximum = np.maximum(self.maximum[slots], 1)
+        return np.floor(self.current[slots] * DISPLAY_STEPS / maximum).astype(np.int32)
+
+    # ------------------------------------------------------------------
+    # Tick
+    # ------------------------------------------------------------------
+
+    def regen(self):
+        """Apply one tick of regeneration to every online character"""
+        with self._lock:
+            size = self._size
+            if not size:
+                return []
+            current = self.current[:size]
+            current += self.rate[:size] * (self.tick_ms / 1000)
+            np.minimum(current, self.maximum[:size], out=current)
+
+            steps = self._steps(slice(0, size))
+            crossed = (steps != self.shown[:size]).any(axis=1) & (self.ids[:size] >= 0)
+            slots = np.flatnonzero(crossed)
+            self.shown[slots] = steps[slots]
+            updates = [self._payload(slot) for slot in slots]
+            self.stats['ticks'] += 1
+
+        for payload in updates:
+            self._send(payload)
+        self.stats['updates_sent'] += len(updates)
+        return updates
+
+    def _send(self, payload):
+        if self._emit is not None:
+            self._emit(payload)
+            return
+        from app import socketio
+        from app.systems.session_registry import get_session_registry
+        sids = get_session_registry().sids_for_character(payload['character_id'])
+        if sids:
+            socketio.emit('vitals_update', payload, to=list(sids))
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def sync(self, character_ids=None):
+        """Hand values that changed in whole points to the character state store
+
+        Args:
+            character_ids: Only sync these characters (default: all online)
+
+        Returns:
+            int: Number of characters synced
+
+        Values are only marked synced once the store took them; a character
+        the store is not tracking keeps them until it is attached again.
+        """
+        with self._lock:
+            if character_ids is None:
+                slots = np.flatnonzero(self.ids[:self._size] >= 0)
+            else:
+                slots = np.array([self._slots[cid] for cid in character_ids if cid in self._slots],
+                                 dtype=np.int64)
+            if not len(slots):
+                return 0
+            whole = np.floor(self.current[slots]).astype(np.int64)
+            changed = (whole != self.synced[slots]).any(axis=1)
+            slots, whole = slots[changed], whole[changed]
+            changes = {
+                int(self.ids[slot]): dict(zip(CURRENT_FIELDS, map(int, values)))
+                for slot, values in zip(slots, whole)
+            }
+        if not changes:
+            return 0
+
+        from app.systems.character_state import get_character_state_store
+        applied = get_character_state_store().update_many(changes)
+        with self._lock:
+            for character_id in applied:
+                slot = self._slots.get(character_id)
+                if slot is not None:
+                    self.synced[slot] = [changes[character_id][field] for field in CURRENT_FIELDS]
+        self.stats['rows_synced'] += len(applied)
+        return len(applied)
+
+    def start(self, tick_engine):
+        """Regenerate every tick and sync every sync_interval seconds"""
+        tick_engine.add_phase('vitals', self.regen)
+        if self._timer is None and self.sync_interval:
+            self._timer = tick_engine.call_every(self.sync_interval * 1000, self.sync,
+                                                 name='vitals-sync')
+
+
+# Global vitals store instance
+_vitals_store = None
+
+
+def get_vitals_store():
+    """Get the global vitals store"""
+    global _vitals_store
+    if _vitals_store is None:
+        _vitals_store = VitalsStore()
+    return _vitals_store
+
+
+def sync_derived_vitals(character):
+    """Hand vitals clamped by calculate_derived_stats to whoever holds the live values
+
+    Call after calculate_derived_stats (equipment or attributes changed).
+    """
+    vitals = get_vitals_store()
+    if vitals.is_online(character.id):
+        # Online vitals live in the vitals arrays; only the maximums changed
+        vitals.refresh(character)
+        return
+    from app.systems.character_state import get_character_state_store
+    store = get_character_state_store()
+    if store.is_tracked(character.id):
+        store.update(
+            character,
+            current_hp=character.current_hp,
+            current_mana=character.current_mana,
+            current_movement=character.current_movement
+        )
@@ -0,0 +1,359 @@
+"""
+In-memory world graph for rooms and areas.
+
+Loads every Room and Area row once and keeps plain snapshots indexed by
+room_id, primary key and (x, y, z) so movement, look and exit lookups never
+touch the database. The map builder patches the graph incrementally after
+each edit, so changes show up without a restart.
+
+The map builder usually runs as its own process, so every edit also bumps
+the single world_version row. Each game process checks that row every
+WORLD_VERSION_CHECK_INTERVAL seconds and reloads when it has moved,
+notifying room listeners of the rooms that changed.
+"""
+
+import threading
+
+from app.systems.spatial_index import SpatialIndex
+
+
+class AreaNode:
+    """Plain snapshot of an Area row"""
+
+    def __init__(self, area):
+        self.id = area.id
+        self.area_id = area.area_id
+        self.name = area.name
+        self.description = area.description
+        self.climate = area.climate
+        self.level_range = dict(area.level_range or {})
+        self.connected_areas = list(area.connected_areas or [])
+
+    def __repr__(self):
+        return f'<AreaNode {self.name}>'
+
+
+class RoomNode:
+    """Plain snapshot of a Room row with the read-only Room helpers"""
+
+    def __init__(self, room):
+        self.id = room.id
+        self.room_id = room.room_id
+        self.area_id = room.area_id
+        self.x_coord = room.x_coord or 0
+        self.y_coord = room.y_coord or 0
+        self.z_coord = room.z_coord or 0
+        self.name = room.name
+        self.description = room.description
+        self.short_description = room.short_description
+        self.exits = dict(room.exits or {})
+        self.doors = dict(room.doors or {})
+        self.items = list(room.items or [])
+        self.npcs = list(room.npcs or [])
+        self.lighting = room.lighting
+        self.weather_effects = list(room.weather_effects or [])
+        self.is_safe = bool(room.is_safe)
+        self.is_indoors = bool(room.is_indoors)
+        self.is_water = bool(room.is_water)
+        self.is_air = bool(room.is_air)
+
+    @property
+    def coords(self):
+        """(x, y, z) tuple for this room"""
+        return (self.x_coord, self.y_coord, self.z_coord)
+
+    def resolve_exit(self, direction):
+        """Resolve a direction to (target room_id, exit key).
+
+        Exact matches win; otherwise the first exit key starting with the
+        direction is used. Returns (None, None) when there is no such exit.
+        """
+        dir_lower = direction.lower()
+        if dir_lower in self.exits:
+            return self.exits[dir_lower], dir_lower
+        for key in self.exits:
+            if key.startswith(dir_lower):
+                return self.exits[key], key
+        return None, None
+
+    def get_available_exits(self):
+        """Get list of available exit directions"""
+        return list(self.exits.keys())
+
+    def get_door(self, direction):
+        """Get door data for a given direction"""
+        return self.doors.get(direction.lower())
+
+    def has_door(self, direction):
+        """Check if there's a door in a given direction"""
+        return direction.lower() in self.doors
+
+    def __repr__(self):
+        return f'<RoomNode {self.name} ({self.room_id})>'
+
+
+class WorldGraph:
+    """Process-wide cache of rooms and areas"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self.rooms_by_pk = {}
+        self.rooms_by_room_id = {}
+        self.rooms_by_coords = {}
+        self.areas_by_pk = {}
+        self.areas_by_area_id = {}
+        self.spatial_index = SpatialIndex()
+        self._listeners = []
+        self.version = 0  # world_version the graph was loaded at
+        self.check_interval = 2.0
+        self._timer = None
+
+    @property
+    def is_loaded(self):
+        return self._loaded
+
+    def init_app(self, app):
+        """Configure the graph from the app config"""
+        self.check_interval = app.config.get('WORLD_VERSION_CHECK_INTERVAL', self.check_interval)
+
+    def load(self):
+        """Load all rooms and areas from the database (requires an app context)"""
+        from app.models.room import Room, Area
+
+        # Read the version first: an edit committed during the load is seen next check
+        version = self._read_version()
+        rooms_by_pk = {}
+        rooms_by_room_id = {}
+        rooms_by_coords = {}
+        areas_by_pk = {}
+        areas_by_area_id = {}
+        spatial_index = SpatialIndex()
+
+        for area in Area.query.all():
+            node = AreaNode(area)
+            areas_by_pk[node.id] = node
+            areas_by_area_id[node.area_id] = node
+
+        for room in Room.query.all():
+            node = RoomNode(room)
+            rooms_by_pk[node.id] = node
+            rooms_by_room_id[node.room_id] = node
+            rooms_by_coords[node.coords] = node
+            spatial_index.add(node)
+
+        # Swap the indexes in one step so readers never see a partial graph
+        with self._lock:
+            previous = self.rooms_by_pk if self._loaded else None
+            self.rooms_by_pk = rooms_by_pk
+            self.rooms_by_room_id = rooms_by_room_id
+            self.rooms_by_coords = rooms_by_coords
+            self.areas_by_pk = areas_by_pk
+            self.areas_by_area_id = areas_by_area_id
+            self.spatial_index = spatial_index
+            self.version = version
+            self._loaded = True
+
+        print(f"[WORLD] Loaded {len(rooms_by_pk)} rooms and {len(areas_by_pk)} areas")
+        if previous is not None:
+            for pk in previous.keys() | rooms_by_pk.keys():
+                old, new = previous.get(pk), rooms_by_pk.get(pk)
+                if old is None or new is None or vars(old) != vars(new):
+                    self._notify(old, new)
+
+    def ensure_loaded(self):
+        """Load the graph on first use"""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.load()
+
+    def invalidate(self):
+        """Drop everything; the next lookup reloads from the database"""
+        with self._lock:
+            self._loaded = False
+
+    # ------------------------------------------------------------------
+    # Cross-process changes
+    # ------------------------------------------------------------------
+
+    def _read_version(self):
+        from app import db
+        from app.models.room import WorldVersion
+        return db.session.execute(
+            db.select(WorldVersion.version).where(WorldVersion.id == 1)
+        ).scalar() or 0
+
+    def bump_version(self):
+        """Tell other processes the world changed (call after committing an edit)"""
+        from app import db
+        from app.models.room import WorldVersion
+
+        table = WorldVersion.__table__
+        result = db.session.execute(
+            table.update().where(table.c.id == 1).values(version=table.c.version + 1)
+        )
+        if not result.rowcount:
+            db.session.execute(table.insert().values(id=1, version=1))
+        db.session.commit()
+        version = self._read_version()
+        with self._lock:
+            # This process already applied its own edit; only skip the reload
+            # when nobody else bumped in between
+            if self._loaded and version == self.version + 1:
+                self.version = version
+        return version
+
+    def check_version(self):
+        """Reload if another process changed the world
+
+        Returns:
+            bool: True if the graph was reloaded
+        """
+        if not self._loaded:
+            return False
+        version = self._read_version()
+        if version == self.version:
+            return False
+        print(f"[WORLD] World version {self.version} -> {version}, reloading")
+        self.load()
+        return True
+
+    def start(self, tick_engine):
+        """Check the world version every check_interval seconds on the game tick"""
+        if self._timer is None and self.check_interval:
+            self._timer = tick_engine.call_every(self.check_interval * 1000, self.check_version,
+                                                 name='world-version')
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def get_room(self, pk):
+        """Get a room by primary key"""
+        if pk is None:
+            return None
+        self.ensure_loaded()
+        return self.rooms_by_pk.get(pk)
+
+    def get_room_by_room_id(self, room_id):
+        """Get a room by its string room_id"""
+        if not room_id:
+            return None
+        self.ensure_loaded()
+        return self.rooms_by_room_id.get(room_id)
+
+    def get_room_at(self, x, y, z):
+        """Get the room at the given coordinates"""
+        self.ensure_loaded()
+        return self.rooms_by_coords.get((x, y, z))
+
+    def get_area(self, pk):
+        """Get an area by primary key"""
+        if pk is None:
+            return None
+        self.ensure_loaded()
+        return self.areas_by_pk.get(pk)
+
+    def get_rooms_in_radius(self, x, y, z, radius):
+        """Get rooms within radius (per axis) of (x, y) on level z"""
+        self.ensure_loaded()
+        return self.spatial_index.rooms_in_radius(x, y, z, radius)
+
+    def get_exit_target(self, room, direction):
+        """Resolve an exit from a room to (target RoomNode, exit key)"""
+        target_room_id, exit_key = room.resolve_exit(direction)
+        if not target_room_id:
+            return None, None
+        return self.get_room_by_room_id(target_room_id), exit_key
+
+    # ------------------------------------------------------------------
+    # Incremental updates (called by the map builder after a commit)
+    # ------------------------------------------------------------------
+
+    def add_listener(self, callback):
+        """Register callback(old_node, new_node) for incremental room changes"""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        """Unregister a room change callback"""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify(self, old, new):
+        for callback in list(self._listeners):
+            try:
+                callback(old, new)
+            except Exception as e:
+                print(f"[WORLD] Listener error: {e}")
+
+    def upsert_room(self, room):
+        """Insert or replace a room from a committed Room row"""
+        node = RoomNode(room)
+        with self._lock:
+            if not self._loaded:
+                return None
+            old = self._unindex_room(node.id)
+            self.rooms_by_pk[node.id] = node
+            self.rooms_by_room_id[node.room_id] = node
+            self.rooms_by_coords[node.coords] = node
+            self.spatial_index.add(node)
+        self._notify(old, node)
+        return node
+
+    def remove_room(self, pk):
+        """Remove a room by primary key"""
+        with self._lock:
+            if not self._loaded:
+                return None
+            old = self._unindex_room(pk)
+        if old is not None:
+            self._notify(old, None)
+        return old
+
+    def upsert_area(self, area):
+        """Insert or replace an area from a committed Area row"""
+        node = AreaNode(area)
+        with self._lock:
+            if not self._loaded:
+                return None
+            old = self.areas_by_pk.get(node.id)
+            if old and self.areas_by_area_id.get(old.area_id) is old:
+                del self.areas_by_area_id[old.area_id]
+            self.areas_by_pk[node.id] = node
+            self.areas_by_area_id[node.area_id] = node
+        return node
+
+    def remove_area(self, pk):
+        """Remove an area by primary key (its rooms are upserted separately)"""
+        with self._lock:
+            if not self._loaded:
+                return None
+            old = self.areas_by_pk.pop(pk, None)
+            if old and self.areas_by_area_id.get(old.area_id) is old:
+                del self.areas_by_area_id[old.area_id]
+        return old
+
+    def _unindex_room(self, pk):
+        old = self.rooms_by_pk.pop(pk, None)
+        if old is None:
+            return None
+        if self.rooms_by_room_id.get(old.room_id) is old:
+            del self.rooms_by_room_id[old.room_id]
+        if self.rooms_by_coords.get(old.coords) is old:
+            del self.rooms_by_coords[old.coords]
+        self.spatial_index.remove(pk)
+        return old
+
+
+# Global world graph instance
+_world_graph = None
+
+
+def get_world_graph():
+    """Get the global world graph instance"""
+    global _world_graph
+    if _world_graph is None:
+        _world_graph = WorldGraph()
+    return _world_graph
@@ -2,6 +2,7 @@
 Word filtering module for chat censorship
 """
 import re
+import threading
 
 # Common English curse words and slurs to filter
 FILTERED_WORDS = [
@@ -24,6 +25,77 @@ FILTERED_WORDS = [
     # Add more as needed
 ]
 
+def _trie_pattern(words):
+    """Regex source matching any of the words, longest match preferred"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True  # End of a word
+
+    def emit(node):
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        pattern = '(?:' + '|'.join(branches) + ')'
+        # A word ending here makes the rest optional; greedy, so longer words win
+        return pattern + '?' if '' in node else pattern
+
+    return emit(trie)
+
+class WordFilterEngine:
+    """Censors every filtered word in one pass over the message
+    
+    All words are compiled into a single case-insensitive pattern shaped
+    like a trie of the words (shared prefixes are matched once), wrapped in a
+    lookahead so the scan reports the longest filtered word starting at every
+    position, including overlapping ones. Each reported span is replaced by
+    asterisks of the same length.
+    """
+    
+    def __init__(self, words, whole_words=False):
+        self.words = tuple(sorted({w.lower() for w in words if w}, key=len, reverse=True))
+        self.whole_words = whole_words
+        self.pattern = None
+        if self.words:
+            alternation = _trie_pattern(self.words)
+            if whole_words:
+                alternation = r'(?<![A-Za-z0-9])(?:' + alternation + r')(?![A-Za-z0-9])'
+            self.pattern = re.compile('(?=(' + alternation + '))', re.IGNORECASE)
+    
+    def censor(self, message):
+        """Return the message with filtered words replaced by asterisks"""
+        if self.pattern is None or not message:
+            return message
+        
+        pieces = []
+        copied_to = 0  # End of the text already emitted
+        for match in self.pattern.finditer(message):
+            start, end = match.start(1), match.end(1)
+            if end <= copied_to:
+                continue  # Inside a span that is already censored
+            if start > copied_to:
+                pieces.append(message[copied_to:start])
+                copied_to = start
+            pieces.append('*' * (end - copied_to))
+            copied_to = end
+        
+        if not pieces:
+            return message
+        pieces.append(message[copied_to:])
+        return ''.join(pieces)
+
+# Compiled engine for FILTERED_WORDS; replaced wholesale whenever the list changes
+_engine_lock = threading.Lock()
+_engine = WordFilterEngine(FILTERED_WORDS)
+
+def _rebuild_engine():
+    """Compile a new engine and swap it in atomically"""
+    global _engine
+    with _engine_lock:
+        _engine = WordFilterEngine(FILTERED_WORDS)
+
 def filter_message(message, enabled=True):
     """
     Filter profanity from a message if censorship is enabled
@@ -38,17 +110,7 @@ def filter_message(message, enabled=True):
     if not enabled or not message:
         return message
     
-    filtered_message = message
-    
-    for word in FILTERED_WORDS:
-        # Create a case-insensitive regex pattern
-        pattern = re.compile(re.escape(word), re.IGNORECASE)
-        
-        # Replace with asterisks
-        asterisks = '*' * len(word)
-        filtered_message = pattern.sub(asterisks, filtered_message)
-    
-    return filtered_message
+    return _engine.censor(message)
 
 def get_filtered_words():
     """Get the list of filtered words"""
@@ -56,9 +118,13 @@ def get_filtered_words():
 
 def add_filtered_word(word):
     """Add a word to the filter list"""
-    if word.lower() not in [w.lower() for w in FILTERED_WORDS]:
-        FILTERED_WORDS.append(word.lower())
+    with _engine_lock:
+        if word.lower() not in [w.lower() for w in FILTERED_WORDS]:
+            FILTERED_WORDS.append(word.lower())
+    _rebuild_engine()
 
 def remove_filtered_word(word):
     """Remove a word from the filter list"""
-    FILTERED_WORDS[:] = [w for w in FILTERED_WORDS if w.lower() != word.lower()]
+    with _engine_lock:
+        FILTERED_WORDS[:] = [w for w in FILTERED_WORDS if w.lower() != word.lower()]
+    _rebuild_engine()
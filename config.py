@@ -14,14 +14,32 @@ class Config:
     
     # SocketIO configuration
     SOCKETIO_ASYNC_MODE = 'eventlet'
+    # Redis URL for running several server processes; None = single process
+    SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE')
     
     # Game configuration
     GAME_TICK_RATE = 100  # milliseconds
+    GAME_TICK_ENABLED = True  # run the game loop thread
+    ITEM_RESPAWN_TIME = 300  # seconds before a taken room item respawns
+    COMBAT_SEED = None  # set for reproducible combat rolls
     MAX_PLAYERS = 100
     STARTING_TRIAL_POINTS = 20
     STARTING_PROGRESS_POINTS = 0
     STARTING_LOCATION = 'room_001'
     
+    # Character state write-behind
+    CHARACTER_FLUSH_INTERVAL = 5.0  # seconds between batched flushes
+    # Relative to the instance folder; give each server process its own file
+    CHARACTER_JOURNAL_PATH = os.environ.get('CHARACTER_JOURNAL_PATH') or 'character_journal.log'
+    CHARACTER_JOURNAL_FSYNC = True  # fsync the journal once per flush interval
+    VITALS_SYNC_INTERVAL = 5.0  # seconds between handing regen to the state store
+    WORLD_VERSION_CHECK_INTERVAL = 2.0  # seconds between checks for map builder edits
+    RESPAWN_RESCAN_INTERVAL = 30  # seconds; multi-process leader picks up other workers' deaths
+    
+    # Command execution
+    COMMAND_WORKERS = 4  # worker threads running queued commands
+    COMMAND_QUEUE_DEPTH = 16  # max queued commands per character
+    
     # Attribute caps
     ATTRIBUTE_CAPS = {
         'body': 400,
@@ -60,6 +78,13 @@ class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    CHARACTER_FLUSH_INTERVAL = 0  # Flush explicitly in tests
+    VITALS_SYNC_INTERVAL = 0
+    WORLD_VERSION_CHECK_INTERVAL = 0
+    GAME_TICK_ENABLED = False  # Tick explicitly in tests
+    CHARACTER_JOURNAL_PATH = None
+    CHARACTER_JOURNAL_FSYNC = False
+    SOCKETIO_MESSAGE_QUEUE = None
 
 config = {
     'development': DevelopmentConfig,
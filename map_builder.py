@@ -23,7 +23,8 @@ from app import db
 db.init_app(app)
 
 # Import models from main app
-from app.models.room import Room, Area
+from app.models.room import Room, Area, RoomItemRespawn
+from app.systems.world_graph import get_world_graph
 
 @app.route('/')
 def builder_index():
@@ -94,6 +95,9 @@ def create_room():
     
     db.session.add(room)
     db.session.commit()
+    world = get_world_graph()
+    world.upsert_room(room)
+    world.bump_version()
     
     return jsonify({
         'id': room.id,
@@ -141,6 +145,9 @@ def update_room(room_id):
     room.lighting = data.get('lighting', room.lighting)
     
     db.session.commit()
+    world = get_world_graph()
+    world.upsert_room(room)
+    world.bump_version()
     
     return jsonify({
         'id': room.id,
@@ -162,11 +169,18 @@ def delete_room(room_id):
     room = Room.query.get_or_404(room_id)
     deleted_room_id = room.room_id
     
-    # Delete the room
+    deleted_pk = room.id
+    
+    # Delete the room and any item respawns pending in it
+    RoomItemRespawn.query.filter_by(room_id=deleted_pk).delete()
     db.session.delete(room)
     db.session.commit()
     
+    world = get_world_graph()
+    world.remove_room(deleted_pk)
+    
     # Clean up orphaned exits in other rooms
+    modified_rooms = []
     all_rooms = Room.query.all()
     for other_room in all_rooms:
         if other_room.exits:
@@ -183,9 +197,14 @@ def delete_room(room_id):
             if exits_modified:
                 other_room.exits = new_exits
                 db.session.add(other_room)
+                modified_rooms.append(other_room)
     
     db.session.commit()
     
+    for other_room in modified_rooms:
+        world.upsert_room(other_room)
+    world.bump_version()
+    
     return jsonify({'success': True})
 
 @app.route('/api/areas', methods=['POST'])
@@ -201,6 +220,9 @@ def create_area():
     
     db.session.add(area)
     db.session.commit()
+    world = get_world_graph()
+    world.upsert_area(area)
+    world.bump_version()
     
     return jsonify({
         'id': area.id,
@@ -209,6 +231,25 @@ def create_area():
         'description': area.description
     })
 
+@app.route('/api/areas/<int:area_id>', methods=['DELETE'])
+def delete_area(area_id):
+    """Delete an area; its rooms are kept without an area"""
+    area = Area.query.get_or_404(area_id)
+    rooms = area.rooms.all()
+    for room in rooms:
+        room.area_id = None
+    
+    db.session.delete(area)
+    db.session.commit()
+    
+    world = get_world_graph()
+    for room in rooms:
+        world.upsert_room(room)
+    world.remove_area(area_id)
+    world.bump_version()
+    
+    return jsonify({'success': True})
+
 @app.route('/api/rooms/<int:room_id>/doors', methods=['GET'])
 def get_room_doors(room_id):
     """Get all doors for a specific room"""
@@ -229,6 +270,9 @@ def create_or_update_door(room_id, direction):
     # Add or update the door
     room.add_door(direction, data)
     db.session.commit()
+    world = get_world_graph()
+    world.upsert_room(room)
+    world.bump_version()
     
     return jsonify({
         'success': True,
@@ -244,6 +288,9 @@ def delete_door(room_id, direction):
     # Remove the door
     room.remove_door(direction)
     db.session.commit()
+    world = get_world_graph()
+    world.upsert_room(room)
+    world.bump_version()
     
     return jsonify({'success': True})
 
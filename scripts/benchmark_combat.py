@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark combat resolution.
+
+Builds a synthetic world of paired fighters with random weapons (one or two
+damage types each), race-style percentage resistances and armor, then times
+the vectorized CombatEngine.resolve against a plain per-attack Python loop
+doing the same math. Both use seeded RNGs, so every run prints the same
+totals for the same arguments.
+
+Usage:
+    python scripts/benchmark_combat.py [--fighters N] [--ticks N] [--seed N]
+"""
+
+import sys
+import os
+import time
+import random
+import argparse
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from app.systems.combat import (
+    CombatEngine, NPC_FIGHTER, DAMAGE_TYPES, BASE_HIT, AC_STEP, MIN_HIT, MAX_HIT
+)
+
+
+def build_fighters(count, rng):
+    """Fighter specs: (damage min dict, damage max dict, speed, resist dict, reduction dict, ac)"""
+    fighters = []
+    for _ in range(count):
+        low, high = {}, {}
+        for damage_type in rng.sample(DAMAGE_TYPES, rng.choice([1, 1, 2])):
+            low[damage_type] = rng.randint(1, 8)
+            high[damage_type] = low[damage_type] + rng.randint(0, 8)
+        resist = {damage_type: rng.choice([10, 15, 25]) for damage_type in rng.sample(DAMAGE_TYPES, 2)}
+        reduction = {rng.choice(DAMAGE_TYPES): rng.randint(0, 3)}
+        fighters.append((low, high, rng.choice([0.5, 1.0, 1.5, 2.0]), resist, reduction,
+                         rng.randint(0, 30)))
+    return fighters
+
+
+def vector(values):
+    out = np.zeros(len(DAMAGE_TYPES))
+    for damage_type, value in values.items():
+        out[DAMAGE_TYPES.index(damage_type)] = value
+    return out
+
+
+def build_engine(fighters, seed, tick_ms):
+    engine = CombatEngine(seed=seed, tick_ms=tick_ms, announce=lambda room_pk, event: None)
+    for n, (low, high, speed, resist, reduction, ac) in enumerate(fighters):
+        engine.add_fighter(NPC_FIGHTER, n, f'Fighter {n}', n // 2, 1e9,
+                           (vector(low), vector(high), speed),
+                           (vector(resist), vector(reduction), ac))
+    for n in range(0, len(fighters) - 1, 2):
+        engine.target[n], engine.target[n + 1] = n + 1, n
+    return engine
+
+
+def legacy_resolve(fighters, state, rng, tick_ms):
+    """One tick, one attack at a time"""
+    total = 0
+    for n, (low, high, speed, _, _, _) in enumerate(fighters):
+        state['ready'][n] += tick_ms / 1000
+        if state['ready'][n] < speed:
+            continue
+        state['ready'][n] -= speed
+        target = n + 1 if n % 2 == 0 else n - 1
+        _, _, _, resist, reduction, ac = fighters[target]
+        chance = min(max(BASE_HIT - ac * AC_STEP, MIN_HIT), MAX_HIT)
+        if rng.random() >= chance:
+            continue
+        damage = 0.0
+        for damage_type, minimum in low.items():
+            raw = minimum + rng.random() * (high[damage_type] - minimum)
+            dealt = raw * (1 - resist.get(damage_type, 0) / 100) - reduction.get(damage_type, 0)
+            damage += max(dealt, 0)
+        damage = round(damage)
+        state['hp'][target] -= damage
+        total += damage
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark combat resolution')
+    parser.add_argument('--fighters', type=int, default=20000, help='Fighters (paired into duels)')
+    parser.add_argument('--ticks', type=int, default=50, help='Ticks to resolve')
+    parser.add_argument('--tick-ms', type=int, default=100, help='Tick length in milliseconds')
+    parser.add_argument('--seed', type=int, default=1, help='World and combat random seed')
+    args = parser.parse_args()
+
+    fighters = build_fighters(args.fighters, random.Random(args.seed))
+    print(f"World: {len(fighters)} fighters in {len(fighters) // 2} duels, {args.ticks} ticks")
+
+    state = {'ready': [0.0] * len(fighters), 'hp': [1e9] * len(fighters)}
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    legacy_damage = sum(legacy_resolve(fighters, state, rng, args.tick_ms) for _ in range(args.ticks))
+    legacy = time.perf_counter() - started
+
+    engine = build_engine(fighters, args.seed, args.tick_ms)
+    started = time.perf_counter()
+    for _ in range(args.ticks):
+        engine.resolve()
+    vectorized = time.perf_counter() - started
+
+    print(f"Damage dealt: legacy {legacy_damage}, vectorized {engine.stats['damage']} "
+          f"({engine.stats['hits']}/{engine.stats['attacks']} hits)")
+    for label, elapsed in (('legacy', legacy), ('vectorized', vectorized)):
+        print(f"{label:>11}: {elapsed * 1000:8.1f} ms total, "
+              f"{elapsed / args.ticks * 1000:7.2f} ms/tick")
+    print(f"    speedup: {legacy / vectorized:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark the chat word filter.
+
+Compares the compiled single-pass filter in app.word_filter with the previous
+implementation (one re.compile + sub per filtered word per message) on a
+synthetic chat corpus: mostly clean short messages, some with profanity,
+leetspeak variants and shouted caps, plus a few long pastes.
+
+Usage:
+    python scripts/benchmark_word_filter.py [--messages N] [--repeat N] [--seed N]
+"""
+
+import sys
+import os
+import re
+import time
+import random
+import argparse
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.word_filter import FILTERED_WORDS, filter_message
+
+CLEAN_WORDS = [
+    'anyone', 'want', 'to', 'group', 'for', 'the', 'crypt', 'north', 'gate', 'need', 'a', 'healer',
+    'selling', 'iron', 'sword', 'cheap', 'where', 'is', 'trainer', 'thanks', 'brb', 'back', 'ok',
+    'that', 'orc', 'hit', 'me', 'hard', 'mana', 'potion', 'please', 'classic', 'assessment', 'shell',
+    'hello', 'cockatrice', 'passage', 'grass', 'afternoon', 'scrap', 'dicker', 'glass', 'gaylord'
+]
+
+
+def legacy_filter_message(message, enabled=True):
+    """The filter as it was before the compiled engine"""
+    if not enabled or not message:
+        return message
+
+    filtered_message = message
+    for word in FILTERED_WORDS:
+        pattern = re.compile(re.escape(word), re.IGNORECASE)
+        filtered_message = pattern.sub('*' * len(word), filtered_message)
+    return filtered_message
+
+
+def build_corpus(count, rng):
+    """Chat lines with roughly the shape of real global chat"""
+    corpus = []
+    for _ in range(count):
+        length = rng.choice([2, 3, 4, 6, 8, 10, 14, 20]) if rng.random() > 0.02 else 120
+        words = [rng.choice(CLEAN_WORDS) for _ in range(length)]
+        if rng.random() < 0.2:
+            for _ in range(rng.randint(1, 2)):
+                words.insert(rng.randrange(len(words) + 1), rng.choice(FILTERED_WORDS))
+        message = ' '.join(words)
+        if rng.random() < 0.1:
+            message = message.upper()
+        corpus.append(message + rng.choice(['', '', '!', '?', '...']))
+    return corpus
+
+
+def time_filter(func, corpus, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for message in corpus:
+            func(message)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the chat word filter')
+    parser.add_argument('--messages', type=int, default=20000, help='Messages in the corpus')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per implementation (best is kept)')
+    parser.add_argument('--seed', type=int, default=1, help='Corpus random seed')
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.messages, random.Random(args.seed))
+    print(f"Corpus: {len(corpus)} messages, {len(FILTERED_WORDS)} filtered words")
+
+    differing = sum(1 for message in corpus if filter_message(message) != legacy_filter_message(message))
+    print(f"Messages censored differently: {differing} "
+          f"(overlapping matches the sequential passes left partly uncensored)")
+
+    legacy = time_filter(legacy_filter_message, corpus, args.repeat)
+    compiled = time_filter(filter_message, corpus, args.repeat)
+    for label, elapsed in (('legacy', legacy), ('compiled', compiled)):
+        per_message_us = elapsed / len(corpus) * 1e6
+        print(f"{label:>9}: {elapsed * 1000:8.1f} ms total, {per_message_us:7.2f} us/message")
+    print(f"  speedup: {legacy / compiled:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Chat archive maintenance.
+
+Backfills the monthly chat archive from chat_logs.db, then compacts closed
+partitions and drops the ones past the retention window. Safe to run while
+the game server is up; it only reads the live chat database.
+
+Usage:
+    python scripts/chat_archive_maintenance.py [--retention-months N] [--compact-after N] [--skip-backfill]
+"""
+
+import sys
+import os
+import argparse
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.chat_db import chat_db
+from app.chat_archive import chat_archive
+
+
+def backfill():
+    """Copy every live chat message into the archive (already archived ones are skipped)"""
+    total = 0
+    for rows in chat_db.iter_messages():
+        chat_archive.append(rows)
+        total += len(rows)
+    print(f"Backfilled {total} messages into the archive")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Maintain the chat archive')
+    parser.add_argument('--retention-months', type=int, default=12,
+                        help='Delete partitions older than this many months (0 keeps everything)')
+    parser.add_argument('--compact-after', type=int, default=1,
+                        help='Compact partitions older than this many months')
+    parser.add_argument('--skip-backfill', action='store_true',
+                        help='Do not copy live messages into the archive first')
+    args = parser.parse_args()
+
+    if not args.skip_backfill:
+        backfill()
+
+    report = chat_archive.run_retention(args.retention_months, args.compact_after)
+    print(f"Compacted: {', '.join(report['compacted']) or 'none'}")
+    print(f"Dropped: {', '.join(report['dropped']) or 'none'}")
+    chat_archive.close()
+
+
+if __name__ == '__main__':
+    main()
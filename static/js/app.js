@@ -7,7 +7,8 @@ class GameClient {
         this.commandHistory = [];
         this.historyIndex = -1;
         this.isConnected = false;
-        this.minimapUpdateInterval = null;
+        this.minimapSynced = false;
+        this.minimapEtag = null;
         
         this.initializeElements();
         this.setupEventListeners();
@@ -67,11 +68,8 @@ class GameClient {
             this.isConnected = false;
             this.addOutput('Disconnected from game server', 'error');
             
-            // Clear minimap update interval on disconnect
-            if (this.minimapUpdateInterval) {
-                clearInterval(this.minimapUpdateInterval);
-                this.minimapUpdateInterval = null;
-            }
+            // The server resends the full minimap when we rejoin
+            this.minimapSynced = false;
         });
         
         this.socket.on('connected', (data) => {
@@ -85,6 +83,7 @@ class GameClient {
         this.socket.on('game_joined', (data) => {
             this.characterId = data.character_id;
             this.characterName = data.character_name;
+            this.vitals = data.vitals;
             this.addOutput(`Joined game as ${data.character_name}`, 'system');
             
             // Request initial room info
@@ -93,19 +92,14 @@ class GameClient {
             // Load recent chat messages
             this.loadRecentChatMessages();
             
-            // Load and render minimap
-            this.loadMinimap();
-            
-            // Set up periodic minimap updates every 5 seconds
-            if (this.minimapUpdateInterval) {
-                clearInterval(this.minimapUpdateInterval);
+            // The server pushes the minimap before game_joined; fall back to HTTP on a cold start
+            if (!this.minimapSynced) {
+                this.loadMinimap();
             }
-            this.minimapUpdateInterval = setInterval(() => {
-                console.log('⏰ Periodic minimap update triggered (every 5s)');
-                // Only refresh room data, NOT player position (position comes from socket only)
-                this.loadMinimap(false);
-            }, 5000);
-            console.log('Minimap auto-update started (every 5 seconds)');
+        });
+        
+        this.socket.on('minimap_delta', (data) => {
+            this.applyMinimapDelta(data);
         });
         
         this.socket.on('command_result', (data) => {
@@ -135,28 +129,28 @@ class GameClient {
                 }
             }
             
-            // Reload minimap data from server after movement commands
-            if (data.result && data.result.action === 'move') {
-                console.log('✅ Movement detected! Fetching fresh room data from server...');
-                
-                // Load fresh room data but DON'T update position (we already have it from socket)
-                this.loadMinimap(false);
-            } else {
-                console.log('Not a movement command (action:', data.result ? data.result.action : 'none', ')');
-            }
+            // New rooms coming into view after a move arrive as a minimap_delta event
         });
         
         this.socket.on('room_info', (data) => {
             this.updateRoomInfo(data);
         });
         
-        this.socket.on('room_update', (data) => {
-            this.addOutput(`${data.character_name} ${data.message}`, 'room');
+        // Room events arrive batched, one payload per room per frame
+        this.socket.on('room_updates', (data) => {
+            data.events.forEach(event => {
+                this.addOutput(event.message, 'room');
+            });
         });
         
         this.socket.on('chat_message', (data) => {
             this.addChatMessage(data);
         });
+        
+        // Sent when HP, mana or movement cross a display step
+        this.socket.on('vitals_update', (data) => {
+            this.vitals = data;
+        });
     }
     
     handleCommandInput(e) {
@@ -342,49 +336,17 @@ class GameClient {
         // Use timestamp from server if available, otherwise use current time
         const timestamp = data.formatted_timestamp || new Date().toLocaleTimeString();
         
-        // Filter message if player has censorship enabled
-        let message = data.message;
-        if (data.player_censor_enabled) {
-            message = this.filterMessage(message);
-        }
-        
+        // Live chat arrives already censored for this player by the server
         messageDiv.innerHTML = `
             <span class="timestamp">[${timestamp}]</span>
             <span class="character">${data.character_name}:</span>
-            <span class="message">${message}</span>
+            <span class="message">${data.message}</span>
         `;
         
         this.chatOutput.appendChild(messageDiv);
         this.chatOutput.scrollTop = this.chatOutput.scrollHeight;
     }
     
-    filterMessage(message) {
-        // Filter profanity from chat messages
-        if (!message) return message;
-        
-        // Common English curse words and slurs
-        const filteredWords = [
-            'damn', 'hell', 'crap', 'shit', 'fuck', 'bitch', 'ass', 'asshole',
-            'bastard', 'piss', 'pissed', 'cunt', 'cock', 'dick', 'pussy',
-            'whore', 'slut', 'fag', 'faggot', 'nigger', 'nigga', 'kike',
-            'chink', 'spic', 'wetback', 'retard', 'retarded', 'gay',
-            'f*ck', 'f**k', 'f***', 'sh*t', 's**t', 'a$$', 'b*tch', 'b**ch',
-            'd*mn', 'h*ll', 'cr*p', 'p*ss', 'c*nt', 'c*ck', 'd*ck', 'p*ssy',
-            'wh*re', 'sl*t', 'f*g', 'f*ggot', 'n*gger', 'n*gga', 'k*ke',
-            'ch*nk', 'sp*c', 'ret*rd', 'g*y', 'wtf', 'omg', 'stfu', 'gtfo'
-        ];
-        
-        let filteredMessage = message;
-        
-        filteredWords.forEach(word => {
-            const regex = new RegExp('\\b' + word.replace(/[.*+?^${}()|[\]\\]/g, '\\$&') + '\\b', 'gi');
-            const asterisks = '*'.repeat(word.length);
-            filteredMessage = filteredMessage.replace(regex, asterisks);
-        });
-        
-        return filteredMessage;
-    }
-    
     addOutput(text, type = 'game') {
         if (!this.outputWindow) return;
         
@@ -483,16 +445,19 @@ class GameClient {
         }
         
         try {
-            // Add cache-busting parameter to ensure fresh data
-            const apiUrl = `/game/api/minimap/${this.characterId}?t=${Date.now()}`;
+            // 'no-cache' revalidates with the server's ETag, so an unchanged view costs a 304
+            const apiUrl = `/game/api/minimap/${this.characterId}`;
             console.log(`🔄 Loading minimap from: ${apiUrl} (updatePosition: ${updatePosition})`);
-            const response = await fetch(apiUrl, {
-                cache: 'no-cache',
-                headers: {
-                    'Cache-Control': 'no-cache',
-                    'Pragma': 'no-cache'
-                }
-            });
+            const response = await fetch(apiUrl, { cache: 'no-cache' });
+            
+            // Skip parsing and redrawing when the view has not changed
+            const etag = response.headers.get('ETag');
+            if (etag && etag === this.minimapEtag && this.nearbyRooms.length > 0) {
+                console.log('⏸️ Minimap unchanged (ETag match)');
+                return;
+            }
+            this.minimapEtag = etag;
+            
             const data = await response.json();
             
             console.log('📦 Minimap API response:', data);
@@ -533,6 +498,28 @@ class GameClient {
         }
     }
     
+    applyMinimapDelta(data) {
+        // Apply rooms added/removed by the server since the last update
+        if (data.reset) {
+            this.nearbyRooms = data.added;
+            this.minimapSynced = true;
+        } else {
+            const removed = new Set(data.removed);
+            const added = new Map(data.added.map(room => [room.id, room]));
+            this.nearbyRooms = this.nearbyRooms
+                .filter(room => !removed.has(room.id) && !added.has(room.id))
+                .concat(data.added);
+        }
+        
+        if (data.player_position) {
+            this.playerPosition = data.player_position;
+            this.updateCoordinatesDisplay();
+        }
+        
+        console.log(`🧭 Minimap delta: +${data.added.length} -${data.removed.length} (${this.nearbyRooms.length} rooms)`);
+        this.renderMinimap();
+    }
+    
     renderMinimap() {
         if (!this.minimapCtx || !this.minimap) {
             console.error('❌ Minimap render skipped: no context or canvas');
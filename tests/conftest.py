@@ -0,0 +1,31 @@
+"""
+Shared fixtures for tests that need an application and database
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+from app import create_app, db
+from app.systems.world_graph import get_world_graph
+from app.systems.item_templates import get_item_template_registry
+from app.systems.stat_engine import get_stat_engine
+from app.systems.npc_runtime import get_npc_runtime
+
+
+@pytest.fixture
+def app():
+    """Create an app bound to a fresh in-memory database"""
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        get_world_graph().invalidate()
+        get_item_template_registry().invalidate()
+        get_stat_engine().clear()
+        get_npc_runtime().invalidate()
+        yield app
+        db.session.remove()
+        db.drop_all()
@@ -0,0 +1,133 @@
+"""
+Test write-behind character state: dirty tracking, batched flush and journal replay
+"""
+import os
+
+from app import db
+from app.models.character import Character
+from app.models.player import Player
+from app.models.room import Room
+from app.systems.character_state import get_character_state_store
+
+
+def make_character(name='Tester'):
+    player = Player(username=name.lower(), email=f'{name.lower()}@example.com', password_hash='x')
+    db.session.add(player)
+    db.session.commit()
+    character = Character(player_id=player.id, name=name, x_coord=0, y_coord=0, z_coord=0)
+    db.session.add(character)
+    db.session.commit()
+    return character
+
+
+def stored_row(character_id):
+    table = Character.__table__
+    return db.session.execute(
+        table.select().where(table.c.id == character_id)
+    ).mappings().one()
+
+
+def test_updates_are_batched_until_flush(app, tmp_path):
+    app.config['CHARACTER_JOURNAL_PATH'] = str(tmp_path / 'journal.log')
+    store = get_character_state_store()
+    store.init_app(app)
+
+    room = Room(room_id='room_a', name='A', description='', x_coord=3, y_coord=4, z_coord=0)
+    db.session.add(room)
+    character = make_character()
+    db.session.commit()
+    character_id = character.id
+
+    for x in range(1, 4):
+        store.update(character, current_room_id=room.id, x_coord=x, y_coord=4)
+    assert store.dirty_count() == 1
+    assert stored_row(character_id)['x_coord'] == 0
+
+    # Commits expire the instance; reloading must not bring back the stale row
+    db.session.commit()
+    assert character.x_coord == 3
+    assert Character.query.filter(store.in_room_clause(room.id)).count() == 1
+
+    assert store.flush() == 1
+    assert stored_row(character_id)['x_coord'] == 3
+    assert store.dirty_count() == 0
+    assert not os.listdir(tmp_path)
+
+    store.release(character_id)
+    assert not store.is_tracked(character_id)
+
+
+def test_journal_is_replayed_after_crash(app, tmp_path):
+    app.config['CHARACTER_JOURNAL_PATH'] = str(tmp_path / 'journal.log')
+    store = get_character_state_store()
+    store.init_app(app)
+
+    character = make_character()
+    character_id = character.id
+    store.update(character, gold=25, current_hp=40)
+
+    # Simulate a restart: in-memory state is lost, the journal survives
+    store.init_app(app)
+    db.session.expire_all()
+    assert stored_row(character_id)['gold'] == 0
+
+    store.attach(db.session.get(Character, character_id))
+    row = stored_row(character_id)
+    assert (row['gold'], row['current_hp']) == (25, 40)
+    assert not os.listdir(tmp_path)
+
+
+def test_failed_periodic_flush_is_logged_and_retried(app, tmp_path, capsys):
+    app.config['CHARACTER_JOURNAL_PATH'] = str(tmp_path / 'journal.log')
+    store = get_character_state_store()
+    store.init_app(app)
+
+    character = make_character()
+    store.update(character, gold=7)
+
+    def fail(rows):
+        raise RuntimeError('database is locked')
+    store._write_rows = fail
+    try:
+        store._periodic_flush()
+    finally:
+        del store._write_rows
+    assert '[CHARACTER STATE ERROR]' in capsys.readouterr().out
+    assert store.dirty_count() == 1
+    assert os.listdir(tmp_path)  # Still journaled
+
+    store._periodic_flush()
+    assert store.dirty_count() == 0
+    assert stored_row(character.id)['gold'] == 7
+
+
+def test_failed_flush_segment_is_not_replayed_over_newer_state(app, tmp_path):
+    app.config['CHARACTER_JOURNAL_PATH'] = str(tmp_path / 'journal.log')
+    store = get_character_state_store()
+    store.init_app(app)
+
+    first = Room(room_id='room_5', name='Five', description='')
+    second = Room(room_id='room_7', name='Seven', description='')
+    db.session.add_all([first, second])
+    character = make_character()
+    character_id = character.id
+
+    store.update(character, current_room_id=first.id)
+
+    def fail(rows):
+        raise RuntimeError('database is locked')
+    store._write_rows = fail
+    try:
+        store._periodic_flush()
+    finally:
+        del store._write_rows
+
+    store.update(character, current_room_id=second.id)
+    assert store.flush() == 1
+    assert stored_row(character_id)['current_room_id'] == second.id
+    assert not os.listdir(tmp_path)  # The failed flush's segment went too
+
+    # A restart has nothing left to replay over the committed row
+    store.init_app(app)
+    assert store.recover() == 0
+    assert stored_row(character_id)['current_room_id'] == second.id
@@ -0,0 +1,57 @@
+"""
+Test the partitioned, full-text searchable chat archive
+"""
+import sys
+import os
+from datetime import date, datetime, timezone
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.chat_archive import ChatArchive
+
+
+def test_search_and_retention(tmp_path):
+    archive = ChatArchive(str(tmp_path / 'archive'))
+    try:
+        archive.append([
+            (1, 1, 'Alpha', 'selling a rusty sword', datetime(2025, 1, 5, tzinfo=timezone.utc), 'global'),
+            (2, 2, 'Beta', 'anyone seen the dragon', datetime(2025, 3, 9, tzinfo=timezone.utc), 'global'),
+            (3, 1, 'Alpha', 'the dragon took my sword', datetime(2025, 3, 10, tzinfo=timezone.utc), 'local:4'),
+            (4, 2, 'Beta', 'OR NOT "quotes" are just text', '2025-03-11 08:00:00+00:00', 'global'),
+        ])
+        # Re-archiving the same ids is a no-op
+        archive.append([(1, 1, 'Alpha', 'selling a rusty sword', datetime(2025, 1, 5, tzinfo=timezone.utc), 'global')])
+        assert archive.partitions() == [(2025, 1), (2025, 3)]
+
+        assert [m['id'] for m in archive.search('dragon')] == [3, 2]
+        assert [m['id'] for m in archive.search('sword', character_name='alpha')] == [3, 1]
+        assert [m['id'] for m in archive.search('sword', start='2025-03-01', end='2025-03-31')] == [3]
+        assert [m['id'] for m in archive.search(channel='local:4')] == [3]
+        assert [m['id'] for m in archive.search('OR NOT "quotes"')] == [4]
+        assert len(archive.search(limit=2)) == 2
+
+        report = archive.run_retention(retention_months=12, compact_after_months=1,
+                                       now=datetime(2026, 2, 1, tzinfo=timezone.utc))
+        assert report == {'compacted': ['chat_2025_03.db'], 'dropped': ['chat_2025_01.db']}
+        assert archive.partitions() == [(2025, 3)]
+        assert [m['id'] for m in archive.search('dragon')] == [3, 2]
+    finally:
+        archive.close()
+
+
+def test_bare_end_date_includes_the_whole_day(tmp_path):
+    archive = ChatArchive(str(tmp_path / 'archive'))
+    try:
+        archive.append([
+            (1, 1, 'Alpha', 'morning', datetime(2025, 3, 31, 0, 0, tzinfo=timezone.utc), 'global'),
+            (2, 1, 'Alpha', 'evening', datetime(2025, 3, 31, 23, 59, 30, tzinfo=timezone.utc), 'global'),
+            (3, 1, 'Alpha', 'next month', datetime(2025, 4, 1, tzinfo=timezone.utc), 'global'),
+        ])
+        assert [m['id'] for m in archive.search(end='2025-03-31')] == [2, 1]
+        assert [m['id'] for m in archive.search(end=date(2025, 3, 31))] == [2, 1]
+        assert [m['id'] for m in archive.search(start='2025-03-31', end='2025-03-31')] == [2, 1]
+        # A full timestamp is still an exact, inclusive bound
+        assert [m['id'] for m in archive.search(end='2025-03-31T00:00:00+00:00')] == [1]
+    finally:
+        archive.close()
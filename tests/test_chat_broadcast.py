@@ -0,0 +1,92 @@
+"""
+Test censored/uncensored global chat routing
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import db
+from app.chat_db import ChatDatabase, ChatLogWriter
+from app.chat_history import ChatHistory
+from app.models import chat_message
+from app.models.character import Character
+from app.models.player import Player
+from app.systems.chat_broadcast import ChatBroadcaster, CENSORED_ROOM, UNCENSORED_ROOM
+from app.systems.commands import get_command_processor
+from app.systems.session_registry import SessionEntry, get_session_registry
+
+
+def make_broadcaster():
+    emits = []
+    rooms = {}  # sid -> set of rooms
+    broadcaster = ChatBroadcaster(
+        emit=lambda payload, to: emits.append((payload, to)),
+        enter_room=lambda sid, room: rooms.setdefault(sid, set()).add(room),
+        leave_room=lambda sid, room: rooms.setdefault(sid, set()).discard(room)
+    )
+    return broadcaster, emits, rooms
+
+
+def test_message_is_filtered_once_and_routed_by_setting():
+    broadcaster, emits, _ = make_broadcaster()
+
+    broadcaster.broadcast({'character_name': 'Alpha', 'message': 'what the hell'})
+    assert emits == [
+        ({'character_name': 'Alpha', 'message': 'what the ****'}, CENSORED_ROOM),
+        ({'character_name': 'Alpha', 'message': 'what the hell'}, UNCENSORED_ROOM)
+    ]
+
+    # Clean messages go out once to both rooms
+    emits.clear()
+    broadcaster.broadcast({'character_name': 'Alpha', 'message': 'good morning'})
+    assert emits == [({'character_name': 'Alpha', 'message': 'good morning'},
+                      [CENSORED_ROOM, UNCENSORED_ROOM])]
+    assert broadcaster.stats == {'messages': 2, 'censored': 1, 'emits': 3}
+
+
+def test_toggling_moves_all_of_a_players_connections():
+    broadcaster, _, rooms = make_broadcaster()
+    registry = get_session_registry()
+    entries = [SessionEntry('sid-1', 7, 70, 'Alpha', None),
+               SessionEntry('sid-2', 7, 71, 'Beta', None),
+               SessionEntry('sid-3', 8, 80, 'Gamma', None)]
+    for entry in entries:
+        registry._sessions[entry.sid] = entry
+    try:
+        for entry in entries:
+            broadcaster.join(entry.sid, True)
+
+        broadcaster.set_censor(7, False)
+        assert rooms['sid-1'] == {UNCENSORED_ROOM}
+        assert rooms['sid-2'] == {UNCENSORED_ROOM}
+        assert rooms['sid-3'] == {CENSORED_ROOM}
+
+        broadcaster.leave('sid-3')
+        assert rooms['sid-3'] == set()
+    finally:
+        for entry in entries:
+            registry.unregister(entry.sid)
+
+
+def test_chat_command_skips_the_room_broadcast(app, tmp_path, monkeypatch):
+    # Log to a throwaway database rather than the real chat log and archive
+    chat = ChatDatabase(str(tmp_path / 'chat.db'))
+    writer = ChatLogWriter(chat)
+    monkeypatch.setattr(chat_message, 'chat_log_writer', writer)
+    monkeypatch.setattr(chat_message, 'chat_history', ChatHistory(chat))
+
+    player = Player(username='talker', email='talker@example.com', password_hash='x')
+    db.session.add(player)
+    db.session.commit()
+    character = Character(player_id=player.id, name='Talker')
+    db.session.add(character)
+    db.session.commit()
+
+    result = get_command_processor().process_command(character, 'chat what the hell')
+    assert result['action'] == 'chat'
+    assert result['chat_message']['message'] == 'what the hell'
+    assert 'affects_room' not in result and 'room_message' not in result
+    writer.close()
+    chat.close()
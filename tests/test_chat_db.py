@@ -0,0 +1,87 @@
+"""
+Test pooled chat database connections
+"""
+import sys
+import os
+import threading
+from datetime import datetime, timezone
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.chat_db import ChatDatabase, ChatLogWriter
+
+
+def test_wal_index_and_threaded_access(tmp_path):
+    chat = ChatDatabase(str(tmp_path / 'chat.db'))
+    try:
+        writer = chat._get_writer()
+        assert writer.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        plan = writer.execute(
+            'EXPLAIN QUERY PLAN SELECT id FROM chat_messages ORDER BY timestamp DESC LIMIT 5'
+        ).fetchall()
+        assert 'idx_chat_messages_timestamp' in str(plan)
+
+        def post(n):
+            for i in range(20):
+                chat.add_messages([(n * 100 + i, n, f'char{n}', f'message {i}',
+                                    datetime.now(timezone.utc), 'global')])
+                chat.get_recent_messages(5)
+
+        threads = [threading.Thread(target=post, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert chat.get_message_count() == 80
+        recent = chat.get_recent_messages(3)
+        assert len(recent) == 3
+        assert recent[0]['timestamp'] <= recent[-1]['timestamp']
+    finally:
+        chat.close()
+
+
+def test_log_writer_batches_and_drains(tmp_path):
+    chat = ChatDatabase(str(tmp_path / 'chat.db'))
+    writer = ChatLogWriter(chat, batch_size=50, linger_ms=50)
+    try:
+        ids = [writer.submit(1, 'Alpha', f'hello {n}') for n in range(120)]
+        assert ids == list(range(ids[0], ids[0] + 120))
+
+        writer.close()
+        metrics = writer.get_metrics()
+        assert metrics['written'] == 120
+        assert metrics['queue_depth'] == 0
+        assert metrics['flushes'] < 120
+        assert chat.get_message_count() == 120
+
+        # A new writer continues after the reserved id block
+        restarted = ChatLogWriter(chat)
+        assert restarted.submit(1, 'Alpha', 'again') > ids[-1]
+        restarted.close()
+    finally:
+        chat.close()
+
+
+def test_reader_pool_is_bounded(tmp_path):
+    chat = ChatDatabase(str(tmp_path / 'chat.db'), pool_size=2)
+    try:
+        chat.add_messages([(1, 1, 'Alpha', 'hello', datetime.now(timezone.utc), 'global')])
+
+        def read():
+            for _ in range(20):
+                assert chat.get_message_count() == 1
+
+        threads = [threading.Thread(target=read) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Eight threads shared at most two connections, all returned to the pool
+        assert chat._opened <= 2
+        assert chat._readers.qsize() == chat._opened
+    finally:
+        chat.close()
+    assert chat._opened == 0
@@ -0,0 +1,91 @@
+"""
+Test per-channel chat ring buffers
+"""
+import sys
+import os
+from datetime import datetime, timedelta, timezone
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.chat_db import ChatDatabase, ChatLogWriter
+from app.chat_history import ChatHistory, local_channel, whisper_channel
+
+
+def test_buffers_serve_recent_pages_and_fall_back_for_older(tmp_path):
+    chat = ChatDatabase(str(tmp_path / 'chat.db'))
+    try:
+        now = datetime.now(timezone.utc)
+        chat.add_messages([(n, 1, 'Alpha', f'global {n}', now, 'global') for n in range(1, 9)])
+        chat.add_messages([(100, 2, 'Beta', 'psst', now, whisper_channel(2, 1))])
+
+        history = ChatHistory(chat, size=5)
+        history.warm()
+
+        page = history.recent('global', limit=3)
+        assert [message['id'] for message in page] == [6, 7, 8]
+        assert history.stats['database_reads'] == 0
+
+        # Paging past the buffer reads only the older part from the database
+        page = history.recent('global', limit=4, before_id=6)
+        assert [message['id'] for message in page] == [2, 3, 4, 5]
+        assert history.stats['database_reads'] == 1
+
+        assert [m['message'] for m in history.recent(whisper_channel(1, 2))] == ['psst']
+
+        history.record(9, 3, 'Gamma', 'hello room', now, local_channel(4))
+        assert history.recent(local_channel(4))[0]['formatted_timestamp'] == now.strftime('%H:%M:%S')
+        assert history.recent(local_channel(5)) == []
+        assert history.stats['database_reads'] == 1
+    finally:
+        chat.close()
+
+
+def test_shared_history_sees_other_processes_messages(tmp_path):
+    chat = ChatDatabase(str(tmp_path / 'chat.db'))
+    try:
+        now = datetime.now(timezone.utc)
+        first = ChatHistory(chat, size=5, shared=True)
+        second = ChatHistory(chat, size=5, shared=True)
+        first.warm()
+        second.warm()
+
+        # Each process logs its own message; only the first has reached the database
+        chat.add_messages([(1, 1, 'Alpha', 'from one', now, 'global')])
+        first.record(1, 1, 'Alpha', 'from one', now)
+        second.record(2, 2, 'Beta', 'from two (unwritten)', now)
+
+        assert [m['id'] for m in second.recent('global')] == [1, 2]
+        assert [m['id'] for m in first.recent('global')] == [1]
+        assert [m['id'] for m in second.recent('global', before_id=2)] == [1]
+    finally:
+        chat.close()
+
+
+def test_interleaved_writers_are_ordered_by_time(tmp_path):
+    chat = ChatDatabase(str(tmp_path / 'chat.db'))
+    first = ChatLogWriter(chat)
+    second = ChatLogWriter(chat)
+    try:
+        # Each writer numbers from its own id block, so ids are not in send order
+        start = datetime.now(timezone.utc)
+        sent = []
+        for n in range(6):
+            writer = first if n % 2 == 0 else second
+            sent.append(writer.submit(n, f'Char{n}', f'message {n}', start + timedelta(seconds=n)))
+        first.close()
+        second.close()
+        assert sent != sorted(sent)
+
+        history = ChatHistory(chat, size=4, shared=True)
+        history.warm()
+        assert [m['id'] for m in history.recent('global', limit=3)] == sent[3:]
+        assert [m['id'] for m in history.recent('global', limit=3, before_id=sent[3])] == sent[:3]
+
+        # A process-local buffer that spilled over pages back the same way
+        local = ChatHistory(chat, size=2)
+        local.warm()
+        assert [m['id'] for m in local.recent('global', limit=4)] == sent[2:]
+        assert [m['id'] for m in local.recent('global', limit=5, before_id=sent[4])] == sent[:4]
+    finally:
+        chat.close()
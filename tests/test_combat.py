@@ -0,0 +1,215 @@
+"""
+Test vectorized combat resolution
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from app import db
+from app.models.character import Character
+from app.models.item import Item, ItemTemplate
+from app.models.item_constants import WeaponType
+from app.models.npc import NPC
+from app.models.player import Player
+from app.models.room import Room
+from app.systems.combat import (
+    CombatEngine, CHARACTER, NPC_FIGHTER, DAMAGE_TYPES, TYPE_INDEX, type_vector
+)
+from app.systems.commands import get_command_processor
+from app.systems.respawn import get_respawn_manager
+
+
+def vector(**values):
+    return type_vector(values)
+
+
+def duel(seed):
+    engine = CombatEngine(seed=seed, tick_ms=1000, announce=lambda room_pk, event: None)
+    attack = (vector(slashing=10, fire=4), vector(slashing=10, fire=4), 1.0)
+    plain = engine.add_fighter(NPC_FIGHTER, 1, 'Plain', 5, 10000, attack,
+                               (np.zeros(len(DAMAGE_TYPES)), np.zeros(len(DAMAGE_TYPES)), 0))
+    warded = engine.add_fighter(NPC_FIGHTER, 2, 'Warded', 5, 10000, attack,
+                                (vector(fire=50), vector(slashing=2), 0))
+    engine.target[plain] = warded
+    engine.target[warded] = plain
+    return engine, plain, warded
+
+
+def test_damage_applies_resistances_per_type():
+    engine, plain, warded = duel(seed=7)
+    combat_round = engine.resolve()
+    events = engine.describe(combat_round)
+    assert len(events) == 2 and len(combat_round.dead) == 0
+    by_attacker = {event['attacker']: event for event in events}
+    # Seed 7 lands both swings: slashing 10 - 2 flat plus fire 4 at 50%, against none
+    assert by_attacker['Plain'] == dict(by_attacker['Plain'], hit=True, damage=10)
+    assert by_attacker['Warded'] == dict(by_attacker['Warded'], hit=True, damage=14)
+    assert engine.hp[warded] == 9990 and engine.hp[plain] == 9986
+
+    # Race aliases map onto DamageType columns
+    resist = type_vector({'radiant': 15, 'charm': 10})
+    assert resist[TYPE_INDEX['holy']] == 15 and resist[TYPE_INDEX['light']] == 15
+    assert resist.sum() == 30
+
+
+def test_seeded_runs_are_reproducible():
+    runs = []
+    for _ in range(2):
+        engine, plain, warded = duel(seed=42)
+        for _ in range(50):
+            engine.resolve()
+        runs.append((engine.hp[plain], engine.hp[warded], engine.stats['hits']))
+    assert runs[0] == runs[1]
+    assert runs[0][2] < 100  # Some swings missed
+
+
+def test_kill_command_fights_to_the_death(app):
+    room = Room(room_id='arena', name='Arena')
+    db.session.add(room)
+    db.session.commit()
+    room.npcs = ['rat']
+    player = Player(username='fighter', email='fighter@example.com', password_hash='x')
+    db.session.add(player)
+    db.session.commit()
+    character = Character(player_id=player.id, name='Fighter', race='Dwarf', current_room_id=room.id)
+    rat = NPC(npc_id='rat', name='Giant Rat', current_room_id=room.id, current_hp=30,
+              respawn_time=60, ai_behavior='passive')
+    blade = ItemTemplate(template_id='axe', name='Axe', base_type='weapon.axe', base_damage_min=8,
+                         base_damage_max=12, weapon_type=WeaponType.AXE)
+    db.session.add_all([character, rat, blade])
+    db.session.commit()
+    db.session.add(Item(template_id=blade.id, name='Axe', condition=100, quality_modifier=1.0,
+                        equipped_character_id=character.id, equipped_slot='main_hand'))
+    db.session.commit()
+
+    engine = CombatEngine(seed=3, tick_ms=500, announce=lambda room_pk, event: None)
+    import app.systems.combat as combat
+    combat._combat_engine, previous = engine, combat._combat_engine
+    try:
+        assert 'error' in get_command_processor().process_command(character, 'kill dragon')
+        result = get_command_processor().process_command(character, 'kill giant')
+        assert result['message'] == 'You attack Giant Rat!'
+        assert engine.is_fighting(CHARACTER, character.id)
+
+        fighter = engine._slots[(CHARACTER, character.id)]
+        assert engine.resist[fighter][TYPE_INDEX['poison']] == 15  # Dwarven resistance
+        assert engine.damage_max[fighter].sum() > engine.damage_min[fighter].sum() > 0
+
+        for _ in range(100):
+            engine.tick()
+            if engine.stats['deaths']:
+                break
+    finally:
+        combat._combat_engine = previous
+
+    rat = NPC.query.filter_by(npc_id='rat').first()
+    assert rat.current_hp == 0 and rat.current_room_id is None and rat.died_at is not None
+    assert rat.id in get_respawn_manager()._npcs
+    assert not engine.is_fighting(CHARACTER, character.id)
+    assert engine._slots == {}
+
+
+def test_reengaging_keeps_damage_dealt(app):
+    room = Room(room_id='pit', name='Pit')
+    db.session.add(room)
+    db.session.commit()
+    player = Player(username='brawler', email='brawler@example.com', password_hash='x')
+    db.session.add(player)
+    db.session.commit()
+    first = Character(player_id=player.id, name='First', current_room_id=room.id)
+    second = Character(player_id=player.id, name='Second', current_room_id=room.id)
+    ogre = NPC(npc_id='ogre', name='Ogre', current_room_id=room.id, current_hp=500, max_hp=500)
+    db.session.add_all([first, second, ogre])
+    db.session.commit()
+
+    engine = CombatEngine(seed=5, tick_ms=1000, announce=lambda room_pk, event: None)
+    assert engine.engage(first, ogre) is None
+    slot = engine._slots[(NPC_FIGHTER, ogre.id)]
+    for _ in range(10):
+        engine.tick()
+    damaged = engine.hp[slot]
+    assert damaged < 500 and ogre.current_hp == 500  # The row is stale mid-fight
+
+    # A second attacker, a repeated kill and an aggressive re-engage all keep the damage
+    assert engine.engage(second, ogre) is None
+    assert engine.engage(first, ogre) is None
+    assert engine.engage(ogre, first) is None
+    assert engine.hp[slot] == damaged
+    assert engine.current_hp(ogre) == damaged
+
+
+def test_slain_character_is_recalled(app):
+    from app.systems.character_state import get_character_state_store
+    from app.systems.vitals import get_vitals_store
+
+    home = Room(room_id='room_001', name='Village')
+    lair = Room(room_id='lair', name='Lair')
+    db.session.add_all([home, lair])
+    db.session.commit()
+    player = Player(username='victim', email='victim@example.com', password_hash='x')
+    db.session.add(player)
+    db.session.commit()
+    character = Character(player_id=player.id, name='Victim', current_room_id=lair.id,
+                          current_hp=3, max_hp=50)
+    dragon = NPC(npc_id='dragon', name='Dragon', current_room_id=lair.id, current_hp=1000,
+                 max_hp=1000, ai_behavior='aggressive')
+    claws = ItemTemplate(template_id='claws', name='Claws', base_type='weapon.axe', base_damage_min=40,
+                         base_damage_max=50, weapon_type=WeaponType.AXE)
+    db.session.add_all([character, dragon, claws])
+    db.session.commit()
+    db.session.add(Item(template_id=claws.id, name='Claws', condition=100, quality_modifier=1.0,
+                        equipped_npc_id=dragon.id, equipped_slot='main_hand'))
+    db.session.commit()
+    get_character_state_store().attach(character)  # In the game, as on join
+    vitals = get_vitals_store()
+    vitals.add(character)
+
+    events = []
+    engine = CombatEngine(seed=1, tick_ms=1000, announce=lambda room_pk, event: events.append(event))
+    try:
+        assert engine.engage(dragon, character) is None
+        for _ in range(20):
+            engine.tick()
+            if engine.stats['deaths']:
+                break
+        assert engine.stats['deaths'] == 1
+        assert vitals.get(character.id)['hp'] == 1
+        assert get_character_state_store().get(character.id, 'current_room_id') == home.id
+        assert engine.engage(dragon, character) == 'They are not here.'
+        assert any(event['message'] == 'Victim has been slain!' for event in events)
+    finally:
+        vitals.clear()
+
+
+def test_leaving_the_game_ends_fights(app):
+    from app.systems.character_state import get_character_state_store
+
+    room = Room(room_id='cave', name='Cave')
+    db.session.add(room)
+    db.session.commit()
+    player = Player(username='quitter', email='quitter@example.com', password_hash='x')
+    db.session.add(player)
+    db.session.commit()
+    character = Character(player_id=player.id, name='Quitter', current_room_id=room.id,
+                          current_hp=50, max_hp=50)
+    troll = NPC(npc_id='troll', name='Troll', current_room_id=room.id, current_hp=300, max_hp=300)
+    db.session.add_all([character, troll])
+    db.session.commit()
+
+    engine = CombatEngine(seed=2, tick_ms=1000, announce=lambda room_pk, event: None)
+    assert engine.engage(troll, character) is None
+    engine.tick()
+    engine.end_fights(character.id)
+    assert (CHARACTER, character.id) not in engine._slots
+    assert not engine.is_fighting(NPC_FIGHTER, troll.id)
+
+    # The troll stops swinging and leaves the arrays; the character is not re-attached
+    assert engine.tick() == []
+    assert (NPC_FIGHTER, troll.id) not in engine._slots
+    assert not get_character_state_store().is_tracked(character.id)
+    engine._recall(character.id)
+    assert not get_character_state_store().is_tracked(character.id)
@@ -0,0 +1,34 @@
+"""
+Test command tokenizing and abbreviation dispatch
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.systems.commands import CommandProcessor, tokenize
+
+
+def test_abbreviations_resolve_to_first_registered_command():
+    processor = CommandProcessor()
+    expected = {
+        'n': 'north', 's': 'south', 'e': 'east', 'w': 'west', 'u': 'up', 'd': 'down',
+        'l': 'look', 'ex': 'examine', 'i': 'inventory', 'g': 'get', 'sa': 'say',
+        'sav': 'save', 'un': 'unequip', 'go': 'go', 'c': 'chat', 'ce': 'censor'
+    }
+    for abbreviation, command in expected.items():
+        assert processor.resolve(abbreviation) == command
+    assert processor.resolve('xyzzy') is None
+
+    processor.register('kill', lambda character, args, unparsed_args, key: {'message': key})
+    assert processor.resolve('k') == 'kill'
+    assert processor.process_command(None, 'K goblin') == {'message': 'kill'}
+
+
+def test_tokenize():
+    assert tokenize('say "hello there" friend') == (['say', 'hello there', 'friend'], '"hello there" friend')
+    assert tokenize("  get 'long sword'") == (['get', 'long sword'], "'long sword'")
+    assert tokenize('chat  hi   all ') == (['chat', 'hi', 'all'], 'hi   all ')
+    assert tokenize('"" look') == (['look'], 'look')
+    assert tokenize('   ') == ([], '')
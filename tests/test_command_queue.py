@@ -0,0 +1,56 @@
+"""
+Test per-character ordered command execution and back-pressure
+"""
+import sys
+import os
+import threading
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+from app.systems.command_queue import CommandQueue, QueueFullError
+
+
+def test_fifo_per_character_and_parallel_across_characters():
+    commands = CommandQueue(workers=4, max_depth=100)
+    ran = {1: [], 2: []}
+    gate = threading.Event()
+    done = threading.Semaphore(0)
+
+    def job_for(character_id, n):
+        def run(job):
+            if character_id == 1 and n == 0:
+                # Character 1 is stuck; character 2 must still make progress
+                gate.wait(5)
+            ran[character_id].append(n)
+            done.release()
+        return run
+
+    for n in range(50):
+        commands.submit(1, job_for(1, n))
+        commands.submit(2, job_for(2, n))
+
+    for _ in range(50):
+        assert done.acquire(timeout=5)
+    assert ran[2] == list(range(50))
+    assert ran[1] == []
+
+    gate.set()
+    for _ in range(50):
+        assert done.acquire(timeout=5)
+    assert ran[1] == list(range(50))
+    assert commands.stats['executed'] == 100
+
+
+def test_back_pressure():
+    commands = CommandQueue(workers=1, max_depth=2)
+    gate = threading.Event()
+    commands.submit(1, lambda job: gate.wait(5))
+    # The first job may already be running; fill the queue until it is full
+    with pytest.raises(QueueFullError):
+        for _ in range(3):
+            commands.submit(1, lambda job: None)
+    assert commands.stats['rejected'] == 1
+    gate.set()
@@ -0,0 +1,94 @@
+"""
+Test that inventory and equipment endpoints run a constant number of queries
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event
+
+from app import db
+from app.models.character import Character
+from app.models.item import Item, ItemTemplate
+from app.models.player import Player
+from app.systems.item_templates import get_item_template_registry
+
+
+def make_character():
+    player = Player(username='hoarder', email='hoarder@example.com', password_hash='x')
+    db.session.add(player)
+    db.session.commit()
+    character = Character(player_id=player.id, name='Hoarder', x_coord=0, y_coord=0, z_coord=0)
+    db.session.add(character)
+    db.session.commit()
+    return player, character
+
+
+def fill_inventory(character, count):
+    sword = ItemTemplate(template_id='sword', name='Sword', base_type='weapon.blade.sword',
+                         weight=3.0, base_damage_min=2, base_damage_max=5)
+    mail = ItemTemplate(template_id='mail', name='Mail', base_type='armor.body', weight=10.0,
+                        armor_class=4)
+    sack = ItemTemplate(template_id='sack', name='Sack', base_type='container', weight=0.5,
+                        container_capacity=10, weight_reduction=0.5)
+    db.session.add_all([sword, mail, sack])
+    db.session.commit()
+
+    bags = [Item(template_id=sack.id, name='Sack', owner_character_id=character.id) for _ in range(3)]
+    db.session.add_all(bags)
+    db.session.commit()
+    character.bag_slots = {str(slot): bag.id for slot, bag in enumerate(bags)}
+
+    templates = [sword, mail]
+    for n in range(count - len(bags)):
+        db.session.add(Item(
+            template_id=templates[n % 2].id, name=f'Item {n}', owner_character_id=character.id,
+            container_id=bags[n % 3].id if n % 4 == 0 else None
+        ))
+    equipped = Item(template_id=mail.id, name='Worn Mail', owner_character_id=character.id,
+                    equipped_character_id=character.id, equipped_slot='chest')
+    db.session.add(equipped)
+    db.session.commit()
+
+
+def count_queries(client, url):
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    assert response.status_code == 200
+    return response.get_json(), len(statements)
+
+
+def queries_for(app, count):
+    player, character = make_character()
+    fill_inventory(character, count)
+    get_item_template_registry().ensure_loaded()
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(player.id)
+        session['_fresh'] = True
+
+    inventory, inventory_queries = count_queries(client, f'/api/character/{character.id}/inventory')
+    equipment, equipment_queries = count_queries(client, f'/api/character/{character.id}/equipment')
+    assert len(inventory['inventory']) == count
+    assert sum(1 for bag in inventory['bag_slots'].values() if bag) == 3
+    assert equipment['equipment']['chest']['name'] == 'Worn Mail'
+    return inventory_queries, equipment_queries
+
+
+def test_query_count_does_not_grow_with_inventory(app):
+    small = queries_for(app, 10)
+    db.session.remove()
+    db.drop_all()
+    db.create_all()
+    large = queries_for(app, 200)
+    assert large == small, (small, large)
+    # Login, character and one item fetch per endpoint
+    assert large[0] <= 4 and large[1] <= 4
@@ -0,0 +1,74 @@
+"""
+Test memoized item stats and their invalidation
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import db
+from app.models.item import Item, ItemTemplate
+
+
+def make_items():
+    sword = ItemTemplate(template_id='sword', name='Sword', base_type='weapon.blade.sword',
+                         base_damage_min=4, base_damage_max=8, max_durability=10,
+                         socket_count=1, enchantable=True, max_enchantments=2,
+                         equipment_stats={'strength': 2})
+    ruby = ItemTemplate(template_id='ruby', name='Ruby', base_type='gem', subtype='ruby',
+                        equipment_stats={'damage_bonus': 3})
+    db.session.add_all([sword, ruby])
+    db.session.commit()
+
+    weapon = Item(template_id=sword.id, name='Sword', condition=100, quality_modifier=1.0,
+                  sharpness=0, balance=0, sockets=[], enchantments=[])
+    gem = Item(template_id=ruby.id, name='Ruby')
+    db.session.add_all([weapon, gem])
+    db.session.commit()
+    weapon.initialize_sockets()
+    return weapon, gem
+
+
+def test_repeated_reads_are_cached(app):
+    weapon, _ = make_items()
+    stats = weapon.get_effective_stats()
+    assert weapon.get_effective_stats() is stats
+    assert weapon.get_damage_types() is weapon.get_damage_types()
+    assert stats['damage'] == [4, 8]
+
+
+def test_every_mutation_invalidates(app):
+    weapon, gem = make_items()
+    damage = lambda: weapon.get_effective_stats()['damage']
+    assert damage() == [4, 8]
+
+    weapon.socket_gem(0, gem)
+    assert damage() == [7, 11]
+
+    weapon.remove_gem(0)
+    assert damage() == [4, 8]
+
+    weapon.add_enchantment({'name': 'Keen', 'type': 'damage', 'flat_bonus': 2})
+    assert damage() == [6, 10]
+
+    weapon.damage_item(5)
+    assert weapon.condition == 50
+    assert damage() == [4, 6]
+
+    weapon.repair_item()
+    assert damage() == [6, 10]
+
+    # Direct assignments and plain column changes are picked up too
+    weapon.enchantments = []
+    assert damage() == [4, 8]
+    weapon.sharpness = 1
+    assert damage() == [5, 9]
+
+    # So is a reload from the database
+    db.session.commit()
+    db.session.execute(Item.__table__.update().where(Item.id == weapon.id).values(
+        enchantments=[{'name': 'Keen', 'type': 'damage', 'flat_bonus': 2}]
+    ))
+    db.session.expire(weapon)
+    assert damage() == [7, 11]
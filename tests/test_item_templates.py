@@ -0,0 +1,120 @@
+"""
+Test the in-memory item template registry
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.models.item import Item, ItemTemplate
+from app.models.item_constants import ItemCategory, WeaponType
+from app.systems.item_templates import get_item_template_registry
+
+
+def add_templates():
+    sword = ItemTemplate(
+        template_id='steel_sword', name='Steel Sword', base_type='weapon.blade.sword',
+        weight=4.0, material='steel', max_durability=100, weapon_type=WeaponType.SHORT_SWORD,
+        base_damage_min=3, base_damage_max=7, equipment_stats={'strength': 2},
+        damage_reduction={'slashing': 1}, item_flags=['magic'], wear_flags=['take', 'wield']
+    )
+    bag = ItemTemplate(template_id='sack', name='Sack', base_type='container', weight=0.5)
+    db.session.add_all([sword, bag])
+    db.session.commit()
+    return sword, bag
+
+
+def test_lookups_and_precomputed_fields(app):
+    sword, bag = add_templates()
+    registry = get_item_template_registry()
+
+    record = registry.get_by_template_id('steel_sword')
+    assert registry.get(sword.id) is record
+    assert record.effective_weight == pytest.approx(sword.get_effective_weight())
+    assert record.effective_durability == sword.get_effective_durability()
+    assert record.base_damage_type == sword.get_base_damage_type()
+    assert record.is_weapon and record.is_equipment and not record.is_container
+    assert registry.get_by_template_id('sack').is_container
+
+    with pytest.raises(AttributeError):
+        record.weight = 1.0
+    with pytest.raises(TypeError):
+        record.equipment_stats['strength'] = 5
+
+
+def test_items_resolve_templates_without_sql(app):
+    sword, _ = add_templates()
+    item = Item(template_id=sword.id, name='Steel Sword')
+    db.session.add(item)
+    db.session.commit()
+    item.condition, item.quality_modifier  # Load the row before counting
+    get_item_template_registry().ensure_loaded()
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        assert item.is_weapon() and not item.is_armor()
+        assert item.get_effective_weight() == pytest.approx(sword.get_effective_weight())
+        stats = item.get_effective_stats()
+        assert stats['strength'] == 2 and stats['damage'] == [3, 7]
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    assert statements == []
+
+    # Returned stats are plain data, not the template's frozen values
+    assert type(stats) is dict
+
+
+def test_template_edits_reload_the_registry(app):
+    sword, _ = add_templates()
+    registry = get_item_template_registry()
+    assert registry.get(sword.id).name == 'Steel Sword'
+
+    sword.name = 'Fine Steel Sword'
+    db.session.commit()
+    assert registry.get(sword.id).name == 'Fine Steel Sword'
+
+
+def test_registry_only_drops_committed_edits(app):
+    sword, _ = add_templates()
+    registry = get_item_template_registry()
+    registry.ensure_loaded()
+
+    # A flushed edit is not visible to other sessions until it commits
+    sword.name = 'Cursed Sword'
+    db.session.flush()
+    assert registry.is_loaded
+    db.session.rollback()
+    assert registry.is_loaded
+    assert registry.get(sword.id).name == 'Steel Sword'
+
+    # The rolled back edit does not invalidate a later, unrelated commit
+    db.session.commit()
+    assert registry.is_loaded
+
+    sword.name = 'Blessed Sword'
+    db.session.flush()
+    assert registry.is_loaded
+    db.session.commit()
+    assert not registry.is_loaded
+    assert registry.get(sword.id).name == 'Blessed Sword'
+
+
+def test_category_bitmask(app):
+    sword, bag = add_templates()
+    record = get_item_template_registry().get(sword.id)
+    assert record.category == sword.get_category()
+    assert record.category == (ItemCategory.WEAPON | ItemCategory.MAGIC
+                               | ItemCategory.TAKEABLE | ItemCategory.WEARABLE)
+    assert record.has_category(ItemCategory.EQUIPMENT)
+
+    items = [Item(template_id=sword.id, name='Sword'), Item(template_id=bag.id, name='Sack')]
+    assert [item.name for item in Item.filter_by_category(items, ItemCategory.WEAPON)] == ['Sword']
+    assert [item.name for item in Item.filter_by_category(items, ItemCategory.CONTAINER)] == ['Sack']
+    assert Item.filter_by_category(items, ItemCategory.ARMOR | ItemCategory.KEY) == []
@@ -0,0 +1,65 @@
+"""
+Test server-pushed minimap deltas
+"""
+from app import db
+from app.models.room import Room
+from app.systems.minimap_push import MinimapPushService
+from app.systems.world_graph import get_world_graph
+
+
+def test_move_and_builder_deltas(app):
+    """Moves send only newly visible/hidden rooms; builder edits reach nearby views"""
+    for x in range(0, 20):
+        db.session.add(Room(room_id=f'room_{x}', name=f'Room {x}', description='',
+                            x_coord=x, y_coord=0, z_coord=0))
+    db.session.commit()
+
+    sent = []
+    push = MinimapPushService(emit=lambda sid, payload: sent.append((sid, payload)))
+    world = get_world_graph()
+    world.add_listener(push.on_room_changed)
+    try:
+        check_deltas(push, sent, world)
+    finally:
+        world.remove_listener(push.on_room_changed)
+
+
+def check_deltas(push, sent, world):
+    push.subscribe('sid-1', 1, (0, 0, 0))
+    sid, payload = sent.pop()
+    assert payload['reset']
+    assert sorted(room['x'] for room in payload['added']) == [0, 1, 2, 3, 4, 5]
+
+    # A one-step move reveals one room and hides one
+    push.move('sid-1', (1, 0, 0))
+    payload = sent.pop()[1]
+    assert [room['x'] for room in payload['added']] == [6]
+    assert payload['removed'] == []
+    push.move('sid-1', (6, 0, 0))
+    payload = sent.pop()[1]
+    assert sorted(room['x'] for room in payload['added']) == [7, 8, 9, 10, 11]
+    assert len(payload['removed']) == 1
+
+    # Staying put sends nothing
+    assert push.move('sid-1', (6, 0, 0)) is None
+    assert sent == []
+
+    # Builder edits in view are pushed, edits far away are not
+    near = Room.query.filter_by(room_id='room_8').first()
+    near.name = 'Renamed'
+    db.session.commit()
+    world.upsert_room(near)
+    payload = sent.pop()[1]
+    assert payload['added'][0]['name'] == 'Renamed'
+
+    far = Room.query.filter_by(room_id='room_19').first()
+    far.name = 'Far away'
+    db.session.commit()
+    world.upsert_room(far)
+    assert sent == []
+
+    world.remove_room(near.id)
+    assert sent.pop()[1]['removed'] == [near.id]
+
+    push.unsubscribe('sid-1')
+    assert push.view_count() == 0
@@ -0,0 +1,99 @@
+"""
+Test that the NPC runtime only ticks NPCs near players, batched by behaviour
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import db
+from app.models.npc import NPC
+from app.models.room import Area, Room
+from app.systems.npc_runtime import NpcRuntime
+from app.systems.tick_engine import TickEngine
+
+
+def make_world(npcs_per_room=50):
+    forest = Area(area_id='forest', name='Forest')
+    db.session.add(forest)
+    db.session.commit()
+    glade = Room(room_id='glade', name='Glade', area_id=forest.id, x_coord=0, y_coord=0)
+    path = Room(room_id='path', name='Path', area_id=forest.id, x_coord=1, y_coord=0)
+    cave = Room(room_id='cave', name='Cave', x_coord=9, y_coord=9)
+    db.session.add_all([glade, path, cave])
+    db.session.commit()
+
+    behaviors = ['passive', 'aggressive', 'merchant']
+    for room in (glade, path, cave):
+        for n in range(npcs_per_room):
+            behavior = behaviors[n % 3]
+            db.session.add(NPC(npc_id=f'{room.room_id}_{n}', name=f'{room.name} {behavior} {n}',
+                               current_room_id=room.id, ai_behavior=behavior,
+                               dialogue={'greeting': 'Fine wares!'}))
+    db.session.commit()
+    return glade, path, cave
+
+
+def test_parks_npcs_in_zones_without_players(app):
+    glade, path, cave = make_world()
+    events = []
+    runtime = NpcRuntime(announce=lambda room_pk, event: events.append((room_pk, event)))
+
+    # Nobody online: everything is parked
+    assert runtime.tick({}) == 0
+    assert runtime.stats['parked'] == 150
+
+    # A player in the glade wakes the whole forest area but not the cave
+    assert runtime.tick({glade.id: [(1, 'Alice')]}) == 100
+    assert runtime.stats['parked'] == 50
+    assert set(runtime.stats['behaviors']) == {'passive', 'aggressive', 'merchant'}
+    assert sum(batch['npcs'] for batch in runtime.stats['behaviors'].values()) == 100
+
+    # Only NPCs in the player's room react
+    assert {room_pk for room_pk, _ in events} == {glade.id}
+    greetings = [event for _, event in events if event['action'] == 'greet']
+    threats = [event for _, event in events if event['action'] == 'threaten']
+    assert len(greetings) == 16 and len(threats) == 17
+    assert "says to Alice, 'Fine wares!'" in greetings[0]['message']
+
+    # Nothing new to react to on the next tick, and no rebuild
+    events.clear()
+    rebuilds = runtime.stats['rebuilds']
+    runtime.tick({glade.id: [(1, 'Alice')]})
+    assert events == []
+    assert runtime.stats['rebuilds'] == rebuilds
+
+
+def test_pending_timers_keep_npcs_awake(app):
+    glade, path, cave = make_world(npcs_per_room=3)
+    engine = TickEngine(tick_ms=100)
+    runtime = NpcRuntime(announce=lambda room_pk, event: None)
+    runtime.start(engine)
+    engine.tick()
+    assert runtime.stats['active'] == 0
+
+    sleeper = NPC.query.filter_by(npc_id='cave_0').first()
+    fired = []
+    runtime.schedule(sleeper.id, 200, fired.append)
+    engine.tick()
+    assert runtime.stats['active'] == 1
+    engine.tick()
+    assert [state.id for state in fired] == [sleeper.id]
+    engine.tick()
+    assert runtime.stats['active'] == 0
+
+
+def test_picks_up_npc_changes(app):
+    glade, path, cave = make_world(npcs_per_room=3)
+    runtime = NpcRuntime(announce=lambda room_pk, event: None)
+    assert runtime.tick({cave.id: [(1, 'Alice')]}) == 3
+
+    wolf = NPC.query.filter_by(npc_id='glade_1').first()
+    wolf.current_room_id = cave.id
+    db.session.add(NPC(npc_id='bat', name='Bat', current_room_id=cave.id, ai_behavior='aggressive'))
+    db.session.delete(NPC.query.filter_by(npc_id='cave_0').first())
+    db.session.commit()
+
+    assert runtime.tick({cave.id: [(1, 'Alice')]}) == 4
+    assert runtime.get(wolf.id).room_id == cave.id
@@ -0,0 +1,94 @@
+"""
+Test character ownership leases across worker processes
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+from app import db
+from app.models.character import Character
+from app.models.player import Player
+from app.systems.character_state import get_character_state_store
+from app.systems.ownership import CharacterOwnership, LocalLeaseBackend, RedisLeaseBackend
+from app.systems.vitals import get_vitals_store
+
+
+def check_exclusive(worker_a, worker_b):
+    assert worker_a.acquire(7)
+    assert worker_a.acquire(7)  # Re-joining on the same worker is fine
+    assert not worker_b.acquire(7)
+    assert worker_b.owner_of(7) == worker_a.owner_id
+
+    assert worker_a.renew_all() == []
+    worker_a.release(7)
+    assert not worker_a.owns(7)
+    assert worker_b.acquire(7)
+    assert worker_b.owns(7)
+
+
+def test_local_leases():
+    backend = LocalLeaseBackend()
+    check_exclusive(CharacterOwnership(backend, 'a'), CharacterOwnership(backend, 'b'))
+
+
+def test_redis_leases():
+    fakeredis = pytest.importorskip('fakeredis')
+    server = fakeredis.FakeServer()
+    worker_a = CharacterOwnership(RedisLeaseBackend(fakeredis.FakeRedis(server=server)), 'a')
+    worker_b = CharacterOwnership(RedisLeaseBackend(fakeredis.FakeRedis(server=server)), 'b')
+    check_exclusive(worker_a, worker_b)
+
+    # A lease that expired and was taken over is reported as lost
+    worker_a.acquire(8)
+    server_client = fakeredis.FakeRedis(server=server)
+    server_client.set('mudra:character_owner:8', 'b')
+    assert worker_a.renew_all() == [8]
+    assert not worker_a.owns(8)
+
+
+def test_one_world_leader():
+    backend = LocalLeaseBackend()
+    worker_a = CharacterOwnership(backend, 'a')
+    worker_b = CharacterOwnership(backend, 'b')
+    assert worker_a.is_leader
+    assert not worker_b.campaign()
+
+    # A clean shutdown hands the world systems over at once
+    worker_a.resign()
+    assert worker_b.campaign()
+    assert not worker_a.campaign()
+
+
+def test_lost_lease_discards_local_state(app):
+    player = Player(username='owner', email='owner@example.com', password_hash='x')
+    db.session.add(player)
+    db.session.commit()
+    character = Character(player_id=player.id, name='Wanderer', x_coord=0, y_coord=0, z_coord=0,
+                          current_hp=50)
+    db.session.add(character)
+    db.session.commit()
+
+    backend = LocalLeaseBackend()
+    worker = CharacterOwnership(backend, 'a')
+    store = get_character_state_store()
+    vitals = get_vitals_store()
+    assert worker.acquire(character.id)
+    store.update(character, current_hp=20)
+    vitals.add(character)
+
+    # The lease expired and another worker took the character over
+    backend.release(f'mudra:character_owner:{character.id}', 'a')
+    assert backend.acquire(f'mudra:character_owner:{character.id}', 'b', 30000)
+    worker._periodic_renew()
+
+    assert not store.is_tracked(character.id)
+    assert store.dirty_count() == 0
+    assert not vitals.is_online(character.id)
+    store.flush()
+    table = Character.__table__
+    hp = db.session.execute(db.select(table.c.current_hp)).scalar_one()
+    assert hp == 50  # The new owner's state is not overwritten
@@ -0,0 +1,179 @@
+"""
+Test NPC and room item respawns on the respawn timing wheel
+"""
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event
+
+from app import db
+from app.models.item import Item, ItemTemplate
+from app.models.npc import NPC
+from app.models.room import Room, RoomItemRespawn
+from app.systems.ownership import get_character_ownership
+from app.systems.respawn import RespawnManager
+
+
+def make_world():
+    db.session.add_all([
+        ItemTemplate(template_id='apple', name='Apple', base_type='food'),
+        ItemTemplate(template_id='torch', name='Torch', base_type='light', max_durability=20)
+    ])
+    den = Room(room_id='den', name='Den', x_coord=3, y_coord=4, z_coord=0,
+               items=['apple', 'apple', 'torch'], npcs=['wolf', 'bear', 'king', 'rat'])
+    db.session.add(den)
+    db.session.commit()
+
+    long_ago = datetime.utcnow() - timedelta(hours=1)
+    db.session.add_all([
+        NPC(npc_id='wolf', name='Wolf', respawn_time=60, died_at=long_ago, current_hp=0),
+        NPC(npc_id='bear', name='Bear', respawn_time=60, died_at=datetime.utcnow(), current_hp=0),
+        NPC(npc_id='king', name='King', respawn_time=60, is_unique=True, died_at=long_ago),
+        NPC(npc_id='rat', name='Rat', respawn_time=5, current_room_id=den.id)
+    ])
+    db.session.commit()
+    return den
+
+
+def test_recovers_and_spawns_due_entries_in_one_transaction(app):
+    den = make_world()
+    manager = RespawnManager(tick_ms=1000)
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        manager.recover()
+        assert manager.pending() == 5  # wolf, bear, two apples, a torch
+        del statements[:]
+        assert manager.tick() == 4
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    writes = [sql for sql in statements if not sql.lstrip().upper().startswith('SELECT')]
+    assert len([sql for sql in writes if sql.startswith('INSERT')]) == 1
+    assert len([sql for sql in writes if sql.startswith('UPDATE')]) == 1
+
+    names = sorted(item.name for item in Item.query.filter_by(room_id=den.id))
+    assert names == ['Apple', 'Apple', 'Torch']
+    assert Item.query.filter_by(name='Torch').first().current_durability == 20
+    wolf = NPC.query.filter_by(npc_id='wolf').first()
+    assert (wolf.current_room_id, wolf.x_coord, wolf.y_coord) == (den.id, 3, 4)
+    assert wolf.died_at is None and wolf.current_hp == wolf.max_hp
+    assert NPC.query.filter_by(npc_id='king').first().current_room_id is None
+
+    # The bear died just now and is still waiting
+    assert manager.pending() == 1
+
+
+def test_deaths_and_taken_items_are_scheduled(app):
+    den = make_world()
+    manager = RespawnManager(tick_ms=1000)
+    manager.recover()
+    manager.tick()
+
+    rat = NPC.query.filter_by(npc_id='rat').first()
+    manager.npc_died(rat)
+    db.session.commit()
+    assert rat.current_room_id is None and rat.died_at is not None
+
+    apple = Item.query.filter_by(room_id=den.id, name='Apple').first()
+    apple.room_id = None
+    db.session.commit()
+    assert manager.item_taken(den.id, apple) is not None
+    assert manager.item_taken(den.id, apple) is None  # Already pending
+
+    for _ in range(4):
+        manager.tick()
+    assert NPC.query.filter_by(npc_id='rat').first().current_room_id is None
+    manager.tick()
+    assert NPC.query.filter_by(npc_id='rat').first().current_room_id == den.id
+
+    assert Item.query.filter_by(room_id=den.id, name='Apple').count() == 1
+    for _ in range(300):
+        manager.tick()
+    assert Item.query.filter_by(room_id=den.id, name='Apple').count() == 2
+
+
+def test_restart_rebuilds_from_death_timestamps(app):
+    den = make_world()
+    RespawnManager(tick_ms=1000).recover()
+
+    # A fresh manager (as after a restart) still knows the bear is due in a minute
+    restarted = RespawnManager(tick_ms=1000)
+    restarted.recover()
+    for _ in range(58):
+        restarted.tick()
+    assert NPC.query.filter_by(npc_id='bear').first().current_room_id is None
+    for _ in range(3):
+        restarted.tick()
+    assert NPC.query.filter_by(npc_id='bear').first().current_room_id == den.id
+
+
+def test_only_the_world_leader_spawns(app):
+    den = make_world()
+    manager = RespawnManager(tick_ms=1000)
+    ownership = get_character_ownership()
+    ownership.resign()
+    try:
+        assert manager.tick() == 0
+        assert manager.pending() == 0
+        assert Item.query.filter_by(room_id=den.id).count() == 0
+    finally:
+        assert ownership.campaign()
+    assert manager.tick() == 4
+
+    # A death recorded by another process is picked up on the next rescan
+    rat = NPC.query.filter_by(npc_id='rat').first()
+    rat.died_at = datetime.utcnow()
+    rat.current_room_id = None
+    db.session.commit()
+    manager.rescan()
+    assert manager._npcs.keys() == {rat.id, NPC.query.filter_by(npc_id='bear').first().id}
+
+
+def test_restart_keeps_item_respawn_timers(app):
+    den = make_world()
+    manager = RespawnManager(tick_ms=1000)
+    manager.recover()
+    manager.tick()
+    apple = Item.query.filter_by(room_id=den.id, name='Apple').first()
+    apple.room_id = None
+    db.session.commit()
+    assert manager.item_taken(den.id, apple) is not None
+
+    # After a restart the apple still waits out its five minutes
+    restarted = RespawnManager(tick_ms=1000)
+    restarted.recover()
+    for _ in range(290):
+        restarted.tick()
+    assert Item.query.filter_by(room_id=den.id, name='Apple').count() == 1
+    for _ in range(20):
+        restarted.tick()
+    assert Item.query.filter_by(room_id=den.id, name='Apple').count() == 2
+    assert RoomItemRespawn.query.count() == 0
+
+
+def test_failing_spawns_back_off(app):
+    make_world()
+    manager = RespawnManager(tick_ms=100)
+    attempts = []
+
+    def fail(due):
+        attempts.append(manager._wheel.current_tick)
+        raise RuntimeError('database is locked')
+
+    manager._spawn = fail
+    for _ in range(80):
+        manager.tick()
+    # Retries 1, 2 and 4 seconds apart instead of on every tick
+    assert [b - a for a, b in zip(attempts, attempts[1:])] == [10, 20, 40]
+    assert manager.pending() == 5
+
+    del manager._spawn
+    for _ in range(80):
+        manager.tick()
+    assert manager.pending() == 1  # Only the bear is still waiting
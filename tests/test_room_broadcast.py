@@ -0,0 +1,36 @@
+"""
+Test coalesced room broadcasts
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.systems.room_broadcast import RoomBroadcaster
+
+
+def test_one_batch_per_room_with_senders_skipped():
+    sent = []
+    broadcaster = RoomBroadcaster(emit=lambda payload, to, skip_sid: sent.append((to, skip_sid, payload)))
+
+    for n in range(5):
+        broadcaster.publish(1, {'message': f'Alice says {n}'}, sender_sid='alice')
+    broadcaster.publish(1, {'message': 'Bob waves'}, sender_sid='bob')
+    broadcaster.publish(2, {'message': 'Carol arrives.'}, sender_sid='carol')
+    broadcaster.flush()
+
+    room_1 = [entry for entry in sent if entry[0] == 'room_1']
+    assert len(room_1) == 1
+    assert room_1[0][1] == ['alice', 'bob']
+    assert len(room_1[0][2]['events']) == 6
+
+    # Each sender gets only the other senders' events
+    by_sid = {to: payload['events'] for to, skip, payload in sent if skip is None}
+    assert by_sid['alice'] == [{'message': 'Bob waves'}]
+    assert len(by_sid['bob']) == 5
+    assert 'carol' not in by_sid
+
+    sent.clear()
+    broadcaster.flush()
+    assert sent == []
@@ -0,0 +1,53 @@
+"""
+Test the sid -> character session registry
+"""
+from sqlalchemy import event
+
+from app import db
+from app.models.character import Character
+from app.models.player import Player
+from app.systems.commands import CommandProcessor
+from app.systems.session_registry import SessionRegistry
+
+
+def test_resolve_without_queries_and_who(app, monkeypatch):
+    player = Player(username='reg', email='reg@example.com', password_hash='x')
+    db.session.add(player)
+    db.session.commit()
+    first = Character(player_id=player.id, name='Alpha')
+    second = Character(player_id=player.id, name='Beta')
+    db.session.add_all([first, second])
+    db.session.commit()
+    second_id = second.id
+
+    registry = SessionRegistry()
+    registry.register('sid-1', second)
+    db.session.remove()
+
+    statements = []
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', count)
+    try:
+        character = registry.resolve('sid-1')
+        assert (character.id, character.name) == (second_id, 'Beta')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count)
+    assert statements == []
+
+    # ORM updates drop the cached handle so the next resolve sees them
+    character.description = 'Updated'
+    db.session.commit()
+    db.session.remove()
+    assert registry.resolve('sid-1').description == 'Updated'
+
+    registry.register('sid-2', Character.query.filter_by(name='Alpha').first())
+    assert registry.presence() == {'connections': 2, 'characters': 2, 'players': 1}
+
+    monkeypatch.setattr('app.systems.commands.get_session_registry', lambda: registry)
+    result = CommandProcessor().cmd_who(registry.resolve('sid-1'), [], '')
+    assert 'Alpha\n' in result['message']
+    assert 'Beta (you)' in result['message']
+
+    registry.unregister('sid-2')
+    assert registry.presence()['characters'] == 1
@@ -0,0 +1,76 @@
+"""
+Test the minimap spatial index and its ETag handling
+"""
+import json
+
+from app.systems.spatial_index import SpatialIndex
+
+
+class FakeRoom:
+    """Minimal stand-in for a world graph room node"""
+
+    def __init__(self, pk, x, y, z=0):
+        self.id = pk
+        self.room_id = f'room_{pk:03d}'
+        self.name = f'Room {pk}'
+        self.x_coord = x
+        self.y_coord = y
+        self.z_coord = z
+        self.exits = {}
+
+
+def brute_force(rooms, x, y, z, radius):
+    return sorted(
+        room.id for room in rooms
+        if room.z_coord == z and abs(room.x_coord - x) <= radius and abs(room.y_coord - y) <= radius
+    )
+
+
+def test_radius_query_matches_brute_force():
+    """Grid lookups return exactly the rooms a range scan would"""
+    rooms = []
+    pk = 1
+    for x in range(-20, 21, 3):
+        for y in range(-20, 21, 2):
+            for z in (0, 1):
+                rooms.append(FakeRoom(pk, x, y, z))
+                pk += 1
+
+    index = SpatialIndex(tile_size=8)
+    for room in rooms:
+        index.add(room)
+
+    for center in [(0, 0, 0), (-17, 9, 1), (8, 8, 0), (20, -20, 1), (100, 100, 0)]:
+        found = sorted(room.id for room in index.rooms_in_radius(*center, 5))
+        assert found == brute_force(rooms, *center, 5)
+
+        served = json.loads(index.minimap_rooms_json(*center, 5))
+        assert sorted(room['id'] for room in served) == found
+
+
+def test_etag_changes_only_when_view_changes():
+    """ETags are stable for an idle view and change on nearby edits"""
+    index = SpatialIndex(tile_size=8)
+    near = FakeRoom(1, 1, 1)
+    far = FakeRoom(2, 60, 60)
+    index.add(near)
+    index.add(far)
+
+    etag = index.minimap_etag(0, 0, 0, 5)
+    assert index.minimap_etag(0, 0, 0, 5) == etag
+
+    # Edits outside the view leave the ETag alone
+    far.name = 'Renamed'
+    index.add(far)
+    assert index.minimap_etag(0, 0, 0, 5) == etag
+
+    # Edits inside the view, or moving the viewer, change it
+    near.name = 'Renamed'
+    index.add(near)
+    changed = index.minimap_etag(0, 0, 0, 5)
+    assert changed != etag
+    assert index.minimap_etag(1, 0, 0, 5) != changed
+
+    index.remove(near.id)
+    assert index.minimap_etag(0, 0, 0, 5) != changed
+    assert index.rooms_in_radius(0, 0, 0, 5) == []
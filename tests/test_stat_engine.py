@@ -0,0 +1,109 @@
+"""
+Test incremental equipment bonus totals against full recomputation
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import db
+from app.models.character import Character
+from app.models.item import Item, ItemTemplate
+from app.models.player import Player
+from app.systems.stat_engine import get_stat_engine
+
+
+def make_character():
+    player = Player(username='wearer', email='wearer@example.com', password_hash='x')
+    db.session.add(player)
+    db.session.commit()
+    character = Character(player_id=player.id, name='Wearer', x_coord=0, y_coord=0, z_coord=0)
+    db.session.add(character)
+    db.session.commit()
+    return character
+
+
+def make_item(character, template, name):
+    item = Item(template_id=template.id, name=name, owner_character_id=character.id,
+                condition=100, quality_modifier=1.0, sockets=[], enchantments=[])
+    db.session.add(item)
+    db.session.commit()
+    return item
+
+
+def test_deltas_match_full_recomputation(app):
+    character = make_character()
+    helm = ItemTemplate(template_id='helm', name='Helm', base_type='armor.head', max_durability=10,
+                        equipment_stats={'health': 20, 'mana': 4})
+    boots = ItemTemplate(template_id='boots', name='Boots', base_type='armor.feet',
+                         equipment_stats={'movement': 10})
+    db.session.add_all([helm, boots])
+    db.session.commit()
+    worn_helm = make_item(character, helm, 'Helm')
+    worn_helm.equipped_character_id = character.id
+    db.session.commit()
+
+    engine = get_stat_engine()
+    scans = engine.stats['scans']
+    character.calculate_derived_stats()
+    assert character.max_hp == 120
+    assert engine.stats['scans'] == scans + 1
+
+    # Equip: one delta, no rescan
+    new_boots = make_item(character, boots, 'Boots')
+    new_boots.equipped_character_id = character.id
+    db.session.commit()
+    engine.equip(character, new_boots)
+    character.calculate_derived_stats()
+    assert character.max_movement == 110
+    assert engine.check(character) == {}
+
+    # Durability loss on a worn item swaps its contribution
+    worn_helm.damage_item(5)
+    db.session.commit()
+    assert character.get_equipment_bonuses()['health'] == 10
+    assert engine.check(character) == {}
+
+    # Unequip
+    worn_helm.equipped_character_id = None
+    db.session.commit()
+    engine.unequip(character, worn_helm)
+    character.calculate_derived_stats()
+    assert character.max_hp == 100 and character.max_mana == 50
+    assert engine.check(character) == {}
+    assert engine.stats['scans'] == scans + 1
+
+
+def test_checker_reports_drift(app):
+    character = make_character()
+    ring = ItemTemplate(template_id='ring', name='Ring', base_type='accessory.ring',
+                        equipment_stats={'mana': 5})
+    db.session.add(ring)
+    db.session.commit()
+    engine = get_stat_engine()
+    assert character.get_equipment_bonuses()['mana'] == 0
+
+    # Equipped behind the engine's back
+    item = make_item(character, ring, 'Ring')
+    item.equipped_character_id = character.id
+    db.session.commit()
+    assert engine.check(character) == {'mana': (0, 5)}
+
+
+def test_equipping_an_unscanned_character_scans_it(app):
+    character = make_character()
+    cloak = ItemTemplate(template_id='cloak', name='Cloak', base_type='armor.back',
+                         equipment_stats={'health': 7})
+    db.session.add(cloak)
+    db.session.commit()
+    engine = get_stat_engine()
+    assert not engine.is_tracked(character.id)
+
+    item = make_item(character, cloak, 'Cloak')
+    item.equipped_character_id = character.id
+    db.session.commit()
+    engine.equip(character, item)
+    assert engine.is_tracked(character.id)
+    assert character.get_equipment_bonuses()['health'] == 7
+    assert engine.check(character) == {}
@@ -0,0 +1,107 @@
+"""
+Test the game tick engine and its timing wheel
+"""
+import sys
+import os
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.systems.tick_engine import TickEngine, TimingWheel, TimerHandle
+
+
+def run_ticks(engine, count):
+    for _ in range(count):
+        engine.tick()
+
+
+def test_wheel_fires_timers_on_their_tick():
+    wheel = TimingWheel(slots=(8, 4, 4))
+    delays = [1, 7, 8, 9, 31, 32, 33, 127, 128, 300]
+    for delay in delays:
+        wheel.add(TimerHandle(delay, None, None, str(delay)))
+
+    fired = {}
+    for _ in range(400):
+        for handle in wheel.advance():
+            fired[handle.due_tick] = wheel.current_tick
+    assert fired == {delay: delay for delay in delays}
+    assert wheel.size == 0
+
+
+def test_call_later_and_cancel():
+    engine = TickEngine(tick_ms=100)
+    calls = []
+    engine.call_later(300, lambda: calls.append('late'))
+    engine.call_later(50, lambda: calls.append('soon'))  # Rounded up to one tick
+    cancelled = engine.call_later(200, lambda: calls.append('cancelled'))
+    cancelled.cancel()
+
+    run_ticks(engine, 1)
+    assert calls == ['soon']
+    run_ticks(engine, 5)
+    assert calls == ['soon', 'late']
+
+
+def test_call_every_repeats_until_cancelled():
+    engine = TickEngine(tick_ms=100)
+    ticks = []
+    handle = engine.call_every(200, lambda: ticks.append(engine.current_tick))
+    run_ticks(engine, 7)
+    assert ticks == [2, 4, 6]
+    handle.cancel()
+    run_ticks(engine, 4)
+    assert ticks == [2, 4, 6]
+
+
+def test_phases_run_after_timers_in_order():
+    engine = TickEngine(tick_ms=100)
+    order = []
+    engine.add_phase('regen', lambda: order.append('regen'))
+    engine.add_phase('broadcast', lambda: order.append('broadcast'))
+    engine.call_later(100, lambda: order.append('timer'))
+    engine.tick()
+    assert order == ['timer', 'regen', 'broadcast']
+
+    # A failing phase does not stop the tick
+    engine.add_phase('regen', lambda: 1 / 0)
+    order.clear()
+    engine.tick()
+    assert order == ['broadcast']
+
+
+def test_timers_over_budget_carry_to_next_tick():
+    engine = TickEngine(tick_ms=100)
+    engine.timer_budget_ms = 5
+    calls = []
+
+    def slow():
+        calls.append(engine.current_tick)
+        time.sleep(0.004)
+
+    for _ in range(6):
+        engine.call_later(100, slow)
+    engine.tick()
+    assert 1 <= len(calls) < 6
+    assert engine.stats['timers_deferred'] > 0
+    run_ticks(engine, 5)
+    assert len(calls) == 6
+
+
+def test_overrun_is_counted():
+    engine = TickEngine(tick_ms=1)
+    engine.add_phase('slow', lambda: time.sleep(0.005))
+    engine.tick()
+    assert engine.stats['overruns'] == 1
+    assert engine.stats['phase_ms']['slow'] >= 5
+
+
+def test_loop_catches_up_in_fixed_steps():
+    engine = TickEngine(tick_ms=10)
+    engine.add_phase('stall', lambda: time.sleep(0.03) if engine.current_tick == 1 else None)
+    engine.start()
+    time.sleep(0.2)
+    engine.stop()
+    assert engine.stats['caught_up'] >= 1
+    assert engine.stats['ticks'] >= 10
@@ -0,0 +1,118 @@
+"""
+Test vectorized vitals regeneration and its sync to the database
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import db
+from app.models.character import Character
+from app.models.player import Player
+from app.systems.character_state import get_character_state_store
+from app.systems.vitals import VitalsStore
+
+
+def make_characters(count):
+    player = Player(username='healer', email='healer@example.com', password_hash='x')
+    db.session.add(player)
+    db.session.commit()
+    characters = []
+    for n in range(count):
+        character = Character(player_id=player.id, name=f'Healer{n}', x_coord=0, y_coord=0, z_coord=0)
+        character.set_attribute_value('body', 'vitality', n)
+        character.calculate_derived_stats()
+        character.current_hp = 10
+        character.current_mana = character.max_mana
+        character.current_movement = character.max_movement
+        characters.append(character)
+    db.session.add_all(characters)
+    db.session.commit()
+    return characters
+
+
+def test_regen_is_clamped_and_follows_attributes(app):
+    characters = make_characters(3)
+    vitals = VitalsStore(emit=lambda payload: None, tick_ms=1000)
+    for character in characters:
+        vitals.add(character)
+
+    vitals.regen()
+    hp = [vitals.get(character.id)['hp'] for character in characters]
+    assert hp == [11, 11, 11]  # 1.0, 1.25 and 1.5 per second
+    vitals.regen()
+    hp = [vitals.get(character.id)['hp'] for character in characters]
+    assert hp == [12, 12, 13]
+
+    for _ in range(200):
+        vitals.regen()
+    for character in characters:
+        values = vitals.get(character.id)
+        assert values['hp'] == values['max_hp'] == character.max_hp
+        assert values['mana'] == character.max_mana
+
+
+def test_updates_only_when_a_display_step_is_crossed(app):
+    character, = make_characters(1)
+    sent = []
+    vitals = VitalsStore(emit=sent.append, tick_ms=1000)
+    vitals.add(character)
+
+    # max_hp 100: one display step is 5 HP, regen is 1 HP per tick
+    for _ in range(20):
+        vitals.regen()
+    assert [payload['hp'] for payload in sent] == [15, 20, 25, 30]
+    assert len(sent) < 20
+
+    vitals.adjust(character.id, hp=-100)
+    vitals.regen()
+    assert sent[-1]['hp'] == 1
+    assert vitals.get(character.id)['hp'] == 1
+
+
+def test_sync_goes_through_the_state_store(app):
+    characters = make_characters(3)
+    store = get_character_state_store()
+    vitals = VitalsStore(emit=lambda payload: None, tick_ms=1000)
+    for character in characters:
+        store.attach(character)
+        vitals.add(character)
+
+    assert vitals.sync() == 0
+    vitals.regen()
+    assert vitals.sync() == 3
+    assert vitals.sync() == 0
+    assert store.flush() == 3
+
+    table = Character.__table__
+    rows = db.session.execute(db.select(table.c.current_hp)).scalars().all()
+    assert rows == [11, 11, 11]
+
+    # Leaving syncs whatever changed since the last sync
+    vitals.regen()
+    vitals.remove(characters[2].id)
+    assert not vitals.is_online(characters[2].id)
+    store.flush()
+    rows = db.session.execute(db.select(table.c.current_hp).order_by(table.c.id)).scalars().all()
+    assert rows == [11, 11, 13]
+
+    # The freed slot is reused
+    vitals.add(characters[2])
+    assert vitals._slots[characters[2].id] == 2
+
+
+def test_untracked_changes_wait_for_the_store(app):
+    character, = make_characters(1)
+    store = get_character_state_store()
+    vitals = VitalsStore(emit=lambda payload: None, tick_ms=1000)
+    vitals.add(character)
+
+    # Not attached (e.g. released on logout): the regen is not marked synced
+    vitals.regen()
+    assert vitals.sync() == 0
+    store.attach(character)
+    assert vitals.sync() == 1
+    store.flush()
+    table = Character.__table__
+    assert db.session.execute(db.select(table.c.current_hp)).scalar_one() == 11
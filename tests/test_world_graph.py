@@ -0,0 +1,106 @@
+"""
+Test the in-memory world graph used for movement and look
+"""
+from app import db
+from app.models.room import Room, Area
+from app.systems.world_graph import WorldGraph
+
+
+def make_room(room_id, x, y, z=0, exits=None):
+    room = Room(room_id=room_id, name=f'Room {room_id}', description='A test room',
+                x_coord=x, y_coord=y, z_coord=z, exits=exits or {})
+    db.session.add(room)
+    return room
+
+
+def test_graph_indexes_rooms(app):
+    """Rooms are indexed by primary key, room_id and coordinates"""
+    area = Area(area_id='area_test', name='Test Area')
+    db.session.add(area)
+    start = make_room('room_a', 0, 0, exits={'north': 'room_b'})
+    north = make_room('room_b', 0, 1, exits={'south': 'room_a'})
+    db.session.commit()
+
+    world = WorldGraph()
+    world.load()
+
+    assert world.get_room(start.id).room_id == 'room_a'
+    assert world.get_room_by_room_id('room_b').id == north.id
+    assert world.get_room_at(0, 1, 0).room_id == 'room_b'
+    assert world.areas_by_area_id['area_test'].name == 'Test Area'
+
+    target, exit_key = world.get_exit_target(world.get_room(start.id), 'n')
+    assert target.room_id == 'room_b'
+    assert exit_key == 'north'
+    assert world.get_exit_target(world.get_room(start.id), 'west') == (None, None)
+
+
+def test_graph_incremental_updates(app):
+    """Upserts and removals patch the graph without a reload"""
+    room = make_room('room_a', 0, 0)
+    db.session.commit()
+
+    world = WorldGraph()
+    world.load()
+
+    # Moving a room re-indexes its coordinates
+    room.x_coord = 5
+    room.exits = {'east': 'room_c'}
+    db.session.commit()
+    world.upsert_room(room)
+    assert world.get_room_at(0, 0, 0) is None
+    assert world.get_room_at(5, 0, 0).exits == {'east': 'room_c'}
+
+    # New rooms become visible immediately
+    added = make_room('room_c', 6, 0)
+    db.session.commit()
+    world.upsert_room(added)
+    assert world.get_room_by_room_id('room_c').id == added.id
+
+    # Removed rooms disappear from every index
+    world.remove_room(added.id)
+    assert world.get_room(added.id) is None
+    assert world.get_room_by_room_id('room_c') is None
+    assert world.get_room_at(6, 0, 0) is None
+
+
+def test_edits_from_another_process_are_picked_up(app):
+    """A bumped world version makes other graphs reload and notify listeners"""
+    area = Area(area_id='area_edit', name='Edit Area')
+    db.session.add(area)
+    db.session.commit()
+    room = make_room('room_edit', 0, 0)
+    room.area_id = area.id
+    db.session.commit()
+
+    server = WorldGraph()
+    server.load()
+    changes = []
+    server.add_listener(lambda old, new: changes.append((old, new)))
+    assert not server.check_version()
+
+    # The map builder (its own process and graph) renames the room
+    builder = WorldGraph()
+    builder.load()
+    room.name = 'Renamed'
+    db.session.commit()
+    builder.upsert_room(room)
+    builder.bump_version()
+    assert not builder.check_version()  # Its own edit is already applied
+
+    assert server.check_version()
+    assert server.get_room(room.id).name == 'Renamed'
+    assert [(old.name, new.name) for old, new in changes] == [('Room room_edit', 'Renamed')]
+
+    # Deleting the area keeps its rooms, without an area
+    room.area_id = None
+    db.session.delete(area)
+    db.session.commit()
+    builder.upsert_room(room)
+    builder.remove_area(area.id)
+    builder.bump_version()
+    assert builder.get_area(area.id) is None
+
+    assert server.check_version()
+    assert server.get_area(area.id) is None
+    assert server.get_room(room.id).area_id is None